@@ -451,16 +451,27 @@ _C.TEST.BBOX_AUG.SCALE_H_FLIP = False
 # my own configuration #
 _C.MODE = 'TRAIN'
 _C.DATA_PATH = ''
+# root of frame stores written by tools/pack_ycb_video.py, empty to read the original files
+_C.FRAME_STORE = ''
+# load depth with color and append the backprojected XYZ in meter as 3 channels to the image blob
+_C.INPUT_DEPTH = False
 
 _C.TRAIN = CN()
 _C.TRAIN.CLASSES = (1,2,3)
+# unused, kept so that older configs still load: YCB-Video gives every frame an index
+# in each epoch, and the training length is SOLVER.MAX_ITER
 _C.TRAIN.MAX_ITERS_PER_EPOCH = 1000000
+# seed of the frame order and of the random state of the main process,
+# data loader workers seed themselves from the torch worker seed
+_C.TRAIN.RNG_SEED = 3
 _C.TRAIN.VISUALIZE = False
 _C.TRAIN.USE_FLIPPED = True
 _C.TRAIN.CHROMATIC = True
 _C.TRAIN.ADD_NOISE = False
 _C.TRAIN.SCALES_BASE = (0.25, 0.5, 1.0, 2.0, 3.0)
 _C.TRAIN.UNIFORM_POSE_INTERVAL = 15
+# keep every this many frames of the train image set
+_C.TRAIN.IMAGE_STRIDE = 10
 
 # synthetic training
 _C.TRAIN.SYNTHESIZE = False
@@ -475,6 +486,11 @@ _C.TRAIN.SYN_TNEAR = 0.5
 _C.TRAIN.SYN_TFAR = 2.0
 _C.TRAIN.SYN_BACKGROUND_SPECIFIC = False
 _C.TRAIN.SYN_BACKGROUND_SUBTRACT_MEAN = False
+# number of decoded background images kept in shared memory, which takes
+# SIZE x SYN_HEIGHT x SYN_WIDTH x 3 bytes of /dev/shm, about 236 MB for 256 images
+# of 640x480. The cache is shared with forked data loader workers only, so the
+# workers need the fork start method (the default on Linux)
+_C.TRAIN.SYN_BACKGROUND_CACHE_SIZE = 256
 _C.TRAIN.SYN_SAMPLE_OBJECT = True
 _C.TRAIN.SYN_SAMPLE_POSE = True
 _C.TRAIN.SYN_STD_ROTATION = 15
@@ -485,12 +501,24 @@ _C.TRAIN.SYN_TNEAR = 0.5
 _C.TRAIN.SYN_TFAR = 2.0
 _C.TRAIN.SYN_BOUND = 0.4
 _C.TRAIN.SYN_SAMPLE_DISTRACTOR = True
+# directory of pre-rendered samples from tools/prerender_ycb_video.py, empty to render online
+_C.TRAIN.SYN_CACHE = ''
+# rescan the cache for new shards every this many samples, 0 to never rescan
+_C.TRAIN.SYN_CACHE_REFRESH = 0
 
 # synthetic testing
 _C.TEST.SYNTHESIZE = False
 _C.TEST.VISUALIZE = False
 _C.TEST.SCALES_BASE = (0.25, 0.5, 1.0, 2.0, 3.0)
 
+# pose evaluation: processes reading the result files, 0 to read them in the main process
+_C.TEST.EVAL_NUM_WORKERS = 4
+# save accuracy curves of each class to the output directory
+_C.TEST.EVAL_PLOT = False
+# voxel size in meter of the downsampled ADD-S query points, 0 for exact ADD-S;
+# clear the stored results of a result folder after changing it
+_C.TEST.ADDS_VOXEL_SIZE = 0.0
+
 
 # ---------------------------------------------------------------------------- #
 # Misc options
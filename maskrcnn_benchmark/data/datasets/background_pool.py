@@ -0,0 +1,118 @@
+# --------------------------------------------------------
+# Background images for synthetic data
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+Background images pasted behind rendered objects. The list of usable images
+is validated once and stored in a manifest, so startup does not walk the
+background directories. Decoded images are downscaled to the output size and
+kept in a bounded LRU cache in shared memory, which all data loader workers
+forked from the process that created the pool read from and fill.
+"""
+
+import os
+import json
+import multiprocessing
+import cv2
+import numpy as np
+import torch
+
+
+def build_manifest(manifest_file, color_files, depth_files=()):
+    """
+    Keep the color images that can be decoded as 3-channel images and write the manifest
+    """
+    valid = []
+    for filename in color_files:
+        im = cv2.imread(filename, cv2.IMREAD_UNCHANGED) if os.path.isfile(filename) else None
+        if im is None or len(im.shape) != 3 or im.shape[2] < 3:
+            print('bad background image {}'.format(filename))
+            continue
+        valid.append(filename)
+    depth_files = [f for f in depth_files if os.path.isfile(f)]
+
+    manifest = {'color': valid, 'depth': depth_files}
+    with open(manifest_file, 'w') as f:
+        json.dump(manifest, f)
+    print('wrote background manifest to {}, {:d} color and {:d} depth images'.format(manifest_file, len(valid), len(depth_files)))
+    return manifest
+
+
+def load_manifest(manifest_file):
+    with open(manifest_file) as f:
+        return json.load(f)
+
+
+class BackgroundPool(object):
+    """
+    Arguments:
+        filenames (list[str]): validated background images
+        height, width (int): size of the output backgrounds
+        capacity (int): number of decoded images kept in shared memory
+
+    The shared cache and its multiprocessing.Lock are inherited by forked data loader
+    workers only, the pool does not work with the spawn start method. The cache takes
+    capacity x height x width x 3 bytes of /dev/shm.
+    """
+
+    def __init__(self, filenames, height, width, capacity=256):
+        assert len(filenames) > 0, 'no background images'
+        self.filenames = filenames
+        self.height = height
+        self.width = width
+        capacity = max(1, min(capacity, len(filenames)))
+
+        self._images = torch.zeros((capacity, height, width, 3), dtype=torch.uint8).share_memory_()
+        self._keys = torch.full((capacity, ), -1, dtype=torch.int64).share_memory_()
+        self._ticks = torch.zeros((capacity, ), dtype=torch.int64).share_memory_()
+        self._clock = torch.zeros((1, ), dtype=torch.int64).share_memory_()
+        self._lock = multiprocessing.Lock()
+
+    def __len__(self):
+        return len(self.filenames)
+
+    def _decode(self, index):
+        im = cv2.imread(self.filenames[index], cv2.IMREAD_COLOR)
+        return cv2.resize(im, (self.width, self.height), interpolation=cv2.INTER_AREA)
+
+    def get(self, index):
+        """
+        Background image `index` resized to height x width, as a private copy
+        """
+        with self._lock:
+            slot = (self._keys == index).nonzero()
+            if len(slot) > 0:
+                slot = int(slot[0])
+                self._clock += 1
+                self._ticks[slot] = self._clock[0]
+                return self._images[slot].numpy().copy()
+
+        # decode outside of the lock
+        im = self._decode(index)
+
+        with self._lock:
+            # another worker may have decoded the same image meanwhile
+            slot = (self._keys == index).nonzero()
+            self._clock += 1
+            if len(slot) > 0:
+                self._ticks[int(slot[0])] = self._clock[0]
+                return im
+            slot = int(torch.argmin(self._ticks))
+            self._images[slot].copy_(torch.from_numpy(im))
+            self._keys[slot] = index
+            self._ticks[slot] = self._clock[0]
+        return im
+
+    def random_crop(self, rng=np.random):
+        """
+        A random crop covering at least the central third of a random background,
+        resized to height x width
+        """
+        im = self.get(rng.randint(len(self.filenames)))
+        bh, bw = im.shape[:2]
+        x1 = rng.randint(0, int(bw/3))
+        y1 = rng.randint(0, int(bh/3))
+        x2 = rng.randint(int(2*bw/3), bw)
+        y2 = rng.randint(int(2*bh/3), bh)
+        return cv2.resize(im[y1:y2, x1:x2], (self.width, self.height), interpolation=cv2.INTER_LINEAR)
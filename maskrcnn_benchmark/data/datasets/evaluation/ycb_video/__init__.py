@@ -0,0 +1,11 @@
+from .ycb_video_eval import do_ycb_video_evaluation, do_ycb_video_comparison
+
+
+def ycb_video_evaluation(dataset, output_folder, **_):
+    cfg = dataset.cfg
+    return do_ycb_video_evaluation(
+        dataset=dataset,
+        output_folder=output_folder,
+        num_workers=cfg.TEST.EVAL_NUM_WORKERS,
+        plot=cfg.TEST.EVAL_PLOT,
+    )
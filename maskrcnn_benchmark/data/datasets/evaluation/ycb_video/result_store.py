@@ -0,0 +1,122 @@
+# --------------------------------------------------------
+# Append-only store of per-object pose errors
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+Pose errors of a result set, keyed by sequence, frame and object. Every
+append writes a new row group file and existing row groups are never
+modified, so an interrupted evaluation keeps the groups it finished and a
+rerun only evaluates the frames that are not stored yet.
+
+    root/
+    |_ settings.json     settings the rows were computed with, optional
+    |_ rows_00000.npz
+    |_ rows_00001.npz
+    |_ ...
+
+Opening a store with settings that differ from the saved ones drops all row
+groups. The store does not track changes of the result files themselves:
+delete the store after regenerating the results of frames that were already
+evaluated.
+"""
+
+import os
+import json
+import numpy as np
+
+_GROUP_FILE = 'rows_{:05d}.npz'
+_SETTINGS_FILE = 'settings.json'
+
+
+def frame_keys(seq_ids, frame_ids):
+    """
+    Integer key of each (sequence, frame) pair
+    """
+    return np.asarray(seq_ids).astype(np.int64) * 1000000 + np.asarray(frame_ids).astype(np.int64)
+
+
+class ResultStore(object):
+    """
+    Arguments:
+        root (str): store directory
+        columns (dict): name -> (dtype, shape of one row) of the stored columns,
+            'results_seq_id' and 'results_frame_id' are required
+        settings (dict): json serializable settings the rows depend on, rows stored
+            with other settings are dropped
+    """
+
+    def __init__(self, root, columns, settings=None):
+        self.root = root
+        self.columns = columns
+        self.num_dropped = 0
+        if not os.path.exists(root):
+            os.makedirs(root)
+        if settings is not None:
+            self._check_settings(settings)
+
+    def _check_settings(self, settings):
+        filename = os.path.join(self.root, _SETTINGS_FILE)
+        settings = json.loads(json.dumps(settings))
+        if os.path.exists(filename):
+            with open(filename) as f:
+                if json.load(f) == settings:
+                    return
+
+        ids = self._group_ids()
+        for i in ids:
+            os.remove(os.path.join(self.root, _GROUP_FILE.format(i)))
+        self.num_dropped = len(ids)
+        with open(filename, 'w') as f:
+            json.dump(settings, f, indent=2)
+
+    def _group_ids(self):
+        ids = []
+        for name in os.listdir(self.root):
+            if name.startswith('rows_') and name.endswith('.npz') and name[5:-4].isdigit():
+                ids.append(int(name[5:-4]))
+        return sorted(ids)
+
+    def __len__(self):
+        return len(self._group_ids())
+
+    def append(self, rows):
+        """
+        Write rows (dict of column arrays) as a new row group
+        """
+        if len(rows['results_seq_id']) == 0:
+            return
+        ids = self._group_ids()
+        filename = os.path.join(self.root, _GROUP_FILE.format(ids[-1] + 1 if len(ids) > 0 else 0))
+        tmp_file = filename + '.tmp%d' % os.getpid()
+        with open(tmp_file, 'wb') as f:
+            np.savez(f, **{name: rows[name] for name in self.columns})
+        os.rename(tmp_file, filename)
+
+    def load(self, keys=None):
+        """
+        All stored rows, or only the rows of the frames in keys
+        """
+        groups = []
+        for i in self._group_ids():
+            with np.load(os.path.join(self.root, _GROUP_FILE.format(i))) as data:
+                groups.append({name: data[name] for name in self.columns})
+
+        rows = {}
+        for name, (dtype, shape) in self.columns.items():
+            if len(groups) > 0:
+                rows[name] = np.concatenate([g[name] for g in groups], axis=0)
+            else:
+                rows[name] = np.zeros((0, ) + tuple(shape), dtype=dtype)
+
+        if keys is not None:
+            index = np.isin(frame_keys(rows['results_seq_id'], rows['results_frame_id']), keys)
+            rows = {name: column[index] for name, column in rows.items()}
+        return rows
+
+    def frame_keys(self):
+        """
+        Keys of the frames with stored rows
+        """
+        rows = self.load()
+        return np.unique(frame_keys(rows['results_seq_id'], rows['results_frame_id']))
@@ -0,0 +1,395 @@
+# --------------------------------------------------------
+# Streaming pose evaluation for YCB-Video
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+import logging
+import multiprocessing
+import os
+import numpy as np
+import scipy.io
+
+from maskrcnn_benchmark.data.datasets.evaluation.ycb_video.result_store import ResultStore, frame_keys
+from maskrcnn_benchmark.utils.pose_error import add_batch, re_batch, te_batch
+from maskrcnn_benchmark.utils.pose_auc import accuracy_curve, pose_aucs
+from maskrcnn_benchmark.utils.se3_batch import quat2mat_batch
+
+# pose from the network and pose after depth refinement
+RESULT_NAMES = ['PoseCNN', 'PoseCNN refined']
+
+# columns of the saved results, in the layout of results_posecnn.mat
+ID_COLUMNS = ['results_seq_id', 'results_frame_id', 'results_object_id', 'results_cls_id']
+ERROR_COLUMNS = ['distances_sys', 'distances_non', 'errors_rotation', 'errors_translation']
+
+# errors above this distance in meter count as misses
+MAX_DISTANCE = 0.1
+
+# marks a results_posecnn.mat written from a result store, which is not imported back
+STORE_MARKER = 'from_result_store'
+
+
+def result_columns():
+    columns = {}
+    for name in ID_COLUMNS:
+        columns[name] = (np.float32, ())
+    for name in ERROR_COLUMNS:
+        columns[name] = (np.float32, (len(RESULT_NAMES), ))
+    return columns
+
+
+class ColumnBuffer(object):
+    """
+    Columns of a table that grows by appending rows, the capacity doubles when full.
+
+    Arguments:
+        columns (dict): name -> (dtype, shape of one row)
+    """
+
+    def __init__(self, columns, capacity=1024):
+        self._columns = {}
+        for name, (dtype, shape) in columns.items():
+            self._columns[name] = np.zeros((capacity, ) + tuple(shape), dtype=dtype)
+        self._capacity = capacity
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, name):
+        return self._columns[name][:self._size]
+
+    def append(self, **arrays):
+        num = len(next(iter(arrays.values())))
+        if self._size + num > self._capacity:
+            while self._capacity < self._size + num:
+                self._capacity *= 2
+            for name, column in self._columns.items():
+                grown = np.zeros((self._capacity, ) + column.shape[1:], dtype=column.dtype)
+                grown[:self._size] = column[:self._size]
+                self._columns[name] = grown
+        for name, array in arrays.items():
+            self._columns[name][self._size:self._size + num] = array
+        self._size += num
+
+    def clear(self):
+        self._size = 0
+
+
+def load_frame(task):
+    """
+    Read the result file and the gt meta data of one frame. Returns one row per gt object
+    with the gt pose and the estimated poses, runs in the worker processes
+    """
+    seq_id, frame_id, result_file, meta_file, pose_refine = task
+    result = scipy.io.loadmat(result_file)
+    gt = scipy.io.loadmat(meta_file)
+
+    cls_indexes = gt['cls_indexes'].flatten()
+    poses_gt = gt['poses']
+    if len(poses_gt.shape) == 2:
+        poses_gt = np.reshape(poses_gt, (3, 4, 1))
+    num = len(cls_indexes)
+    poses_est = np.zeros((num, len(RESULT_NAMES), 3, 4), dtype=np.float32)
+    valid = np.zeros((num, len(RESULT_NAMES)), dtype=np.bool_)
+
+    # the first roi of each gt class
+    rois = result['rois']
+    if len(rois) > 0 and num > 0:
+        match = rois[:, 1][np.newaxis, :] == cls_indexes[:, np.newaxis]
+        found = match.any(axis=1)
+        roi_index = np.argmax(match, axis=1)[found]
+        keys = ['poses', 'poses_refined'] if pose_refine else ['poses']
+        for k, key in enumerate(keys):
+            poses = result[key][roi_index]
+            poses_est[found, k, :, :3] = quat2mat_batch(poses[:, :4])
+            poses_est[found, k, :, 3] = poses[:, 4:]
+            valid[found, k] = True
+
+    return {'results_seq_id': np.full((num, ), seq_id, dtype=np.float32),
+            'results_frame_id': np.full((num, ), frame_id, dtype=np.float32),
+            'results_object_id': np.arange(num, dtype=np.float32),
+            'results_cls_id': cls_indexes.astype(np.float32),
+            'poses_gt': np.transpose(poses_gt, (2, 0, 1)),
+            'poses_est': poses_est,
+            'valid': valid}
+
+
+class PoseEvaluator(object):
+    """
+    Accumulates the pose errors of every gt object. Frames are buffered until
+    block_size objects are pending, then the errors of the block are computed
+    in one batch per class.
+
+    Arguments:
+        models (YCBVideoModels): model points
+        classes_all (list[str]): model name of each class index
+        voxel_size (float): voxel size of the ADD-S query points, 0 for exact ADD-S
+    """
+
+    def __init__(self, models, classes_all, block_size=4096, voxel_size=0.0):
+        self.models = models
+        self.classes_all = classes_all
+        self.block_size = block_size
+        self.voxel_size = voxel_size
+        num_results = len(RESULT_NAMES)
+
+        pending = {name: (np.float32, ()) for name in ID_COLUMNS}
+        pending['poses_gt'] = (np.float32, (3, 4))
+        pending['poses_est'] = (np.float32, (num_results, 3, 4))
+        pending['valid'] = (np.bool_, (num_results, ))
+        self._pending = ColumnBuffer(pending)
+        self._results = ColumnBuffer(result_columns())
+
+    def __len__(self):
+        return len(self._results) + len(self._pending)
+
+    def add_frame(self, frame):
+        self._pending.append(**frame)
+        if len(self._pending) >= self.block_size:
+            self.flush()
+
+    def flush(self):
+        pending = self._pending
+        num = len(pending)
+        if num == 0:
+            return
+
+        errors = {}
+        for name in ERROR_COLUMNS:
+            errors[name] = np.full((num, len(RESULT_NAMES)), np.inf, dtype=np.float32)
+
+        cls_ids = pending['results_cls_id'].astype(np.int32)
+        valid = pending['valid']
+        for cls_index in np.unique(cls_ids):
+            pts = self.models.points(self.classes_all[cls_index])
+            nn_index = self.models.nn_index(self.classes_all[cls_index], self.voxel_size)
+            for k in range(len(RESULT_NAMES)):
+                index = np.where((cls_ids == cls_index) & valid[:, k])[0]
+                if len(index) == 0:
+                    continue
+                R_est = pending['poses_est'][index, k, :, :3].astype(np.float64)
+                t_est = pending['poses_est'][index, k, :, 3].astype(np.float64)
+                R_gt = pending['poses_gt'][index, :, :3].astype(np.float64)
+                t_gt = pending['poses_gt'][index, :, 3].astype(np.float64)
+                errors['distances_sys'][index, k] = nn_index.adi(R_est, t_est, R_gt, t_gt)
+                errors['distances_non'][index, k] = add_batch(R_est, t_est, R_gt, t_gt, pts)
+                errors['errors_rotation'][index, k] = re_batch(R_est, R_gt)
+                errors['errors_translation'][index, k] = te_batch(t_est, t_gt)
+
+        ids = {name: pending[name] for name in ID_COLUMNS}
+        self._results.append(**dict(ids, **errors))
+        pending.clear()
+
+    def results(self):
+        """
+        Errors of all objects added since the last call
+        """
+        self.flush()
+        results = {name: self._results[name].copy() for name in ID_COLUMNS + ERROR_COLUMNS}
+        self._results.clear()
+        return results
+
+
+def compute_pose_errors(tasks, models, classes_all, num_workers=4, logger=None, store=None, group_size=1000,
+                        voxel_size=0.0):
+    """
+    Read the frames of tasks with a pool of num_workers processes and
+    compute the errors of all objects as the frames arrive. With a store,
+    the errors are appended to it every group_size frames instead of returned
+    """
+    evaluator = PoseEvaluator(models, classes_all, voxel_size=voxel_size)
+    pool = None
+    if num_workers > 0:
+        pool = multiprocessing.Pool(num_workers)
+        frames = pool.imap(load_frame, tasks, chunksize=16)
+    else:
+        frames = map(load_frame, tasks)
+
+    for i, frame in enumerate(frames):
+        evaluator.add_frame(frame)
+        if store is not None and (i + 1) % group_size == 0:
+            store.append(evaluator.results())
+        if logger is not None and i % 1000 == 0:
+            logger.info('%d/%d frames' % (i, len(tasks)))
+
+    if pool is not None:
+        pool.close()
+        pool.join()
+    if store is not None:
+        store.append(evaluator.results())
+        return None
+    return evaluator.results()
+
+
+def plot_results(results, class_ids, class_names, aucs, output_folder, max_distance=MAX_DISTANCE):
+    """
+    Accuracy curves and rotation error histograms of each class, saved as <class>.png
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    color = ['r', 'b']
+    cls_ids = results['results_cls_id']
+    panels = [('ADD-S', 'distances_sys', 'Average distance threshold in meter (symmetry)'),
+              ('ADD', 'distances_non', 'Average distance threshold in meter (non-symmetry)'),
+              ('T', 'errors_translation', 'Translation threshold in meter')]
+    for j, k in enumerate(class_ids):
+        index = np.arange(len(cls_ids)) if k == 0 else np.where(cls_ids == k)[0]
+        if len(index) == 0:
+            continue
+        fig = plt.figure()
+
+        for p, (name, column, xlabel) in enumerate(panels):
+            ax = fig.add_subplot(2, 3, p + 1)
+            lengs = []
+            for i in range(len(RESULT_NAMES)):
+                d, accuracy = accuracy_curve(results[column][index, i], max_distance)
+                plt.plot(d, accuracy, color[i], linewidth=2)
+                lengs.append('%s (%.2f)' % (RESULT_NAMES[i], aucs[name][j, i] * 100))
+            ax.legend(lengs)
+            plt.xlabel(xlabel)
+            plt.ylabel('accuracy')
+            ax.set_title(class_names[j])
+
+        # rotation histogram
+        for i in range(len(RESULT_NAMES)):
+            ax = fig.add_subplot(2, 3, 4 + i)
+            D = results['errors_rotation'][index, i]
+            D = D[np.isfinite(D)]
+            ax.hist(D, bins=range(0, 190, 10), range=(0, 180))
+            plt.xlabel('Rotation angle error')
+            plt.ylabel('count')
+            ax.set_title(RESULT_NAMES[i])
+
+        plt.savefig(os.path.join(output_folder, class_names[j] + '.png'))
+        plt.close(fig)
+
+
+def save_results(filename, results):
+    scipy.io.savemat(filename, dict(results, **{STORE_MARKER: True}))
+
+
+def load_results(filename):
+    """
+    Errors of a results_posecnn.mat, None if it was written from a result store
+    """
+    results_all = scipy.io.loadmat(filename)
+    if STORE_MARKER in results_all:
+        return None
+    results = {}
+    for name in ID_COLUMNS:
+        results[name] = results_all[name].flatten()
+    for name in ERROR_COLUMNS:
+        results[name] = results_all[name]
+    return results
+
+
+def evaluate_result_set(dataset, output_folder, num_workers=4, logger=None):
+    """
+    Errors of all objects of the dataset frames for the result files in output_folder.
+    The errors are kept in a result store in output_folder, only frames missing from
+    the store are evaluated. A results_posecnn.mat of an earlier evaluation without a
+    store is imported into an empty store
+    """
+    pose_refine = dataset.cfg.TEST.get('POSE_REFINE', False)
+    voxel_size = dataset.cfg.TEST.ADDS_VOXEL_SIZE
+    store = ResultStore(os.path.join(output_folder, 'results_posecnn'), result_columns(),
+                        settings={'pose_refine': bool(pose_refine), 'voxel_size': float(voxel_size)})
+    if logger is not None and store.num_dropped > 0:
+        logger.info('dropped {} row groups of the result store computed with other settings'.format(
+            store.num_dropped))
+
+    filename = os.path.join(output_folder, 'results_posecnn.mat')
+    if len(store) == 0 and os.path.exists(filename):
+        results = load_results(filename)
+        if results is not None:
+            store.append(results)
+            if logger is not None:
+                logger.info('imported results from {}'.format(filename))
+
+    tasks = []
+    for roidb in dataset._roidb:
+        seq_id = int(roidb['video_id'])
+        frame_id = int(roidb['image_id'])
+        tasks.append((seq_id, frame_id,
+                      os.path.join(output_folder, '%04d_%06d.mat' % (seq_id, frame_id)),
+                      os.path.join(dataset._data_path, '%04d/%06d-meta.mat' % (seq_id, frame_id)),
+                      pose_refine))
+    keys = frame_keys([t[0] for t in tasks], [t[1] for t in tasks])
+
+    missing = [t for t, stored in zip(tasks, np.isin(keys, store.frame_keys())) if not stored]
+    if len(missing) > 0:
+        if logger is not None:
+            logger.info('{}: evaluating {} of {} frames with {} workers'.format(
+                output_folder, len(missing), len(tasks), num_workers))
+        if logger is not None and voxel_size > 0:
+            bounds = [dataset._models.nn_index(dataset._classes_all[k], voxel_size).error_bound
+                      for k in dataset.cfg.TRAIN.CLASSES if k > 0]
+            logger.info('ADD-S with {:g} m voxels, error at most {:.6f} m'.format(voxel_size, max(bounds + [0])))
+        compute_pose_errors(missing, dataset._models, dataset._classes_all, num_workers, logger, store,
+                            voxel_size=voxel_size)
+    return store.load(keys)
+
+
+def _class_names(dataset, class_ids):
+    return ['all' if k == 0 else dataset._classes_all[k] for k in class_ids]
+
+
+def do_ycb_video_evaluation(dataset, output_folder, num_workers=4, plot=False):
+    logger = logging.getLogger("maskrcnn_benchmark.inference")
+    cfg = dataset.cfg
+
+    results = evaluate_result_set(dataset, output_folder, num_workers, logger)
+    save_results(os.path.join(output_folder, 'results_posecnn.mat'), results)
+
+    class_ids = list(cfg.TRAIN.CLASSES)
+    class_names = _class_names(dataset, class_ids)
+    aucs = pose_aucs(results, class_ids, MAX_DISTANCE)
+
+    cls_ids = results['results_cls_id']
+    for j, k in enumerate(class_ids):
+        index = np.arange(len(cls_ids)) if k == 0 else np.where(cls_ids == k)[0]
+        if len(index) == 0:
+            continue
+        missed = np.sum(~(results['distances_non'][index] <= MAX_DISTANCE), axis=0)
+        logger.info('%s: %d objects, %s missed' % (class_names[j], len(index),
+                    ', '.join('%s %d' % (RESULT_NAMES[i], missed[i]) for i in range(len(RESULT_NAMES)))))
+
+    for name in ['ADD', 'ADD-S']:
+        lines = ['==================%s==================' % name]
+        for j in range(len(class_ids)):
+            lines.append('%s: %f' % (class_names[j], aucs[name][j, 0]))
+        lines.append('===========================================')
+        logger.info('\n'.join(lines))
+
+    if plot:
+        plot_results(results, class_ids, class_names, aucs, output_folder)
+    return aucs
+
+
+def do_ycb_video_comparison(dataset, output_folders, names=None, num_workers=4):
+    """
+    ADD and ADD-S of several result sets side by side, each result set
+    only evaluates the frames missing from its result store
+    """
+    logger = logging.getLogger("maskrcnn_benchmark.inference")
+    if names is None:
+        names = [os.path.basename(os.path.normpath(f)) for f in output_folders]
+
+    class_ids = list(dataset.cfg.TRAIN.CLASSES)
+    class_names = _class_names(dataset, class_ids)
+    aucs = []
+    for output_folder in output_folders:
+        results = evaluate_result_set(dataset, output_folder, num_workers, logger)
+        aucs.append(pose_aucs(results, class_ids, MAX_DISTANCE))
+
+    width = max([len(n) for n in class_names])
+    for metric in ['ADD', 'ADD-S']:
+        lines = ['==================%s==================' % metric]
+        lines.append(' ' * width + ''.join([' %12s' % n[:12] for n in names]))
+        for j in range(len(class_ids)):
+            lines.append(class_names[j].ljust(width) + ''.join([' %12.4f' % a[metric][j, 0] for a in aucs]))
+        lines.append('===========================================')
+        logger.info('\n'.join(lines))
+    return aucs
@@ -0,0 +1,218 @@
+# --------------------------------------------------------
+# Packed, memory-mapped frame store
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+A frame store packs many small per-frame arrays (color image, label image,
+poses, ...) into a few large chunk files plus an index, so that a data loader
+can read a frame with a single memory-mapped slice instead of opening several
+files. The layout of a store directory is
+
+    root/
+    |_ index.json        field names, dtypes and number of dimensions
+    |_ index.npz         per field: chunk id, byte offset and shape of each record
+    |_ keys.txt          one key per record, e.g. '0048/000001'
+    |_ chunk_00000.bin   raw array data
+    |_ ...
+"""
+
+import os
+import json
+import numpy as np
+
+_INDEX_FILE = 'index.json'
+_INDEX_ARRAYS = 'index.npz'
+_KEYS_FILE = 'keys.txt'
+_CHUNK_FILE = 'chunk_{:05d}.bin'
+_ALIGN = 64
+
+
+class FrameStoreWriter(object):
+    """
+    Append records to a new frame store.
+
+    Arguments:
+        root (str): output directory, created if it does not exist
+        fields (dict): field name -> numpy dtype of that field
+        chunk_size (int): approximate size in bytes of one chunk file
+    """
+
+    def __init__(self, root, fields, chunk_size=1 << 30):
+        if not os.path.exists(root):
+            os.makedirs(root)
+        self.root = root
+        self.fields = dict((name, np.dtype(dtype)) for name, dtype in fields.items())
+        self.chunk_size = chunk_size
+
+        self._keys = []
+        self._ndim = {}
+        self._chunks = {name: [] for name in self.fields}
+        self._offsets = {name: [] for name in self.fields}
+        self._shapes = {name: [] for name in self.fields}
+
+        self._chunk_id = -1
+        self._fid = None
+        self._open_chunk()
+
+    def _open_chunk(self):
+        if self._fid is not None:
+            self._fid.close()
+        self._chunk_id += 1
+        self._fid = open(os.path.join(self.root, _CHUNK_FILE.format(self._chunk_id)), 'wb')
+        self._pos = 0
+
+    def add(self, key, **arrays):
+        """
+        Append one record. Every field of the store has to be given.
+        """
+        assert set(arrays.keys()) == set(self.fields.keys()), \
+            'record fields {} do not match store fields {}'.format(sorted(arrays.keys()), sorted(self.fields.keys()))
+
+        if self._pos >= self.chunk_size:
+            self._open_chunk()
+
+        for name in sorted(self.fields):
+            array = np.ascontiguousarray(arrays[name], dtype=self.fields[name])
+            if name not in self._ndim:
+                self._ndim[name] = array.ndim
+            assert array.ndim == self._ndim[name], \
+                'field {} has {} dimensions, expected {}'.format(name, array.ndim, self._ndim[name])
+
+            pad = (-self._pos) % _ALIGN
+            if pad:
+                self._fid.write(b'\0' * pad)
+                self._pos += pad
+
+            self._chunks[name].append(self._chunk_id)
+            self._offsets[name].append(self._pos)
+            self._shapes[name].append(array.shape)
+            self._fid.write(array.tobytes())
+            self._pos += array.nbytes
+
+        self._keys.append(key)
+
+    def close(self):
+        self._fid.close()
+
+        index = {}
+        for name in self.fields:
+            ndim = self._ndim.get(name, 0)
+            index[name + '_chunk'] = np.array(self._chunks[name], dtype=np.int32)
+            index[name + '_offset'] = np.array(self._offsets[name], dtype=np.int64)
+            index[name + '_shape'] = np.array(self._shapes[name], dtype=np.int64).reshape((len(self._shapes[name]), ndim))
+        np.savez(os.path.join(self.root, _INDEX_ARRAYS), **index)
+
+        with open(os.path.join(self.root, _KEYS_FILE), 'w') as f:
+            for key in self._keys:
+                f.write(key + '\n')
+
+        meta = {'fields': {name: dtype.str for name, dtype in self.fields.items()},
+                'ndim': self._ndim,
+                'num_chunks': self._chunk_id + 1,
+                'num_records': len(self._keys)}
+        with open(os.path.join(self.root, _INDEX_FILE), 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            # no index for a store that failed while being written, so it cannot be opened
+            self._fid.close()
+            return
+        self.close()
+
+
+class FrameStore(object):
+    """
+    Read-only access to a frame store written by FrameStoreWriter.
+
+    Arrays returned by get() are zero-copy views into the memory-mapped
+    chunk files and must not be written to. Chunk files are mapped lazily,
+    so a store can be opened in the main process and shared by forked
+    data loader workers.
+    """
+
+    def __init__(self, root):
+        index_file = os.path.join(root, _INDEX_FILE)
+        assert os.path.exists(index_file), \
+            'Frame store does not exist: {}'.format(root)
+        with open(index_file) as f:
+            meta = json.load(f)
+
+        self.root = root
+        self.fields = dict((name, np.dtype(dtype)) for name, dtype in meta['fields'].items())
+        self._num_chunks = meta['num_chunks']
+
+        index = np.load(os.path.join(root, _INDEX_ARRAYS))
+        self._chunks = {name: index[name + '_chunk'] for name in self.fields}
+        self._offsets = {name: index[name + '_offset'] for name in self.fields}
+        self._shapes = {name: index[name + '_shape'] for name in self.fields}
+
+        with open(os.path.join(root, _KEYS_FILE)) as f:
+            self.keys = [x.rstrip('\n') for x in f.readlines()]
+        self._key_to_index = dict(zip(self.keys, range(len(self.keys))))
+        self._maps = [None] * self._num_chunks
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._key_to_index
+
+    def index(self, key):
+        return self._key_to_index[key]
+
+    def _chunk(self, chunk_id):
+        mm = self._maps[chunk_id]
+        if mm is None:
+            filename = os.path.join(self.root, _CHUNK_FILE.format(chunk_id))
+            if os.path.getsize(filename) == 0:
+                mm = np.zeros((0, ), dtype=np.uint8)
+            else:
+                mm = np.memmap(filename, dtype=np.uint8, mode='r')
+            self._maps[chunk_id] = mm
+        return mm
+
+    def get(self, i, name):
+        """
+        Return field `name` of record `i` as a read-only array view.
+        """
+        dtype = self.fields[name]
+        shape = tuple(self._shapes[name][i])
+        offset = int(self._offsets[name][i])
+        nbytes = int(np.prod(shape, dtype=np.int64)) * dtype.itemsize
+        mm = self._chunk(int(self._chunks[name][i]))
+        return mm[offset:offset + nbytes].view(dtype).reshape(shape)
+
+    def __getitem__(self, i):
+        return dict((name, self.get(i, name)) for name in self.fields)
+
+    def get_records(self, start, stop):
+        """
+        Return records start..stop-1 as dicts of arrays. Records in a single chunk are
+        copied with one contiguous read, the arrays are views into that private copy.
+        """
+        chunks = np.concatenate([self._chunks[name][start:stop] for name in self.fields])
+        if len(chunks) == 0 or np.any(chunks != chunks[0]):
+            return [self[i] for i in range(start, stop)]
+
+        spans = {}
+        for name, dtype in self.fields.items():
+            nbytes = np.prod(self._shapes[name][start:stop], axis=1) * dtype.itemsize
+            spans[name] = (self._offsets[name][start:stop], nbytes)
+        lo = min(int(offsets.min()) for offsets, _ in spans.values())
+        hi = max(int((offsets + nbytes).max()) for offsets, nbytes in spans.values())
+        data = np.array(self._chunk(int(chunks[0]))[lo:hi])
+
+        records = []
+        for k, i in enumerate(range(start, stop)):
+            record = {}
+            for name, dtype in self.fields.items():
+                offset = int(spans[name][0][k]) - lo
+                nbytes = int(spans[name][1][k])
+                record[name] = data[offset:offset + nbytes].view(dtype).reshape(tuple(self._shapes[name][i]))
+            records.append(record)
+        return records
@@ -0,0 +1,166 @@
+# --------------------------------------------------------
+# Sharded on-disk cache of pre-rendered synthetic samples
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+Synthetic YCB-Video samples rendered offline by tools/prerender_ycb_video.py.
+Each shard is a frame store holding a fixed number of samples; a shard only
+becomes visible to readers once it is complete, so a producer can keep adding
+shards while training reads from the cache. Every shard records the
+settings it was rendered with, the selected classes and the image size, and
+a cache only opens shards whose settings match the training configuration.
+
+    root/
+    |_ shard_00000/
+    |  |_ settings.json
+    |  |_ ...            frame store
+    |_ shard_00001/
+    |_ ...
+"""
+
+import os
+import json
+import shutil
+import numpy as np
+
+from maskrcnn_benchmark.data.datasets.frame_store import FrameStore, FrameStoreWriter
+
+SYNTHETIC_FIELDS = {
+    'image': np.uint8,          # HxWx3 BGR rendering without background
+    'label': np.uint8,          # HxW label in the selected class subset
+    'label_all': np.uint8,      # HxW label in the full class list, 0 is background
+    'poses': np.float32,        # nx7 translation and quaternion of the visible targets
+    'boxes': np.float32,        # nx4
+    'class_ids': np.int32,      # n
+    'ratios': np.float32,       # n occlusion ratios
+}
+
+_SHARD_DIR = 'shard_{:05d}'
+_SETTINGS_FILE = 'settings.json'
+
+
+def cache_settings(classes, height, width):
+    """
+    Settings of the samples in a shard, the selected class indexes and the image size
+    """
+    return {'classes': [int(c) for c in classes], 'height': int(height), 'width': int(width)}
+
+
+def _shard_ids(root):
+    ids = []
+    if not os.path.isdir(root):
+        return ids
+    for name in os.listdir(root):
+        if name.startswith('shard_') and name[len('shard_'):].isdigit():
+            if os.path.exists(os.path.join(root, name, 'index.json')):
+                ids.append(int(name[len('shard_'):]))
+    return sorted(ids)
+
+
+class SyntheticCacheWriter(object):
+    """
+    Write samples into new shards of shard_size samples each, after the existing shards
+
+    Arguments:
+        root (str): cache directory
+        settings (dict): cache_settings of the samples, saved with each shard
+    """
+
+    def __init__(self, root, settings, shard_size=1000):
+        if not os.path.exists(root):
+            os.makedirs(root)
+        self.root = root
+        self.settings = settings
+        self.shard_size = shard_size
+        ids = _shard_ids(root)
+        self._shard_id = ids[-1] + 1 if len(ids) > 0 else 0
+        self._writer = None
+        self._count = 0
+
+    def add(self, sample):
+        if self._writer is None:
+            self._tmp_root = os.path.join(self.root, _SHARD_DIR.format(self._shard_id) + '.tmp')
+            if os.path.exists(self._tmp_root):
+                shutil.rmtree(self._tmp_root)
+            self._writer = FrameStoreWriter(self._tmp_root, SYNTHETIC_FIELDS)
+        self._writer.add(str(self._count), **sample)
+        self._count += 1
+        if self._count == self.shard_size:
+            self._finish_shard()
+
+    def _finish_shard(self):
+        self._writer.close()
+        with open(os.path.join(self._tmp_root, _SETTINGS_FILE), 'w') as f:
+            json.dump(self.settings, f)
+        os.rename(self._tmp_root, os.path.join(self.root, _SHARD_DIR.format(self._shard_id)))
+        self._writer = None
+        self._count = 0
+        self._shard_id += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._finish_shard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class SyntheticCache(object):
+    """
+    Sample pre-rendered synthetic samples uniformly from all shards under root.
+
+    Arguments:
+        root (str): cache directory
+        refresh (int): rescan the directory for new shards every `refresh` samples, 0 to never rescan
+        settings (dict): cache_settings of the training configuration, every shard has to match
+    """
+
+    def __init__(self, root, refresh=0, settings=None):
+        self.root = root
+        self.refresh = refresh
+        self.settings = settings
+        self._shards = {}
+        self._count = 0
+        self._scan()
+        assert len(self) > 0, 'Synthetic cache is empty: {}'.format(root)
+
+    def _scan(self):
+        ids = _shard_ids(self.root)
+        shards = {}
+        for i in ids:
+            if i in self._shards:
+                shards[i] = self._shards[i]
+                continue
+            shard_root = os.path.join(self.root, _SHARD_DIR.format(i))
+            if self.settings is not None:
+                self._check_settings(shard_root)
+            shards[i] = FrameStore(shard_root)
+        self._shards = shards
+        self._ids = ids
+        self._offsets = np.cumsum([0] + [len(shards[i]) for i in ids])
+
+    def _check_settings(self, shard_root):
+        filename = os.path.join(shard_root, _SETTINGS_FILE)
+        settings = None
+        if os.path.exists(filename):
+            with open(filename) as f:
+                settings = json.load(f)
+        assert settings == self.settings, \
+            'synthetic samples in {} were rendered with {}, expected {}'.format(shard_root, settings, self.settings)
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    def __getitem__(self, index):
+        k = int(np.searchsorted(self._offsets, index, side='right')) - 1
+        return self._shards[self._ids[k]][index - int(self._offsets[k])]
+
+    def sample(self, rng=np.random):
+        if self.refresh > 0 and self._count > 0 and self._count % self.refresh == 0:
+            self._scan()
+        self._count += 1
+        return self[rng.randint(len(self))]
@@ -0,0 +1,137 @@
+# --------------------------------------------------------
+# Batched depth augmentation for the tabletop dataset
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+Depth noise and dropout of the tabletop pipeline, applied to a collated batch
+of depth images instead of one image at a time:
+
+    1. multiplicative gamma noise on the depth of each image
+    2. dropout of random ellipses centered on valid pixels
+    3. dropout of random pixels with a beta distributed probability per image
+    4. additive gaussian noise on the point cloud, sampled at 1/gp_rescale_factor
+       of the image size and upsampled bicubically, on valid pixels only
+
+Steps 1-3 run on the depth before backprojection, step 4 on the point cloud.
+The parameters of each image (noise level, number of ellipses, dropout
+probability) are drawn from a numpy random state, the per-pixel noise from a
+torch generator. Both are seeded from `seed` in the main process and from the
+torch worker seed in data loader workers.
+"""
+
+import os
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+
+class DepthAugmentation(object):
+    """
+    Arguments:
+        params (dict): noise parameters, see data_loading_params in tabletop_object_dataset.py
+        seed (int): seed of the random state of the main process
+    """
+
+    def __init__(self, params, seed=0):
+        self.params = params
+        self.seed = seed
+        self._rng = None
+        self._generator = None
+        self._rng_key = None
+
+    def _get_rng(self):
+        info = torch.utils.data.get_worker_info()
+        key = (os.getpid(), info.seed if info is not None else None)
+        if self._rng is None or self._rng_key != key:
+            seed = info.seed % (1 << 32) if info is not None else self.seed
+            self._rng = np.random.RandomState(seed)
+            self._generator = torch.Generator()
+            self._generator.manual_seed(seed)
+            self._rng_key = key
+        return self._rng, self._generator
+
+    def add_noise_to_depth(self, depth):
+        """
+        :param depth: NxHxW depth in meter
+        """
+        rng, _ = self._get_rng()
+        noise = rng.gamma(self.params['gamma_shape'], self.params['gamma_scale'], size=depth.shape[0])
+        return depth * torch.from_numpy(noise).to(depth)[:, None, None]
+
+    def dropout_random_ellipses(self, depth):
+        """
+        :param depth: NxHxW depth in meter, pixels inside the ellipses are set to 0
+        """
+        rng, _ = self._get_rng()
+        N, H, W = depth.shape
+        valid = (depth > 0).view(N, -1)
+        num_valid = valid.sum(1).numpy()
+        num_ellipses = rng.poisson(self.params['ellipse_dropout_mean'], size=N)
+        num_ellipses[num_valid == 0] = 0
+        if num_ellipses.sum() == 0:
+            return depth
+
+        # centers: uniformly drawn valid pixels of the image of each ellipse
+        image = np.repeat(np.arange(N), num_ellipses)
+        pixels = valid.nonzero()[:, 1].numpy()
+        offsets = np.concatenate(([0], np.cumsum(num_valid)[:-1]))
+        center = pixels[offsets[image] + (rng.rand(len(image)) * num_valid[image]).astype(np.int64)]
+        cy = torch.from_numpy(center // W)
+        cx = torch.from_numpy(center % W)
+
+        # radii and angles, each ellipse is rasterized in a window of the largest radius
+        shape = self.params['ellipse_gamma_shape']
+        scale = self.params['ellipse_gamma_scale']
+        radius_x = np.round(rng.gamma(shape, scale, size=len(image)))
+        radius_y = np.round(rng.gamma(shape, scale, size=len(image)))
+        angle = np.radians(rng.randint(0, 360, size=len(image)))
+        R = int(max(radius_x.max(), radius_y.max()))
+        radius_x = torch.from_numpy(np.maximum(radius_x, 0.5)).float()[:, None, None]
+        radius_y = torch.from_numpy(np.maximum(radius_y, 0.5)).float()[:, None, None]
+        cos = torch.from_numpy(np.cos(angle)).float()[:, None, None]
+        sin = torch.from_numpy(np.sin(angle)).float()[:, None, None]
+
+        dy, dx = torch.meshgrid(torch.arange(-R, R + 1), torch.arange(-R, R + 1))
+        dx = dx[None].float()
+        dy = dy[None].float()
+        u = (dx * cos + dy * sin) / radius_x
+        v = (dy * cos - dx * sin) / radius_y
+        y = cy[:, None, None] + dy.long()
+        x = cx[:, None, None] + dx.long()
+        inside = (u * u + v * v <= 1) & (y >= 0) & (y < H) & (x >= 0) & (x < W)
+
+        index = (torch.from_numpy(image)[:, None, None] * H + y) * W + x
+        depth = depth.clone()
+        depth.view(-1)[index[inside]] = 0
+        return depth
+
+    def dropout_random_pixels(self, depth):
+        """
+        :param depth: NxHxW depth in meter, dropped pixels are set to 0
+        """
+        rng, generator = self._get_rng()
+        prob = rng.beta(self.params['pixel_dropout_alpha'], self.params['pixel_dropout_beta'], size=depth.shape[0])
+        prob = torch.from_numpy(prob).to(depth)[:, None, None]
+        drop = torch.rand(depth.shape, generator=generator) < prob
+        return depth.masked_fill(drop, 0)
+
+    def add_noise_to_xyz(self, xyz, depth):
+        """
+        :param xyz: Nx3xHxW point clouds
+        :param depth: NxHxW depth in meter, only pixels with depth > 0 get noise
+        """
+        _, generator = self._get_rng()
+        N, C, H, W = xyz.shape
+        factor = self.params['gp_rescale_factor']
+        noise = torch.randn((N, C, int(H / factor), int(W / factor)), generator=generator) * self.params['gaussian_scale']
+        noise = F.interpolate(noise, size=(H, W), mode='bicubic', align_corners=False).to(xyz)
+        return xyz + noise * (depth > 0)[:, None].to(xyz)
+
+    def augment_depth(self, depth):
+        """
+        Steps 1-3 on NxHxW depth in meter
+        """
+        depth = self.add_noise_to_depth(depth)
+        depth = self.dropout_random_ellipses(depth)
+        return self.dropout_random_pixels(depth)
@@ -0,0 +1,120 @@
+# --------------------------------------------------------
+# Label and camera geometry for the tabletop dataset
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+Numpy helpers of the tabletop dataset that do not depend on its data loading
+modules: reading and instance decomposition of segmentation images, and point clouds of
+depth images backprojected through the cached ray grids of utils/ray_grid.py.
+"""
+
+import numpy as np
+from PIL import Image
+from scipy import ndimage
+
+from maskrcnn_benchmark.utils.ray_grid import backproject, backproject_batch
+
+
+def read_segmentation(filename):
+    """
+    Label image of a segmentation png, the palette indices of an indexed png
+    """
+    im = Image.open(filename)
+    assert im.mode in ('P', 'L', 'I', 'I;16'), \
+        'segmentation {} is not a label image, mode {}'.format(filename, im.mode)
+    return np.array(im)
+
+
+def mask_to_tight_box(mask):
+    a = np.transpose(np.nonzero(mask))
+    bbox = np.min(a[:, 1]), np.min(a[:, 0]), np.max(a[:, 1]), np.max(a[:, 0])
+    return bbox  # x_min, y_min, x_max, y_max
+
+
+def decompose_labels(labels):
+    """ Split a label image into instances in one pass over the pixels
+
+        @param labels: a [H x W] numpy array of nonnegative labels, 0 is background
+        @return: [K x 4] float32 tight boxes (x_min, y_min, x_max, y_max),
+                 [K x H x W] uint8 binary masks and [K] class labels (labels clipped to {1, 2}),
+                 for the K nonzero labels in increasing order
+    """
+    H, W = labels.shape
+
+    # map the labels to {0, ..., K}, with 0 for background
+    unique_labels, inverse = np.unique(labels, return_inverse=True)
+    inverse = inverse.reshape(H, W)
+    if unique_labels[0] == 0:
+        unique_labels = unique_labels[1:]
+    else:
+        inverse += 1
+    num_instances = unique_labels.shape[0]
+    # NOTE: IMAGES WITH BACKGROUND ONLY HAVE NO INSTANCES
+
+    # each foreground pixel sets one entry of the mask stack
+    binary_masks = np.zeros((num_instances, H * W), dtype=np.uint8)
+    pixels = np.flatnonzero(inverse)
+    binary_masks[inverse.ravel()[pixels] - 1, pixels] = 1
+    binary_masks = binary_masks.reshape(num_instances, H, W)
+
+    # tight boxes, the slices of instance i bound the pixels with inverse == i+1
+    boxes = np.zeros((num_instances, 4), dtype=np.float32)
+    for i, (rows, cols) in enumerate(ndimage.find_objects(inverse, max_label=num_instances)):
+        boxes[i] = cols.start, rows.start, cols.stop - 1, rows.stop - 1
+
+    return boxes, binary_masks, unique_labels.clip(1, 2)
+
+
+def camera_intrinsics(camera_params):
+    """ Intrinsic matrix of the camera used
+
+        The y axis points up as in OpenGL, so the row index is flipped:
+        pixel (u, v) looks along ((u - x_offset) / fx, (H - 1 - v - y_offset) / fy, 1)
+
+        @param camera_params: a dictionary with parameters of the camera used 
+    """
+
+    # Compute focal length from camera parameters
+    if 'fx' in camera_params and 'fy' in camera_params:
+        fx = camera_params['fx']
+        fy = camera_params['fy']
+    else: # simulated data
+        aspect_ratio = camera_params['img_width'] / camera_params['img_height']
+        e = 1 / (np.tan(np.radians(camera_params['fov']/2.)))
+        t = camera_params['near'] / e
+        r = t * aspect_ratio; l = -r
+        alpha = camera_params['img_width'] / (r-l) # pixels per meter
+        focal_length = camera_params['near'] * alpha # focal length of virtual camera (frustum camera)
+        fx = focal_length; fy = focal_length
+
+    if 'x_offset' in camera_params and 'y_offset' in camera_params:
+        x_offset = camera_params['x_offset']
+        y_offset = camera_params['y_offset']
+    else: # simulated data
+        x_offset = camera_params['img_width']/2
+        y_offset = camera_params['img_height']/2
+
+    return np.array([[fx, 0, x_offset],
+                     [0, -fy, camera_params['img_height'] - 1 - y_offset],
+                     [0, 0, 1]], dtype=np.float64)
+
+
+def compute_xyz(depth_img, camera_params):
+    """ Compute ordered point cloud from depth image and camera parameters
+
+        @param depth_img: a [H x W] numpy array of depth values in meters
+        @param camera_params: a dictionary with parameters of the camera used 
+        @return: a [H x W x 3] float32 numpy array, the rays of the camera are computed once
+    """
+    return backproject(depth_img, camera_intrinsics(camera_params))
+
+
+def compute_xyz_batch(depth_imgs, camera_params):
+    """ Compute ordered point clouds from a batch of depth images, e.g. after collation
+
+        @param depth_imgs: a [N x H x W] torch tensor of depth values in meters
+        @param camera_params: a dictionary with parameters of the camera used 
+        @return: a [N x 3 x H x W] float32 torch tensor on the device of depth_imgs
+    """
+    return backproject_batch(depth_imgs, camera_intrinsics(camera_params))
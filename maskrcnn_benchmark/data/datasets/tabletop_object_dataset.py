@@ -3,17 +3,21 @@ import torch
 import torchvision
 import cv2
 import glob
+import os
 import numpy as np
 
 from torch.utils.data import Dataset, DataLoader
+from torch.utils.data.sampler import BatchSampler
 
+from maskrcnn_benchmark.data.collate_batch import BatchCollator
+from maskrcnn_benchmark.data.datasets.tabletop_augmentation import DepthAugmentation
+from maskrcnn_benchmark.data.datasets.tabletop_geometry import read_segmentation, decompose_labels, \
+    compute_xyz, compute_xyz_batch
+from maskrcnn_benchmark.data.datasets.tabletop_shards import TabletopShards, SceneShardSampler
 from maskrcnn_benchmark.structures.bounding_box import BoxList
+from maskrcnn_benchmark.structures.image_list import to_image_list
 from maskrcnn_benchmark.structures.segmentation_mask import SegmentationMask
 
-# My libraries
-from maskrcnn_benchmark.data.datasets import data_augmentation
-from maskrcnn_benchmark.data.datasets import util as util_
-
 
 data_loading_params = {
     # Camera/Frustum parameters
@@ -24,6 +28,8 @@ data_loading_params = {
     'fov' : 60, # vertical field of view in angles
     
     'use_data_augmentation' : True,
+    # return depth from __getitem__ and augment it per batch in TabletopBatchCollator
+    'batch_augmentation' : False,
 
     # Multiplicative noise
     'gamma_shape' : 1000.,
@@ -51,64 +57,58 @@ data_loading_params = {
     'use_rgb' : False,
     'use_depth' : True,
 }
+# default scene directory, Tabletop_Object_Dataset takes data_dir or shard_dir to read from elsewhere
 data_dir = '/data/tabletop_dataset_v2/training_set/'
 
 
-
-def compute_xyz(depth_img, camera_params):
-    """ Compute ordered point cloud from depth image and camera parameters
-
-        @param depth_img: a [H x W] numpy array of depth values in meters
-        @param camera_params: a dictionary with parameters of the camera used 
+class TabletopBatchCollator(BatchCollator):
+    """
+    Collate samples of a dataset with 'batch_augmentation', whose images are [1 x H x W] depth in meters,
+    then augment the depth batch and replace it with the point clouds
     """
 
-    # Compute focal length from camera parameters
-    if 'fx' in camera_params and 'fy' in camera_params:
-        fx = camera_params['fx']
-        fy = camera_params['fy']
-    else: # simulated data
-        aspect_ratio = camera_params['img_width'] / camera_params['img_height']
-        e = 1 / (np.tan(np.radians(camera_params['fov']/2.)))
-        t = camera_params['near'] / e; b = -t
-        r = t * aspect_ratio; l = -r
-        alpha = camera_params['img_width'] / (r-l) # pixels per meter
-        focal_length = camera_params['near'] * alpha # focal length of virtual camera (frustum camera)
-        fx = focal_length; fy = focal_length
-
-    if 'x_offset' in camera_params and 'y_offset' in camera_params:
-        x_offset = camera_params['x_offset']
-        y_offset = camera_params['y_offset']
-    else: # simulated data
-        x_offset = camera_params['img_width']/2
-        y_offset = camera_params['img_height']/2
-
-    indices = util_.build_matrix_of_indices(camera_params['img_height'], camera_params['img_width'])
-    indices[..., 0] = np.flipud(indices[..., 0]) # pixel indices start at top-left corner. for OpenGL, it starts at bottom-left
-    z_e = depth_img
-    x_e = (indices[..., 1] - x_offset) * z_e / fx
-    y_e = (indices[..., 0] - y_offset) * z_e / fy
-    xyz_img = np.stack([x_e, y_e, z_e], axis=-1) # Shape: [H x W x 3]
-    
-    return xyz_img
+    def __init__(self, params=data_loading_params, size_divisible=0, seed=0):
+        super(TabletopBatchCollator, self).__init__(size_divisible)
+        self.params = params
+        self.augmentation = DepthAugmentation(params, seed)
 
-def mask_to_tight_box(mask):
-    a = np.transpose(np.nonzero(mask)) 
-    bbox = np.min(a[:, 1]), np.min(a[:, 0]), np.max(a[:, 1]), np.max(a[:, 0])
-    return bbox  # x_min, y_min, x_max, y_max
+    def __call__(self, batch):
+        transposed_batch = list(zip(*batch))
+        depth = torch.cat(transposed_batch[0]) # Shape: [N x H x W]
+        depth = self.augmentation.augment_depth(depth)
+        xyz = compute_xyz_batch(depth, self.params)
+        xyz = self.augmentation.add_noise_to_xyz(xyz, depth)
+        images = to_image_list(tuple(xyz), self.size_divisible)
+        targets = transposed_batch[1]
+        img_ids = transposed_batch[2]
+        return images, targets, img_ids
 
 
 NUM_VIEWS_PER_SCENE = 6 # background only is not trained on
 class Tabletop_Object_Dataset(Dataset):
 
-    def __init__(self, transforms=None):
+    def __init__(self, transforms=None, data_dir=data_dir, shard_dir=None):
         # don't use transforms. that's just to satisfy the API
         self.base_dir = data_dir
         self.params = data_loading_params.copy()
 
-        # Get a list of all scenes
-        self.scene_dirs = sorted(glob.glob(self.base_dir + '*/'))
+        # Get a list of all scenes, from the shard index if the scenes are packed
+        self.shards = None
+        if shard_dir:
+            self.shards = TabletopShards(shard_dir)
+            assert self.shards.num_views >= NUM_VIEWS_PER_SCENE, \
+                'shards have {} views per scene, expected {}'.format(self.shards.num_views, NUM_VIEWS_PER_SCENE)
+            self.scene_dirs = self.shards.scenes
+            self.shard_scenes = self.shards.shard_scenes
+        else:
+            self.scene_dirs = sorted(glob.glob(os.path.join(self.base_dir, '*/')))
+            self.shard_scenes = [np.arange(len(self.scene_dirs))]
         self.len = len(self.scene_dirs) * NUM_VIEWS_PER_SCENE
 
+        # views of the last scene read in this process
+        self._scene_idx = -1
+        self._scene_views = None
+
         self.name = 'TableTop'
 
         # This is not used
@@ -124,6 +124,9 @@ class Tabletop_Object_Dataset(Dataset):
     def process_rgb(self, rgb_img):
         """ Process RGB image
         """
+        # the numpy augmentation library is only needed by the per-sample path
+        from maskrcnn_benchmark.data.datasets import data_augmentation
+
         rgb_img = rgb_img.astype(np.float32)
         rgb_img = data_augmentation.BGR_image(rgb_img)
         rgb_img = data_augmentation.array_to_tensor(rgb_img)
@@ -142,6 +145,12 @@ class Tabletop_Object_Dataset(Dataset):
         # millimeters -> meters
         depth_img = (depth_img / 1000.).astype(np.float32)
 
+        # augmentation and xyz are computed per batch
+        if self.params['use_data_augmentation'] and self.params['batch_augmentation']:
+            return torch.from_numpy(depth_img)[None] # Shape: [1 x H x W]
+
+        from maskrcnn_benchmark.data.datasets import data_augmentation
+
         # add random noise to depth
         if self.params['use_data_augmentation']:
             depth_img = data_augmentation.add_noise_to_depth(depth_img, self.params)
@@ -160,66 +169,61 @@ class Tabletop_Object_Dataset(Dataset):
 
     def process_label(self, labels):
         """ Process labels
-                - Map the labels to [H x W x num_instances] numpy array
+                - Map the labels to a [num_instances x H x W] uint8 tensor of binary masks
         """
-        H, W = labels.shape
-
-        # Find the unique (nonnegative) labels, map them to {0, ..., K-1}
-        unique_nonnegative_indices = np.unique(labels)
-
-        # Drop 0 if it's in there
-        if 0 == unique_nonnegative_indices[0]:
-            unique_nonnegative_indices = unique_nonnegative_indices[1:]
-        num_instances = unique_nonnegative_indices.shape[0]
-        # NOTE: IMAGES WITH BACKGROUND ONLY HAVE NO INSTANCES
-
-        # Get binary masks
-        binary_masks = np.zeros((H, W, num_instances), dtype=np.float32)
-        for i, label in enumerate(unique_nonnegative_indices):
-            binary_masks[..., i] = (labels == label).astype(np.float32)
-
-        # Get bounding boxes
-        boxes = np.zeros((num_instances, 4))
-        for i in range(num_instances):
-            boxes[i, :] = np.array(mask_to_tight_box(binary_masks[..., i]))
-
-        # Get labels for each mask
-        labels = unique_nonnegative_indices.clip(1,2)
+        boxes, binary_masks, labels = decompose_labels(labels)
 
         # Turn them into torch tensors
-        boxes = data_augmentation.array_to_tensor(boxes)
-        binary_masks = data_augmentation.array_to_tensor(binary_masks)
-        labels = data_augmentation.array_to_tensor(labels).long()
+        boxes = torch.from_numpy(boxes)
+        binary_masks = torch.from_numpy(binary_masks)
+        labels = torch.from_numpy(labels).long()
 
         return boxes, binary_masks, labels
 
+    def read_view(self, scene_idx, view_num, name):
+        """ Read the 'segmentation', 'rgb' (RGB order) or 'depth' (millimeters) image of a view
+        """
+        if self.shards is not None:
+            return self.read_scene(scene_idx)[view_num - 1][name]
+
+        scene_dir = self.scene_dirs[scene_idx]
+        if name == 'segmentation':
+            return read_segmentation(scene_dir + f"segmentation_{view_num:05d}.png")
+        if name == 'rgb':
+            return cv2.cvtColor(cv2.imread(scene_dir + f"rgb_{view_num:05d}.jpeg"), cv2.COLOR_BGR2RGB)
+        return cv2.imread(scene_dir + f"depth_{view_num:05d}.png", cv2.IMREAD_ANYDEPTH)
+
+    def read_scene(self, scene_idx):
+        """ Read all views of a packed scene with one copy, a list of dicts of 'segmentation', 'rgb'
+            and 'depth' images for views 1..NUM_VIEWS_PER_SCENE.
+            The last scene is kept, so the consecutive views of a scene cost a single read
+        """
+        if scene_idx != self._scene_idx:
+            self._scene_views = self.shards.get_scene(scene_idx)[:NUM_VIEWS_PER_SCENE]
+            self._scene_idx = scene_idx
+        return self._scene_views
+
     def __getitem__(self, idx):
 
         cv2.setNumThreads(0) # some hack to make sure pyTorch doesn't deadlock. Found at https://github.com/pytorch/pytorch/issues/1355. Seems to work for me
 
-        # Get scene directory
+        # Get scene index and view number
         scene_idx = idx // NUM_VIEWS_PER_SCENE
-        scene_dir = self.scene_dirs[scene_idx]
-
-        # Get view number
         view_num = idx % NUM_VIEWS_PER_SCENE + 1 # view_num=0 is always background with no table/objects
 
         # Label
-        seg_img_filename = scene_dir + f"segmentation_{view_num:05d}.png"
-        seg_img = util_.imread_indexed(seg_img_filename)
+        seg_img = self.read_view(scene_idx, view_num, 'segmentation')
         boxes, binary_masks, labels = self.process_label(seg_img)
         # boxes.shape: [num_instances x 4], binary_masks.shape: [num_instances x H x W], labels.shape: [num_instances]
 
         # RGB image
         if self.params['use_rgb']:
-            rgb_img_filename = scene_dir + f"rgb_{view_num:05d}.jpeg"
-            rgb_img = cv2.cvtColor(cv2.imread(rgb_img_filename), cv2.COLOR_BGR2RGB)
+            rgb_img = self.read_view(scene_idx, view_num, 'rgb')
             img = self.process_rgb(rgb_img) # Shape: [3 x H x W]
 
         # Depth image
         if self.params['use_depth']:
-            depth_img_filename = scene_dir + f"depth_{view_num:05d}.png"
-            depth_img = cv2.imread(depth_img_filename, cv2.IMREAD_ANYDEPTH) # This reads a 16-bit single-channel image. Shape: [H x W]
+            depth_img = self.read_view(scene_idx, view_num, 'depth') # 16-bit single-channel image. Shape: [H x W]
             img = self.process_depth(depth_img, labels) # Shape: [3 x H x W]
 
         # Create BoxList stuff
@@ -241,3 +245,22 @@ class Tabletop_Object_Dataset(Dataset):
                 "idx": idx
                }
 
+
+def make_scene_data_loader(dataset, images_per_batch, num_workers=4, multi_view=False, shuffle=True, seed=0,
+                           collator=None):
+    """ Data loader visiting the scenes of a tabletop dataset shard by shard, with the views
+        of a scene as consecutive samples
+
+        @param dataset: a Tabletop_Object_Dataset
+        @param images_per_batch: batch size
+        @param multi_view: batches hold all views of images_per_batch / NUM_VIEWS_PER_SCENE scenes,
+                           the scene of image idx is idx // NUM_VIEWS_PER_SCENE
+        @param collator: collate_fn, defaults to BatchCollator
+    """
+    if multi_view:
+        assert images_per_batch % NUM_VIEWS_PER_SCENE == 0, \
+            'multi-view batches need a multiple of {} images, got {}'.format(NUM_VIEWS_PER_SCENE, images_per_batch)
+    sampler = SceneShardSampler(dataset.shard_scenes, NUM_VIEWS_PER_SCENE, shuffle=shuffle, seed=seed)
+    batch_sampler = BatchSampler(sampler, images_per_batch, drop_last=False)
+    return DataLoader(dataset, batch_sampler=batch_sampler, num_workers=num_workers,
+                      collate_fn=collator if collator is not None else BatchCollator())
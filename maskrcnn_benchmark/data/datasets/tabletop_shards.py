@@ -0,0 +1,144 @@
+# --------------------------------------------------------
+# Packed scene shards for the tabletop dataset
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+The views of the tabletop scenes are packed by tools/pack_tabletop.py into
+shards of a fixed number of scenes. Each shard is a frame store with one
+record per view, keyed '<scene>/<view>', and the records of a scene are
+contiguous. A shard root looks like
+
+    root/
+    |_ shards.json       number of views per scene, and the scenes of each shard
+    |_ shard_00000/      frame store, fields
+    |                      depth         (H, W) uint16, millimeters
+    |                      segmentation  (H, W) uint8
+    |                      rgb           (H, W, 3) uint8 in RGB order, optional
+    |_ ...
+
+SceneShardSampler shuffles shards and the scenes within a shard, so the views
+of a scene and the scenes of a shard are read sequentially, and get_scene
+reads all views of a scene with one copy.
+"""
+
+import os
+import json
+import numpy as np
+from torch.utils.data.sampler import Sampler
+
+from maskrcnn_benchmark.data.datasets.frame_store import FrameStore
+
+_INDEX_FILE = 'shards.json'
+_SHARD_DIR = 'shard_{:05d}'
+
+
+def view_key(scene, view_num):
+    return '{}/{:05d}'.format(scene, view_num)
+
+
+def write_index(root, num_views, shard_scenes):
+    """
+    :param shard_scenes: list of the scene names of each shard
+    """
+    index = {'num_views': num_views,
+             'shards': [{'name': _SHARD_DIR.format(i), 'scenes': scenes} for i, scenes in enumerate(shard_scenes)]}
+    with open(os.path.join(root, _INDEX_FILE), 'w') as f:
+        json.dump(index, f, indent=2)
+
+
+class TabletopShards(object):
+    """
+    Read-only access to the views of packed tabletop scenes. Shards are opened on first use.
+
+    Arguments:
+        root (str): shard root written by tools/pack_tabletop.py
+    """
+
+    def __init__(self, root):
+        index_file = os.path.join(root, _INDEX_FILE)
+        assert os.path.exists(index_file), \
+            'Tabletop shards do not exist: {}'.format(root)
+        with open(index_file) as f:
+            index = json.load(f)
+
+        self.root = root
+        self.num_views = index['num_views']
+        self.shard_names = [s['name'] for s in index['shards']]
+        self.scenes = []
+        self.shard_scenes = []
+        for s in index['shards']:
+            start = len(self.scenes)
+            self.scenes.extend(s['scenes'])
+            self.shard_scenes.append(np.arange(start, len(self.scenes)))
+        self._scene_shard = np.zeros((len(self.scenes), ), dtype=np.int32)
+        for i, scenes in enumerate(self.shard_scenes):
+            self._scene_shard[scenes] = i
+        self._stores = [None] * len(self.shard_names)
+
+    def __len__(self):
+        return len(self.scenes)
+
+    def _store(self, shard):
+        if self._stores[shard] is None:
+            self._stores[shard] = FrameStore(os.path.join(self.root, self.shard_names[shard]))
+        return self._stores[shard]
+
+    def has_field(self, name):
+        return len(self.shard_names) > 0 and name in self._store(0).fields
+
+    def get(self, scene_idx, view_num, name):
+        """
+        Field `name` of view `view_num` of scene `scene_idx`, as a read-only array view
+        """
+        store = self._store(self._scene_shard[scene_idx])
+        return store.get(store.index(view_key(self.scenes[scene_idx], view_num)), name)
+
+    def get_scene(self, scene_idx):
+        """
+        All views of scene `scene_idx`, a list of dicts of field -> array for views 1..num_views
+        """
+        store = self._store(self._scene_shard[scene_idx])
+        start = store.index(view_key(self.scenes[scene_idx], 1))
+        return store.get_records(start, start + self.num_views)
+
+
+class SceneShardSampler(Sampler):
+    """
+    Visit the shards in a random order, the scenes of a shard in a random order,
+    and all views of a scene consecutively
+
+    Arguments:
+        shard_scenes (list[array]): scene indexes of each shard, e.g. TabletopShards.shard_scenes,
+            or a single shard of all scenes for unpacked data
+        num_views (int): views per scene in the dataset, sample i is view i % num_views of scene i // num_views
+        shuffle (bool): shuffle shards and scenes, otherwise visit them in the stored order
+        seed (int): seed of the order, combined with the epoch. Each pass over the sampler
+            advances the epoch, set_epoch restarts from a given epoch, e.g. when resuming
+    """
+
+    def __init__(self, shard_scenes, num_views, shuffle=True, seed=0):
+        self.shard_scenes = shard_scenes
+        self.num_views = num_views
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+
+    def scene_order(self):
+        rng = np.random.RandomState(self.seed + self.epoch)
+        shard_order = rng.permutation(len(self.shard_scenes)) if self.shuffle else np.arange(len(self.shard_scenes))
+        scenes = [self.shard_scenes[i] for i in shard_order]
+        if self.shuffle:
+            scenes = [rng.permutation(s) for s in scenes]
+        return np.concatenate(scenes) if len(scenes) > 0 else np.zeros((0, ), dtype=np.int64)
+
+    def __iter__(self):
+        order = self.scene_order()[:, None] * self.num_views + np.arange(self.num_views)[None, :]
+        self.epoch += 1
+        return iter(order.ravel().tolist())
+
+    def __len__(self):
+        return sum(len(s) for s in self.shard_scenes) * self.num_views
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
@@ -6,37 +6,45 @@ import sys
 import os.path as osp
 from os.path import *
 import numpy as np
-import numpy.random as npr
 import cv2
-import pickle as cPickle
-import scipy.io
-import copy
 import glob
 
+from maskrcnn_benchmark.data.datasets.frame_store import FrameStore
+from maskrcnn_benchmark.data.datasets.ycb_video_meta import YCBVideoMeta
+from maskrcnn_benchmark.data.datasets.ycb_video_models import YCBVideoModels
+from maskrcnn_benchmark.data.datasets.ycb_video_split import image_set_file, load_image_set, VideoClassIndex
+from maskrcnn_benchmark.data.datasets.synthetic_cache import SyntheticCache, cache_settings
+from maskrcnn_benchmark.data.datasets.background_pool import BackgroundPool, build_manifest, load_manifest
 from maskrcnn_benchmark.structures.bounding_box import BoxList
 from maskrcnn_benchmark.structures.segmentation_mask import SegmentationMask
-from maskrcnn_benchmark.utils.blob import pad_im, chromatic_transform, add_noise, add_noise_cuda
+from maskrcnn_benchmark.utils.blob import pad_im, chromatic_transform, add_noise, add_noise_tensor
 from maskrcnn_benchmark.utils.se3 import *
+from maskrcnn_benchmark.utils.se3_batch import quat2mat_batch, euler2quat_batch
 from maskrcnn_benchmark.utils.pose_error import *
-from transforms3d.quaternions import mat2quat, quat2mat
-from maskrcnn_benchmark.ycb_render.ycb_renderer import YCBRenderer
-
-def VOCap(rec, prec):
-    index = np.where(np.isfinite(rec))[0]
-    rec = rec[index]
-    prec = prec[index]
-    if len(rec) == 0 or len(prec) == 0:
-        ap = 0
-    else:
-        mrec = np.insert(rec, 0, 0)
-        mrec = np.append(mrec, 0.1)
-        mpre = np.insert(prec, 0, 0)
-        mpre = np.append(mpre, prec[-1])
-        for i in range(1, len(mpre)):
-            mpre[i] = max(mpre[i], mpre[i-1])
-        i = np.where(mrec[1:] != mrec[:-1])[0] + 1
-        ap = np.sum(np.multiply(mrec[i] - mrec[i-1], mpre[i])) * 10
-    return ap
+from maskrcnn_benchmark.utils.occlusion import occlusion_ratios_torch
+from maskrcnn_benchmark.utils.ray_grid import backproject
+
+def instance_masks(im_label, values, boxes=None):
+    """
+    Binary masks of shape (n, H, W) in uint8, mask i is im_label == values[i].
+    If boxes (n, 4) of integer x1, y1, x2, y2 are given, mask i is restricted to [y1:y2, x1:x2].
+    """
+    values = np.asarray(values).reshape(-1)
+    height, width = im_label.shape[:2]
+    if len(values) == 0:
+        return np.zeros((0, height, width), dtype=np.uint8)
+
+    masks = im_label[np.newaxis, :, :] == values[:, np.newaxis, np.newaxis]
+    if boxes is not None:
+        boxes = np.asarray(boxes).reshape(-1, 4)
+        rows = np.arange(height)
+        cols = np.arange(width)
+        in_rows = (rows[np.newaxis, :] >= boxes[:, 1:2]) & (rows[np.newaxis, :] < boxes[:, 3:4])
+        in_cols = (cols[np.newaxis, :] >= boxes[:, 0:1]) & (cols[np.newaxis, :] < boxes[:, 2:3])
+        masks &= in_rows[:, :, np.newaxis]
+        masks &= in_cols[:, np.newaxis, :]
+    return masks.view(np.uint8)
+
 
 class YCBVideoDataset(data.Dataset):
     def __init__(self, cfg, image_set, data_dir, transforms=None):
@@ -65,6 +73,7 @@ class YCBVideoDataset(data.Dataset):
 
         self._width = 640
         self._height = 480
+        self._depth_factor = 10000.0
         self._intrinsic_matrix = np.array([[1.066778e+03, 0.000000e+00, 3.129869e+02],
                                           [0.000000e+00, 1.067487e+03, 2.413109e+02],
                                           [0.000000e+00, 0.000000e+00, 1.000000e+00]])
@@ -75,9 +84,18 @@ class YCBVideoDataset(data.Dataset):
         self._class_colors = [self._class_colors_all[i] for i in self.cfg.TRAIN.CLASSES]
         self._symmetry = self._symmetry_all[list(self.cfg.TRAIN.CLASSES)]
         self._extents = self._extents_all[list(self.cfg.TRAIN.CLASSES)]
-        self._points, self._points_all, self._point_blob, self._points_clamp = self._load_object_points()
+
+        # lookup tables from label image colors to class indexes, and from class indexes to the selected subset
+        codes = np.array([c[0] + 256*c[1] + 256*256*c[2] for c in self._class_colors_all[1:]], dtype=np.int32)
+        order = np.argsort(codes)
+        self._label_codes = codes[order]
+        self._label_code_classes = (np.arange(1, self._num_classes_all, dtype=np.int32))[order]
+        self._class_to_subset = np.zeros((self._num_classes_all, ), dtype=np.int32)
+        self._class_to_subset[list(self.cfg.TRAIN.CLASSES)] = np.arange(len(self.cfg.TRAIN.CLASSES))
+        self._models = YCBVideoModels(os.path.join(self._ycb_video_path, 'models'), os.path.join(self.cache_path, 'models'))
+        self._points_box = self._load_box_points()
         self._PIXEL_MEANS = np.array([[[102.9801, 115.9465, 122.7717]]])
-        self._pixel_mean = torch.tensor(self._PIXEL_MEANS / 255.0).cuda().float()
+        self._pixel_mean = torch.tensor(self._PIXEL_MEANS).float()
 
         self._classes_other = []
         for i in range(self._num_classes_all):
@@ -101,35 +119,54 @@ class YCBVideoDataset(data.Dataset):
 
         self._class_to_ind = dict(zip(self._classes, range(self._num_classes)))
         self._image_ext = '.png'
-        self._image_index = self._load_image_set_index(image_set)
-
-        if (self.cfg.MODE == 'TRAIN' and self.cfg.TRAIN.SYNTHESIZE) or (self.cfg.MODE == 'TEST' and self.cfg.TEST.SYNTHESIZE):
-            self._size = len(self._image_index) * (self.cfg.TRAIN.SYN_RATIO+1)
-        else:
-            self._size = len(self._image_index)
-        if self._size > self.cfg.TRAIN.MAX_ITERS_PER_EPOCH * self.cfg.SOLVER.IMS_PER_BATCH:
-            self._size = self.cfg.TRAIN.MAX_ITERS_PER_EPOCH * self.cfg.SOLVER.IMS_PER_BATCH
+        self._meta = self._load_meta_cache(image_set)
+        self._image_index = self._meta.keys
+
+        # packed frames
+        self._frame_store = None
+        if self.cfg.FRAME_STORE:
+            self._frame_store = FrameStore(os.path.join(self.cfg.FRAME_STORE, image_set))
+            print('{} frames loaded from frame store {}'.format(len(self._frame_store), self._frame_store.root))
+
+        self._synthesize = (self.cfg.MODE == 'TRAIN' and self.cfg.TRAIN.SYNTHESIZE) or (self.cfg.MODE == 'TEST' and self.cfg.TEST.SYNTHESIZE)
+        assert not (self._synthesize and self.cfg.INPUT_DEPTH), 'depth input is only supported for real frames'
+        self._size = self._num_samples(len(self._image_index))
+
+        # pre-rendered synthetic samples
+        self._syn_cache = None
+        if self._synthesize and self.cfg.TRAIN.SYN_CACHE:
+            self._syn_cache = SyntheticCache(self.cfg.TRAIN.SYN_CACHE, self.cfg.TRAIN.SYN_CACHE_REFRESH,
+                                             self.synthetic_cache_settings())
+            print('{} synthetic samples loaded from {}'.format(len(self._syn_cache), self.cfg.TRAIN.SYN_CACHE))
         self._roidb = self.gt_roidb()
+
+        # the frame of a sample only depends on its index, the order is fixed for the lifetime of the dataset
+        # and every frame has an index, so each epoch of the sampler visits all real frames
         if self.cfg.MODE == 'TRAIN' or self.cfg.TEST.VISUALIZE:
-            self._perm = np.random.permutation(np.arange(len(self._roidb)))
+            self._perm = np.random.RandomState(self.cfg.TRAIN.RNG_SEED).permutation(len(self._roidb))
         else:
             self._perm = np.arange(len(self._roidb))
-        self._cur = 0
-        if self.cfg.MODE == 'TRAIN' or (self.cfg.MODE == 'TEST' and self.cfg.TEST.SYNTHESIZE == True):
+
+        # random state of the process, created on first use in each data loader worker
+        self._rng = None
+        self._rng_key = None
+        if self._synthesize:
             self._build_background_images()
         self._build_uniform_poses()
 
         # poses from the dataset
-        if self.cfg.MODE == 'TRAIN' or (self.cfg.MODE == 'TEST' and self.cfg.TEST.SYNTHESIZE == True):
+        if self._synthesize and self._syn_cache is None:
             self._poses = self._load_all_poses()
-            self._pose_indexes = np.zeros((self._num_classes-1, ), dtype=np.int32)
+            self._pose_indexes = np.array([len(p) for p in self._poses], dtype=np.int32)
 
         assert os.path.exists(self._ycb_video_path), \
                 'ycb_video path does not exist: {}'.format(self._ycb_video_path)
         assert os.path.exists(self._data_path), \
                 'Data path does not exist: {}'.format(self._data_path)
 
-        if self.cfg.MODE == 'TRAIN':
+        # the renderer needs a GPU, it is only created for synthetic data without a cache
+        if self._synthesize and self._syn_cache is None:
+            from maskrcnn_benchmark.ycb_render.ycb_renderer import YCBRenderer
             print('loading 3D models')
             self.renderer = YCBRenderer(width=self.cfg.TRAIN.SYN_WIDTH, height=self.cfg.TRAIN.SYN_HEIGHT, gpu_id=1, render_marker=False)
             self.renderer.load_objects(self.model_mesh_paths, self.model_texture_paths, self.model_colors)
@@ -163,52 +200,56 @@ class YCBVideoDataset(data.Dataset):
 
     # backproject pixels into 3D points in camera's coordinate system
     def backproject(self, depth_cv, intrinsic_matrix, factor):
+        return backproject(depth_cv, intrinsic_matrix, factor)
 
-        depth = depth_cv.astype(np.float32, copy=True) / factor
-
-        index = np.where(~np.isfinite(depth))
-        depth[index[0], index[1]] = 0
-
-        # get intrinsic matrix
-        K = intrinsic_matrix
-        Kinv = np.linalg.inv(K)
 
-        # compute the 3D points
-        width = depth.shape[1]
-        height = depth.shape[0]
+    def _build_uniform_poses(self):
+        """
+        Table of the (yaw, pitch, roll) grid with UNIFORM_POSE_INTERVAL degrees spacing, in radians
+        """
+        interval = self.cfg.TRAIN.UNIFORM_POSE_INTERVAL
+        yaw, pitch, roll = np.meshgrid(np.arange(-180, 180, interval), np.arange(-90, 90, interval),
+                                       np.arange(-180, 180, interval), indexing='ij')
+        eulers = np.stack((yaw.ravel(), pitch.ravel(), roll.ravel()), axis=1)
+        self._uniform_eulers = (eulers * (math.pi / 180.0)).astype(np.float32)
 
-        # construct the 2D points matrix
-        x, y = np.meshgrid(np.arange(width), np.arange(height))
-        ones = np.ones((height, width), dtype=np.float32)
-        x2d = np.stack((x, y, ones), axis=2).reshape(width*height, 3)
 
-        # backprojection
-        R = np.dot(Kinv, x2d.transpose())
+    def _sample_uniform_rotations(self, num, rng):
+        """
+        Quaternions of num rotations drawn from the uniform pose table with 15 degrees of jitter.
+        Draws are independent, so the sampler keeps no state between samples
+        """
+        eulers = self._uniform_eulers[rng.randint(len(self._uniform_eulers), size=num)]
+        eulers = eulers + (15 * math.pi / 180.0) * rng.randn(num, 3)
+        return euler2quat_batch(eulers[:, 0], eulers[:, 1], eulers[:, 2], 'syxz').astype(np.float32)
 
-        # compute the 3D points
-        X = np.multiply(np.tile(depth.reshape(1, width*height), (3, 1)), R)
-        return np.array(X).transpose().reshape((height, width, 3))
 
+    def _build_background_images(self):
+        """
+        Load the validated list of background images, walking the background directories only the first time
+        """
 
-    def _build_uniform_poses(self):
+        if self.cfg.TRAIN.SYN_BACKGROUND_SPECIFIC:
+            manifest_file = os.path.join(self.cache_path, 'backgrounds_allencenter.json')
+        else:
+            manifest_file = os.path.join(self.cache_path, 'backgrounds_pascal.json')
 
-        self.eulers = []
-        interval = self.cfg.TRAIN.UNIFORM_POSE_INTERVAL
-        for yaw in range(-180, 180, interval):
-            for pitch in range(-90, 90, interval):
-                for roll in range(-180, 180, interval):
-                    self.eulers.append([yaw, pitch, roll])
+        if os.path.exists(manifest_file):
+            manifest = load_manifest(manifest_file)
+            print('background manifest loaded from {}'.format(manifest_file))
+        else:
+            backgrounds_color, backgrounds_depth = self._list_background_images()
+            manifest = build_manifest(manifest_file, backgrounds_color, backgrounds_depth)
 
-        # sample indexes
-        num_poses = len(self.eulers)
-        num_classes = len(self._classes_all) - 1 # no background
-        self.pose_indexes = np.zeros((num_classes, ), dtype=np.int32)
-        self.pose_lists = []
-        for i in range(num_classes):
-            self.pose_lists.append(np.random.permutation(np.arange(num_poses)))
+        self._backgrounds_color = manifest['color']
+        self._backgrounds_depth = manifest['depth']
+        self._background_pool = BackgroundPool(self._backgrounds_color, self.cfg.TRAIN.SYN_HEIGHT, self.cfg.TRAIN.SYN_WIDTH,
+                                               self.cfg.TRAIN.SYN_BACKGROUND_CACHE_SIZE)
+        print('build color background images finished, {:d} images'.format(len(self._backgrounds_color)))
+        print('build depth background images finished, {:d} images'.format(len(self._backgrounds_depth)))
 
 
-    def _build_background_images(self):
+    def _list_background_images(self):
 
         backgrounds_color = []
         backgrounds_depth = []
@@ -283,22 +324,64 @@ class YCBVideoDataset(data.Dataset):
                 filename = os.path.join(self.cache_path, '../Kinect', subdir, files[j])
                 backgrounds_depth.append(filename)
 
-        for i in range(len(backgrounds_color)):
-            if not os.path.isfile(backgrounds_color[i]):
-                print('file not exist {}'.format(backgrounds_color[i]))
+        return backgrounds_color, backgrounds_depth
+
+
+    def _num_samples(self, num_frames):
+        """
+        One index per real frame, followed by SYN_RATIO synthetic indexes when synthesizing.
+        The index space is not capped, a capped one would leave the frames mapped to the
+        cut indexes unreachable in every epoch. Training length is set by SOLVER.MAX_ITER
+        """
+        if self._synthesize:
+            return num_frames * (self.cfg.TRAIN.SYN_RATIO+1)
+        return num_frames
 
-        for i in range(len(backgrounds_depth)):
-            if not os.path.isfile(backgrounds_depth[i]):
-                print('file not exist {}'.format(backgrounds_depth[i]))
 
-        self._backgrounds_color = backgrounds_color
-        self._backgrounds_depth = backgrounds_depth
-        print('build color background images finished, {:d} images'.format(len(backgrounds_color)))
-        print('build depth background images finished, {:d} images'.format(len(backgrounds_depth)))
+    def _get_rng(self):
+        """
+        Random state of the current process. Data loader workers seed their own state from the
+        worker seed, which torch derives from the base seed of each loader iterator and the worker id,
+        so workers never replay each other and every epoch draws new samples
+        """
+        info = torch.utils.data.get_worker_info()
+        key = (os.getpid(), info.seed if info is not None else None)
+        if self._rng is None or self._rng_key != key:
+            if info is not None:
+                seed = info.seed % (1 << 32)
+            else:
+                seed = self.cfg.TRAIN.RNG_SEED
+            self._rng = np.random.RandomState(seed)
+            self._rng_key = key
+
+            # restart the pose cursors so that each process shuffles its own pose order
+            if self._synthesize and self._syn_cache is None:
+                self._pose_indexes[:] = [len(p) for p in self._poses]
+        return self._rng
 
 
     def _render_item(self):
 
+        if self._syn_cache is not None:
+            sample = self._syn_cache.sample(self._get_rng())
+        else:
+            sample = self._render_sample()
+        return self._compose_sample(sample)
+
+
+    def synthetic_cache_settings(self):
+        """
+        Settings that samples of a synthetic cache have to be rendered with for this dataset
+        """
+        return cache_settings(self.cfg.TRAIN.CLASSES, self.cfg.TRAIN.SYN_HEIGHT, self.cfg.TRAIN.SYN_WIDTH)
+
+
+    def _render_sample(self):
+        """
+        Render a synthetic scene without background. Returns the uint8 BGR image, the label images
+        and the poses, boxes, class ids and occlusion ratios of the visible targets
+        """
+
         height = self.cfg.TRAIN.SYN_HEIGHT
         width = self.cfg.TRAIN.SYN_WIDTH
         fx = self._intrinsic_matrix[0, 0]
@@ -308,12 +391,13 @@ class YCBVideoDataset(data.Dataset):
         zfar = 6.0
         znear = 0.01
         classes = np.array(self.cfg.TRAIN.CLASSES)
+        rng = self._get_rng()
 
         # sample target objects
         if self.cfg.TRAIN.SYN_SAMPLE_OBJECT:
             maxnum = np.minimum(self.num_classes-1, self.cfg.TRAIN.SYN_MAX_OBJECT)
-            num = np.random.randint(self.cfg.TRAIN.SYN_MIN_OBJECT, maxnum+1)
-            perm = np.random.permutation(np.arange(self.num_classes-1))
+            num = rng.randint(self.cfg.TRAIN.SYN_MIN_OBJECT, maxnum+1)
+            perm = rng.permutation(np.arange(self.num_classes-1))
             indexes_target = perm[:num] + 1
         else:
             num = self.num_classes - 1
@@ -323,13 +407,14 @@ class YCBVideoDataset(data.Dataset):
 
         # sample other objects as distractors
         num_other = min(5, self._num_classes_other)
-        perm = np.random.permutation(np.arange(self._num_classes_other))
+        perm = rng.permutation(np.arange(self._num_classes_other))
         indexes = perm[:num_other]
         for i in range(num_other):
             cls_indexes.append(self._classes_other[indexes[i]]-1)
 
         # sample poses
         num = num_target + num_other
+        quats_uniform = self._sample_uniform_rotations(num, rng)
         poses_all = []
         for i in range(num):
             qt = np.zeros((7, ), dtype=np.float32)
@@ -342,76 +427,69 @@ class YCBVideoDataset(data.Dataset):
                 cls_ind = int(cls_ind) - 1
                 if self._pose_indexes[cls_ind] >= len(self._poses[cls_ind]):
                     self._pose_indexes[cls_ind] = 0
-                    pindex = np.random.permutation(np.arange(len(self._poses[cls_ind])))
+                    pindex = rng.permutation(np.arange(len(self._poses[cls_ind])))
                     self._poses[cls_ind] = self._poses[cls_ind][pindex]
                 ind = self._pose_indexes[cls_ind]
                 pose = self._poses[cls_ind][ind, :]
-                euler = pose[:3] + (self.cfg.TRAIN.SYN_STD_ROTATION * math.pi / 180.0) * np.random.randn(3)
+                euler = pose[:3] + (self.cfg.TRAIN.SYN_STD_ROTATION * math.pi / 180.0) * rng.randn(3)
                 qt[3:] = euler2quat(euler[0], euler[1], euler[2])
                 self._pose_indexes[cls_ind] += 1
 
-                qt[0] = pose[3] + np.random.uniform(-0.1, 0.1)
-                qt[1] = pose[4] + np.random.uniform(-0.1, 0.1)
-                qt[2] = pose[5] + np.random.uniform(-0.1, 0.1)
+                qt[0] = pose[3] + rng.uniform(-0.1, 0.1)
+                qt[1] = pose[4] + rng.uniform(-0.1, 0.1)
+                qt[2] = pose[5] + rng.uniform(-0.1, 0.1)
 
             else:
                 # uniformly sample poses
-                if self.pose_indexes[cls] >= len(self.pose_lists[cls]):
-                    self.pose_indexes[cls] = 0
-                    self.pose_lists[cls] = np.random.permutation(np.arange(len(self.eulers)))
-                yaw = self.eulers[self.pose_lists[cls][self.pose_indexes[cls]]][0] + 15 * np.random.randn()
-                pitch = self.eulers[self.pose_lists[cls][self.pose_indexes[cls]]][1] + 15 * np.random.randn()
-                roll = self.eulers[self.pose_lists[cls][self.pose_indexes[cls]]][2] + 15 * np.random.randn()
-                qt[3:] = euler2quat(yaw * math.pi / 180.0, pitch * math.pi / 180.0, roll * math.pi / 180.0, 'syxz')
-                self.pose_indexes[cls] += 1
+                qt[3:] = quats_uniform[i]
 
                 # translation
                 bound = self.cfg.TRAIN.SYN_BOUND
-                if i == 0 or i >= num_target or np.random.rand(1) > 0.5:
-                    qt[0] = np.random.uniform(-bound, bound)
-                    qt[1] = np.random.uniform(-bound, bound)
-                    qt[2] = np.random.uniform(self.cfg.TRAIN.SYN_TNEAR, self.cfg.TRAIN.SYN_TFAR)
+                if i == 0 or i >= num_target or rng.rand(1) > 0.5:
+                    qt[0] = rng.uniform(-bound, bound)
+                    qt[1] = rng.uniform(-bound, bound)
+                    qt[2] = rng.uniform(self.cfg.TRAIN.SYN_TNEAR, self.cfg.TRAIN.SYN_TFAR)
                 else:
                     # sample an object nearby
-                    object_id = np.random.randint(0, i, size=1)[0]
+                    object_id = rng.randint(0, i, size=1)[0]
                     extent = np.mean(self._extents_all[cls+1, :])
 
-                    flag = np.random.randint(0, 2)
+                    flag = rng.randint(0, 2)
                     if flag == 0:
                         flag = -1
-                    qt[0] = poses_all[object_id][0] + flag * extent * np.random.uniform(1.0, 1.5)
+                    qt[0] = poses_all[object_id][0] + flag * extent * rng.uniform(1.0, 1.5)
                     if np.absolute(qt[0]) > bound:
-                        qt[0] = poses_all[object_id][0] - flag * extent * np.random.uniform(1.0, 1.5)
+                        qt[0] = poses_all[object_id][0] - flag * extent * rng.uniform(1.0, 1.5)
                     if np.absolute(qt[0]) > bound:
-                        qt[0] = np.random.uniform(-bound, bound)
+                        qt[0] = rng.uniform(-bound, bound)
 
-                    flag = np.random.randint(0, 2)
+                    flag = rng.randint(0, 2)
                     if flag == 0:
                         flag = -1
-                    qt[1] = poses_all[object_id][1] + flag * extent * np.random.uniform(1.0, 1.5)
+                    qt[1] = poses_all[object_id][1] + flag * extent * rng.uniform(1.0, 1.5)
                     if np.absolute(qt[1]) > bound:
-                        qt[1] = poses_all[object_id][1] - flag * extent * np.random.uniform(1.0, 1.5)
+                        qt[1] = poses_all[object_id][1] - flag * extent * rng.uniform(1.0, 1.5)
                     if np.absolute(qt[1]) > bound:
-                        qt[1] = np.random.uniform(-bound, bound)
+                        qt[1] = rng.uniform(-bound, bound)
 
-                    qt[2] = poses_all[object_id][2] - extent * np.random.uniform(2.0, 4.0)
+                    qt[2] = poses_all[object_id][2] - extent * rng.uniform(2.0, 4.0)
                     if qt[2] < self.cfg.TRAIN.SYN_TNEAR:
-                        qt[2] = poses_all[object_id][2] + extent * np.random.uniform(2.0, 4.0)
+                        qt[2] = poses_all[object_id][2] + extent * rng.uniform(2.0, 4.0)
 
             poses_all.append(qt)
         self.renderer.set_poses(poses_all)
 
         # sample lighting
         # light pose
-        theta = np.random.uniform(-np.pi/2, np.pi/2)
-        phi = np.random.uniform(0, np.pi/2)
-        r = np.random.uniform(0.25, 3.0)
-        light_pos = [r * np.sin(theta) * np.sin(phi), r * np.cos(phi) + np.random.uniform(-2, 2), r * np.cos(theta) * np.sin(phi)]
+        theta = rng.uniform(-np.pi/2, np.pi/2)
+        phi = rng.uniform(0, np.pi/2)
+        r = rng.uniform(0.25, 3.0)
+        light_pos = [r * np.sin(theta) * np.sin(phi), r * np.cos(phi) + rng.uniform(-2, 2), r * np.cos(theta) * np.sin(phi)]
         self.renderer.set_light_pos(light_pos)
 
         # light color
-        intensity = np.random.uniform(0.5, 3.0)
-        light_color = intensity * np.random.uniform(0.5, 1.5, 3)
+        intensity = rng.uniform(0.5, 3.0)
+        light_color = intensity * rng.uniform(0.5, 1.5, 3)
         self.renderer.set_light_color(light_color)
             
         # rendering
@@ -424,7 +502,6 @@ class YCBVideoDataset(data.Dataset):
 
         # foreground mask
         seg = seg_tensor[:,:,2] + 256*seg_tensor[:,:,1] + 256*256*seg_tensor[:,:,0]
-        seg_input = seg.clone().cpu().numpy()
 
         # RGB to BGR order
         im = image_tensor.cpu().numpy()
@@ -438,108 +515,67 @@ class YCBVideoDataset(data.Dataset):
         im_label = np.clip(im_label, 0, 255)
         im_label, im_label_all = self.process_label_image(im_label)
 
+        # boxes of all targets
+        qt = np.array(poses_all[:num_target], dtype=np.float32).reshape((-1, 7))
+        RT = np.concatenate((quat2mat_batch(qt[:, 3:]), qt[:, :3, np.newaxis]), axis=2)
+        boxes_target = project_boxes(self._intrinsic_matrix, RT, self._points_box[indexes_target[:num_target]])
+
+        # render each target alone into a device buffer, all occlusion ratios
+        # then come from one reduction and one copy to the host
+        seg_targets = torch.zeros((num_target, height, width), dtype=seg.dtype, device=seg.device)
+        for i in range(num_target):
+            cls = int(indexes_target[i])
+            self.renderer.set_poses([poses_all[i]])
+            self.renderer.render([self.cfg.TRAIN.CLASSES[cls]-1], image_tensor, seg_tensor)
+            seg_target = seg_tensor.flip(0)
+            seg_targets[i] = seg_target[:,:,2] + 256*seg_target[:,:,1] + 256*256*seg_target[:,:,0]
+        ratios, _ = occlusion_ratios_torch(seg, seg_targets)
+        ratios = ratios.cpu().numpy()
+
+        # targets that are not heavily occluded
+        keep = np.where(ratios <= 0.9)[0]
+
+        return {'image': im,
+                'label': im_label.astype(np.uint8),
+                'label_all': im_label_all.astype(np.uint8),
+                'poses': np.array([poses_all[i] for i in keep], dtype=np.float32).reshape((-1, 7)),
+                'boxes': boxes_target[keep].astype(np.float32),
+                'class_ids': indexes_target[keep].astype(np.int32),
+                'ratios': ratios[keep].astype(np.float32)}
+
+
+    def _compose_sample(self, sample):
+        """
+        Paste a random background behind a rendered sample, preprocess the image and build the target
+        """
+
+        im = np.copy(sample['image'])
+        im_label_all = sample['label_all']
+        height, width = im.shape[:2]
+
         # add background to the image
-        ind = np.random.randint(len(self._backgrounds_color), size=1)[0]
-        filename = self._backgrounds_color[ind]
-        background_color = cv2.imread(filename, cv2.IMREAD_UNCHANGED)
-
-        try:
-            # randomly crop a region as background
-            bw = background_color.shape[1]
-            bh = background_color.shape[0]
-            x1 = npr.randint(0, int(bw/3))
-            y1 = npr.randint(0, int(bh/3))
-            x2 = npr.randint(int(2*bw/3), bw)
-            y2 = npr.randint(int(2*bh/3), bh)
-            background_color = background_color[y1:y2, x1:x2]
-            background_color = cv2.resize(background_color, (self._width, self._height), interpolation=cv2.INTER_LINEAR)
-        except:
-            background_color = np.zeros((self._height, self._width, 3), dtype=np.uint8)
-            print('bad background image')
-
-        if len(background_color.shape) != 3:
-            background_color = np.zeros((self._height, self._width, 3), dtype=np.uint8)
-            print('bad background image')
+        background_color = self._background_pool.random_crop(self._get_rng())
+        if background_color.shape[:2] != (height, width):
+            background_color = cv2.resize(background_color, (width, height), interpolation=cv2.INTER_LINEAR)
 
         # paste objects on background
         I = np.where(im_label_all == 0)
         im[I[0], I[1], :] = background_color[I[0], I[1], :3]
         im = im.astype(np.uint8)
 
-        # chromatic transform
-        if self.cfg.TRAIN.CHROMATIC and self.cfg.MODE == 'TRAIN' and np.random.rand(1) > 0.1:
-            im = chromatic_transform(im)
-
-        im_cuda = torch.from_numpy(im).cuda().float() / 255.0
-        if self.cfg.TRAIN.ADD_NOISE and self.cfg.MODE == 'TRAIN' and np.random.rand(1) > 0.1:
-            im_cuda = add_noise_cuda(im_cuda)
-        im_cuda -= self._pixel_mean
-        im_cuda = 255.0 * im_cuda.permute(2, 0, 1)
-        img = im_cuda.cpu()      
-
-        # boxes, class labels and binary masks
-        boxes = []
-        class_ids = []
-        binary_masks = []
-        ratios = []
-        for i in range(num_target):
-            cls = int(indexes_target[i])
-            T = poses_all[i][:3]
-            qt = poses_all[i][3:]
-
-            # render to compare mask
-            self.renderer.set_poses([poses_all[i]])
-            self.renderer.render([self.cfg.TRAIN.CLASSES[cls]-1], image_tensor, seg_tensor)
-            seg_tensor = seg_tensor.flip(0)
-            seg = seg_tensor[:,:,2] + 256*seg_tensor[:,:,1] + 256*256*seg_tensor[:,:,0]
-            seg_target = seg.clone().cpu().numpy()
-            non_occluded = np.sum(np.logical_and(seg_target > 0, seg_target == seg_input)).astype(np.float)
-            area = np.sum(seg_target > 0).astype(np.float)
-            if area > 0:
-                occluded_ratio = 1.0 - non_occluded / area
-            else:
-                occluded_ratio = 1.0
-            if occluded_ratio > 0.9:
-                continue
-
-            # compute box
-            x3d = np.ones((4, self._points_all.shape[1]), dtype=np.float32)
-            x3d[0, :] = self._points_all[cls,:,0]
-            x3d[1, :] = self._points_all[cls,:,1]
-            x3d[2, :] = self._points_all[cls,:,2]
-            RT = np.zeros((3, 4), dtype=np.float32)
-            RT[:3, :3] = quat2mat(qt)
-            RT[:, 3] = T
-            x2d = np.matmul(self._intrinsic_matrix, np.matmul(RT, x3d))
-            x2d[0, :] = np.divide(x2d[0, :], x2d[2, :])
-            x2d[1, :] = np.divide(x2d[1, :], x2d[2, :])
-        
-            x1 = np.min(x2d[0, :])
-            y1 = np.min(x2d[1, :])
-            x2 = np.max(x2d[0, :])
-            y2 = np.max(x2d[1, :])
-            boxes.append([x1, y1, x2, y2])
-            class_ids.append(cls)
-
-            # mask
-            binary_masks.append((im_label == cls).astype(np.float32))
-            ratios.append(occluded_ratio)
+        img = self._preprocess_image(im)
 
-        boxes = torch.as_tensor(boxes).reshape(-1, 4)  # guard against no boxes
-        target = BoxList(boxes, (self._width, self._height), mode="xyxy")
+        boxes = torch.as_tensor(np.array(sample['boxes'])).reshape(-1, 4)  # guard against no boxes
+        target = BoxList(boxes, (width, height), mode="xyxy")
 
-        class_ids = torch.tensor(class_ids)
+        class_ids = torch.as_tensor(np.array(sample['class_ids'], dtype=np.int64))
         target.add_field("labels", class_ids)
 
-        ratios = torch.tensor(ratios)
+        ratios = torch.as_tensor(np.array(sample['ratios']))
         target.add_field("ratios", ratios)
 
-        n = len(binary_masks)
-        masks_np = np.zeros((n, self._height, self._width), dtype=np.float32)
-        for i in range(n):
-            masks_np[i, :, :] = binary_masks[i]
-
-        masks = SegmentationMask(torch.as_tensor(masks_np), (width, height), "mask")
+        masks_np = instance_masks(sample['label'], sample['class_ids'])
+        masks = SegmentationMask(torch.from_numpy(masks_np), (width, height), "mask")
         target.add_field("masks", masks)
         target = target.clip_to_image(remove_empty=True)
 
@@ -549,21 +585,21 @@ class YCBVideoDataset(data.Dataset):
     def __getitem__(self, index):
 
         is_syn = 0
-        if ((self.cfg.MODE == 'TRAIN' and self.cfg.TRAIN.SYNTHESIZE) or (self.cfg.MODE == 'TEST' and self.cfg.TEST.SYNTHESIZE)) and (index % (self.cfg.TRAIN.SYN_RATIO+1) != 0):
+        if self._synthesize and (index % (self.cfg.TRAIN.SYN_RATIO+1) != 0):
             is_syn = 1
 
         if is_syn:
             img, target = self._render_item()
         else:
-            if self._cur >= len(self._roidb):
-                self._perm = np.random.permutation(np.arange(len(self._roidb)))
-                self._cur = 0
-            db_ind = self._perm[self._cur]
+            # every (SYN_RATIO+1)-th index is a real frame
+            if self._synthesize:
+                db_ind = self._perm[(index // (self.cfg.TRAIN.SYN_RATIO+1)) % len(self._roidb)]
+            else:
+                db_ind = self._perm[index % len(self._roidb)]
             roidb = self._roidb[db_ind]
-            self._cur += 1
 
             # Get the input image blob
-            random_scale_ind = npr.randint(0, high=len(self.cfg.TRAIN.SCALES_BASE))
+            random_scale_ind = self._get_rng().randint(0, high=len(self.cfg.TRAIN.SCALES_BASE))
             img, im_scale, height, width = self._get_image_blob(roidb, random_scale_ind)
 
             # build the label blob
@@ -576,10 +612,21 @@ class YCBVideoDataset(data.Dataset):
         return img, target, index
 
 
-    def _get_image_blob(self, roidb, scale_ind):    
+    def _store_index(self, roidb):
+        if self._frame_store is None:
+            return -1
+        return self._frame_store.index(roidb['video_id'] + '/' + roidb['image_id'])
+
+
+    def _read_color(self, roidb):
+        """ read the color image in BGR order """
+
+        i = self._store_index(roidb)
+        if i >= 0:
+            return self._frame_store.get(i, 'color')
 
         # rgba
-        rgba = pad_im(cv2.imread(roidb['image'], cv2.IMREAD_UNCHANGED), 16)
+        rgba = cv2.imread(roidb['image'], cv2.IMREAD_UNCHANGED)
         if rgba.shape[2] == 4:
             im = np.copy(rgba[:,:,:3])
             alpha = rgba[:,:,3]
@@ -587,6 +634,41 @@ class YCBVideoDataset(data.Dataset):
             im[I[0], I[1], :] = 0
         else:
             im = rgba
+        return im
+
+
+    def _read_depth(self, roidb):
+        """ read the uint16 depth image, see _depth_factor for the unit """
+
+        i = self._store_index(roidb)
+        if i >= 0 and 'depth' in self._frame_store.fields:
+            return self._frame_store.get(i, 'depth')
+        return cv2.imread(roidb['depth'], cv2.IMREAD_UNCHANGED)
+
+
+    def _read_label(self, roidb):
+
+        i = self._store_index(roidb)
+        if i >= 0:
+            return self._frame_store.get(i, 'label')
+        return cv2.imread(roidb['label'], cv2.IMREAD_UNCHANGED)
+
+
+    def _read_meta_data(self, roidb):
+        """ poses (3x4xn), cls_indexes (n,) and intrinsic_matrix of a frame """
+
+        i = self._store_index(roidb)
+        if i >= 0:
+            return {'poses': self._frame_store.get(i, 'poses'),
+                    'cls_indexes': self._frame_store.get(i, 'cls_indexes'),
+                    'intrinsic_matrix': self._frame_store.get(i, 'intrinsic_matrix')}
+
+        return self._meta.frame(roidb['meta_index'])
+
+
+    def _get_image_blob(self, roidb, scale_ind):    
+
+        im = pad_im(self._read_color(roidb), 16)
 
         im_scale = self.cfg.TRAIN.SCALES_BASE[scale_ind]
         if im_scale != 1.0:
@@ -597,29 +679,59 @@ class YCBVideoDataset(data.Dataset):
         if roidb['flipped']:
             im = im[:, ::-1, :]
 
-        # chromatic transform
-        if self.cfg.TRAIN.CHROMATIC and self.cfg.MODE == 'TRAIN' and np.random.rand(1) > 0.1:
-            im = chromatic_transform(im)
-
-        im_cuda = torch.from_numpy(im).cuda().float() / 255.0
-        if self.cfg.TRAIN.ADD_NOISE and self.cfg.MODE == 'TRAIN' and np.random.rand(1) > 0.1:
-            im_cuda = add_noise_cuda(im_cuda)
-        im_cuda -= self._pixel_mean
-        im_cuda = 255.0 * im_cuda.permute(2, 0, 1)
-        img = im_cuda.cpu()  
+        img = self._preprocess_image(im)
+        if self.cfg.INPUT_DEPTH:
+            img = torch.cat((img, self._get_xyz_blob(roidb, im_scale)), dim=0)
 
         return img, im_scale, height, width
 
 
+    def _get_xyz_blob(self, roidb, im_scale):
+        """
+        Backprojected depth image in meter, aligned with the image blob, returns a 3xHxW float tensor
+        """
+
+        depth = pad_im(self._read_depth(roidb), 16)
+        K = np.array(self._read_meta_data(roidb)['intrinsic_matrix'], dtype=np.float64)
+        if im_scale != 1.0:
+            depth = cv2.resize(depth, None, None, fx=im_scale, fy=im_scale, interpolation=cv2.INTER_NEAREST)
+            K[:2] *= im_scale
+
+        xyz = backproject(depth, K, self._depth_factor)
+        if roidb['flipped']:
+            # mirror the point cloud with the image, K belongs to the unflipped depth
+            xyz = xyz[:, ::-1] * np.array([-1, 1, 1], dtype=np.float32)
+        return torch.from_numpy(xyz).permute(2, 0, 1)
+
+
+    def _preprocess_image(self, im):
+        """
+        Chromatic transform, noise and mean subtraction of a uint8 BGR image on the CPU,
+        returns a 3xHxW float tensor
+        """
+
+        rng = self._get_rng()
+
+        # chromatic transform
+        if self.cfg.TRAIN.CHROMATIC and self.cfg.MODE == 'TRAIN' and rng.rand(1) > 0.1:
+            im = chromatic_transform(im, d_h=(rng.rand(1) - 0.5) * 0.1 * 180,
+                                     d_s=(rng.rand(1) - 0.5) * 0.2 * 256, d_l=(rng.rand(1) - 0.5) * 0.2 * 256)
+
+        img = torch.from_numpy(im.astype(np.float32))
+        if self.cfg.TRAIN.ADD_NOISE and self.cfg.MODE == 'TRAIN' and rng.rand(1) > 0.1:
+            img = add_noise_tensor(img.div_(255.0), rng=rng).mul_(255.0)
+        img -= self._pixel_mean
+        return img.permute(2, 0, 1)
+
+
     def _get_label_blob(self, roidb, num_classes, im_scale, height, width):
         """ build the label blob """
 
-        meta_data = scipy.io.loadmat(roidb['meta_data'])
-        meta_data['cls_indexes'] = meta_data['cls_indexes'].flatten()
+        meta_data = self._read_meta_data(roidb)
         classes = np.array(self.cfg.TRAIN.CLASSES)
 
         # read label image
-        im_label = pad_im(cv2.imread(roidb['label'], cv2.IMREAD_UNCHANGED), 16)
+        im_label = pad_im(self._read_label(roidb), 16)
         if roidb['flipped']:
             if len(im_label.shape) == 2:
                 im_label = im_label[:, ::-1]
@@ -633,23 +745,17 @@ class YCBVideoDataset(data.Dataset):
         I = np.where(im_label == 19)
         im_label[I] = 20
 
-        # foreground mask
-        seg = torch.from_numpy((im_label != 0).astype(np.float32))
-        mask = seg.unsqueeze(0).repeat((3, 1, 1)).float().cuda()
-
         # poses
         poses = meta_data['poses']
-        if len(poses.shape) == 2:
-            poses = np.reshape(poses, (3, 4, 1))
         if roidb['flipped']:
             poses = _flip_poses(poses, meta_data['intrinsic_matrix'], width)
 
-        # boxes, class labels and binary masks
-        boxes = []
+        # objects of the selected classes
+        object_ids = []
         class_ids = []
-        binary_masks = []
-        num = poses.shape[2]
-        for i in range(num):
+        mask_values = []
+        point_ids = []
+        for i in range(poses.shape[2]):
             cls = int(meta_data['cls_indexes'][i])
 
             # change large clamp to extra large clamp
@@ -661,41 +767,18 @@ class YCBVideoDataset(data.Dataset):
 
             ind = np.where(classes == cls)[0]
             if len(ind) > 0:
-                R = poses[:, :3, i]
-                T = poses[:, 3, i]
-                qt = mat2quat(R)
-
-                # compute box
-                x3d = np.ones((4, self._points_all.shape[1]), dtype=np.float32)
-                if clamp:
-                    x3d[0, :] = self._points_clamp[:,0]
-                    x3d[1, :] = self._points_clamp[:,1]
-                    x3d[2, :] = self._points_clamp[:,2]
-                else:
-                    x3d[0, :] = self._points_all[ind,:,0]
-                    x3d[1, :] = self._points_all[ind,:,1]
-                    x3d[2, :] = self._points_all[ind,:,2]
-                RT = np.zeros((3, 4), dtype=np.float32)
-                RT[:3, :3] = quat2mat(qt)
-                RT[:, 3] = T
-                x2d = np.matmul(meta_data['intrinsic_matrix'], np.matmul(RT, x3d))
-                x2d[0, :] = np.divide(x2d[0, :], x2d[2, :])
-                x2d[1, :] = np.divide(x2d[1, :], x2d[2, :])
-        
-                x1 = np.min(x2d[0, :])
-                y1 = np.min(x2d[1, :])
-                x2 = np.max(x2d[0, :])
-                y2 = np.max(x2d[1, :])
-                boxes.append([x1, y1, x2, y2])
+                object_ids.append(i)
                 class_ids.append(int(ind))
+                mask_values.append(cls)
+                point_ids.append(-1 if clamp else int(ind))
 
-                x1 = max(int(x1), 0)
-                y1 = max(int(y1), 0)
-                x2 = min(int(x2), width-1)
-                y2 = min(int(y2), height-1)
-                labels = np.zeros((height, width), dtype=np.float32)
-                labels[y1:y2, x1:x2] = im_label[y1:y2, x1:x2]
-                binary_masks.append((labels == cls).astype(np.float32))
+        # boxes and binary masks
+        RT = np.transpose(poses[:, :, object_ids], (2, 0, 1))
+        boxes = project_boxes(meta_data['intrinsic_matrix'], RT, self._points_box[point_ids])
+        mask_boxes = boxes.astype(np.int64)
+        mask_boxes[:, :2] = np.maximum(mask_boxes[:, :2], 0)
+        mask_boxes[:, 2] = np.minimum(mask_boxes[:, 2], width-1)
+        mask_boxes[:, 3] = np.minimum(mask_boxes[:, 3], height-1)
 
         boxes = torch.as_tensor(boxes).reshape(-1, 4)  # guard against no boxes
         target = BoxList(boxes, (width, height), mode="xyxy")
@@ -703,12 +786,9 @@ class YCBVideoDataset(data.Dataset):
         class_ids = torch.tensor(class_ids)
         target.add_field("labels", class_ids)
 
-        n = len(binary_masks)
-        masks_np = np.zeros((n, height, width), dtype=np.float32)
-        for i in range(n):
-            masks_np[i, :, :] = binary_masks[i]
-
-        masks = SegmentationMask(torch.as_tensor(masks_np), (width, height), "mask")
+        n = len(mask_values)
+        masks_np = instance_masks(im_label, mask_values, mask_boxes)
+        masks = SegmentationMask(torch.from_numpy(masks_np), (width, height), "mask")
         target.add_field("masks", masks)
 
         ratios = np.zeros((n, ), dtype=np.float32)
@@ -777,87 +857,57 @@ class YCBVideoDataset(data.Dataset):
 
     def _load_image_set_index(self, image_set):
         """
-        Load the indexes listed in this dataset's image set file.
+        Load the indexes listed in this dataset's image set file or manifest,
+        keeping the videos with at least one of the selected classes.
         """
-        image_set_file = os.path.join(self._ycb_video_path, image_set + '.txt')
-        assert os.path.exists(image_set_file), \
-                'Path does not exist: {}'.format(image_set_file)
+        frames, video_classes = load_image_set(self._ycb_video_path, image_set)
+        class_index = VideoClassIndex(os.path.join(self.cache_path, 'ycb_video_video_classes.json'), self._data_path)
 
         image_index = []
         video_ids_selected = set([])
         video_ids_not = set([])
         count = np.zeros((self.num_classes, ), dtype=np.int32)
+        classes = list(self.cfg.TRAIN.CLASSES)
 
-        with open(image_set_file) as f:
-            for x in f.readlines():
-                index = x.rstrip('\n')
-                pos = index.find('/')
-                video_id = index[:pos]
-
-                if not video_id in video_ids_selected and not video_id in video_ids_not:
-                    filename = os.path.join(self._data_path, video_id, '000001-meta.mat')
-                    meta_data = scipy.io.loadmat(filename)
-                    cls_indexes = meta_data['cls_indexes'].flatten()
-                    flag = 0
-                    for i in range(len(cls_indexes)):
-                        cls_index = int(cls_indexes[i])
-                        ind = np.where(np.array(self.cfg.TRAIN.CLASSES) == cls_index)[0]
-                        if len(ind) > 0:
-                            count[ind] += 1
-                            flag = 1
-                    if flag:
-                        video_ids_selected.add(video_id)
-                    else:
-                        video_ids_not.add(video_id)
+        for index in frames:
+            video_id = index[:index.find('/')]
+
+            if not video_id in video_ids_selected and not video_id in video_ids_not:
+                if video_id in video_classes:
+                    cls_indexes = video_classes[video_id]
+                else:
+                    cls_indexes = class_index.classes(video_id)
+                ind = [classes.index(c) for c in set(cls_indexes) if c in classes]
+                if len(ind) > 0:
+                    count[ind] += 1
+                    video_ids_selected.add(video_id)
+                else:
+                    video_ids_not.add(video_id)
 
-                if video_id in video_ids_selected:
-                    image_index.append(index)
+            if video_id in video_ids_selected:
+                image_index.append(index)
+        class_index.save()
 
         for i in range(1, self.num_classes):
             print('%d %s [%d/%d]' % (i, self.classes[i], count[i], len(list(video_ids_selected))))
 
         # sample a subset for training
         if image_set == 'train':
-            image_index = image_index[::10]
+            image_index = image_index[::self.cfg.TRAIN.IMAGE_STRIDE]
 
         return image_index
 
 
-    def _load_object_points(self):
-
-        points = [[] for _ in range(len(self._classes))]
-        num = np.inf
-
-        for i in range(1, len(self._classes)):
-            point_file = os.path.join(self._ycb_video_path, 'models', self._classes[i], 'points.xyz')
-            print(point_file)
-            assert os.path.exists(point_file), 'Path does not exist: {}'.format(point_file)
-            points[i] = np.loadtxt(point_file)
-            if points[i].shape[0] < num:
-                num = points[i].shape[0]
-
-        points_all = np.zeros((self._num_classes, num, 3), dtype=np.float32)
+    def _load_box_points(self):
+        """
+        Convex hull vertices of the models of the selected classes for box projection,
+        the first row is the background and the last row is the large clamp
+        """
+        point_sets = [np.zeros((1, 3), dtype=np.float32)]
         for i in range(1, len(self._classes)):
-            points_all[i, :, :] = points[i][:num, :]
-
-        # rescale the points
-        point_blob = points_all.copy()
-        for i in range(1, self._num_classes):
-            # compute the rescaling factor for the points
-            weight = 10.0 / np.amax(self._extents[i, :])
-            if weight < 10:
-                weight = 10
-            if self._symmetry[i] > 0:
-                point_blob[i, :, :] = 4 * weight * point_blob[i, :, :]
-            else:
-                point_blob[i, :, :] = weight * point_blob[i, :, :]
-
-        # points of large clamp
-        point_file = os.path.join(self._ycb_video_path, 'models', '051_large_clamp', 'points.xyz')
-        points_clamp = np.loadtxt(point_file)
-        points_clamp = points_clamp[:num, :]
-
-        return points, points_all, point_blob, points_clamp
+            point_sets.append(self._models.box_points(self._classes[i]))
+        point_sets.append(self._models.box_points('051_large_clamp'))
+        return pad_points(point_sets)
 
 
     def _load_object_extents(self):
@@ -941,44 +991,51 @@ class YCBVideoDataset(data.Dataset):
         """
         Return the database of ground-truth regions of interest.
 
-        This function loads/saves from/to a cache file to speed up future calls.
+        Annotations live in the meta data cache, so entries only hold paths and a row index.
         """
 
+        return [self._load_ycb_video_annotation(i, index)
+                for i, index in enumerate(self._image_index)]
+
+
+    def _meta_cache_root(self, image_set):
+
         prefix = '_class'
         for i in range(len(self.cfg.TRAIN.CLASSES)):
             prefix += '_%d' % self.cfg.TRAIN.CLASSES[i]
-        cache_file = os.path.join(self.cache_path, self.name + prefix + '_gt_roidb.pkl')
-        if os.path.exists(cache_file):
-            with open(cache_file, 'rb') as fid:
-                roidb = cPickle.load(fid)
-            print('{} gt roidb loaded from {}'.format(self.name, cache_file))
-            return roidb
+        if image_set == 'train' and self.cfg.TRAIN.IMAGE_STRIDE != 10:
+            prefix += '_stride_%d' % self.cfg.TRAIN.IMAGE_STRIDE
+        return os.path.join(self.cache_path, 'ycb_video_' + image_set + prefix + '_meta')
 
-        gt_roidb = [self._load_ycb_video_annotation(index)
-                    for index in self._image_index]
 
-        with open(cache_file, 'wb') as fid:
-            cPickle.dump(gt_roidb, fid, cPickle.HIGHEST_PROTOCOL)
-        print('wrote gt roidb to {}'.format(cache_file))
+    def _load_meta_cache(self, image_set):
+        """
+        Load the columnar meta data cache of an image set, build it on first use and
+        rebuild it when the image set file or manifest changes
+        """
 
-        return gt_roidb
+        root = self._meta_cache_root(image_set)
+        filename = image_set_file(self._ycb_video_path, image_set)
+        source = {'file': os.path.basename(filename),
+                  'mtime': os.path.getmtime(filename),
+                  'size': os.path.getsize(filename)}
+        if YCBVideoMeta.exists(root, source):
+            meta = YCBVideoMeta(root)
+            print('{} meta data of {} frames loaded from {}'.format(image_set, len(meta), root))
+            return meta
 
+        image_index = self._load_image_set_index(image_set)
+        return YCBVideoMeta.build(root, self._data_path, image_index, source)
 
-    def _load_ycb_video_annotation(self, index):
+
+    def _load_ycb_video_annotation(self, meta_index, index):
         """
         Load class name and meta data
         """
-        # image path
-        image_path = self.image_path_from_index(index)
-
-        # depth path
-        depth_path = self.depth_path_from_index(index)
-
-        # label path
-        label_path = self.label_path_from_index(index)
-
-        # metadata path
-        metadata_path = self.metadata_path_from_index(index)
+        image_path = os.path.join(self._data_path, index + '-color' + self._image_ext)
+        depth_path = os.path.join(self._data_path, index + '-depth' + self._image_ext)
+        label_path = os.path.join(self._data_path, index + '-label' + self._image_ext)
+        metadata_path = os.path.join(self._data_path, index + '-meta.mat')
 
         # parse image name
         pos = index.find('/')
@@ -989,6 +1046,7 @@ class YCBVideoDataset(data.Dataset):
                 'depth': depth_path,
                 'label': label_path,
                 'meta_data': metadata_path,
+                'meta_index': meta_index,
                 'video_id': video_id,
                 'image_id': image_id,
                 'flipped': False}
@@ -1010,309 +1068,36 @@ class YCBVideoDataset(data.Dataset):
         """
         change label image to label index
         """
-        height = label_image.shape[0]
-        width = label_image.shape[1]
-        labels = np.zeros((height, width), dtype=np.int32)
-        labels_all = np.zeros((height, width), dtype=np.int32)
-
         # label image is in BGR order
+        label_image = label_image.astype(np.int32)
         index = label_image[:,:,2] + 256*label_image[:,:,1] + 256*256*label_image[:,:,0]
-        for i in range(1, len(self._class_colors_all)):
-            color = self._class_colors_all[i]
-            ind = color[0] + 256*color[1] + 256*256*color[2]
-            I = np.where(index == ind)
-            labels_all[I[0], I[1]] = i
 
-            ind = np.where(np.array(self.cfg.TRAIN.CLASSES) == i)[0]
-            if len(ind) > 0:
-                labels[I[0], I[1]] = ind
+        pos = np.searchsorted(self._label_codes, index)
+        np.minimum(pos, len(self._label_codes) - 1, out=pos)
+        labels_all = np.where(self._label_codes[pos] == index, self._label_code_classes[pos], 0).astype(np.int32)
+        labels = self._class_to_subset[labels_all]
 
         return labels, labels_all
 
 
     def _load_all_poses(self):
+        """
+        Euler angles and translations of all objects in trainval, one (n, 6) array per class
+        """
 
-        # load cache file
-        prefix = '_class'
-        for i in range(len(self.cfg.TRAIN.CLASSES)):
-            prefix += '_%d' % self.cfg.TRAIN.CLASSES[i]
-        cache_file = os.path.join(self.cache_path, self.name + prefix + '_poses.pkl')
-        if os.path.exists(cache_file):
-            with open(cache_file, 'rb') as fid:
-                poses = cPickle.load(fid)
-                for i in range(len(poses)):
-                    print('%s, min distance %f, max distance %f' % (self._classes[i+1], np.min(poses[i][:,5]), np.max(poses[i][:,5])))
-            print('{} poses loaded from {}'.format(self.name, cache_file))
-            return poses
-
-        poses = [np.zeros((0, 6), dtype=np.float32) for i in range(len(self.cfg.TRAIN.CLASSES)-1)] # no background
-        classes = np.array(self.cfg.TRAIN.CLASSES)
-
-        # load all image indexes
-        image_index = self._load_image_set_index('trainval')
-        print('loading poses...')
-        for i in range(len(image_index)):
-            filename = os.path.join(self._data_path, image_index[i] + '-meta.mat')
-
-            meta_data = scipy.io.loadmat(filename)
-            cls_indexes = meta_data['cls_indexes'].flatten()
-            gt = meta_data['poses']
-            if len(gt.shape) == 2:
-                gt = np.reshape(gt, (3, 4, 1))
-
-            for j in range(len(cls_indexes)):
-                cls = int(cls_indexes[j])
-                ind = np.where(classes == cls)[0]
-                if len(ind) > 0:
-                    R = gt[:, :3, j]
-                    T = gt[:, 3, j]
-                    pose = np.zeros((1, 6), dtype=np.float32)
-                    pose[0, :3] = mat2euler(R)
-                    pose[0, 3:] = T
-                    poses[int(ind)-1] = np.concatenate((poses[int(ind)-1], pose), axis=0)
-
-        # save poses
-        with open(cache_file, 'wb') as fid:
-            cPickle.dump(poses, fid, cPickle.HIGHEST_PROTOCOL)
-        print('wrote poses to {}'.format(cache_file))
+        meta = self._load_meta_cache('trainval')
+        poses = []
+        for i in range(1, len(self.cfg.TRAIN.CLASSES)):
+            index = meta.objects_of_class(self.cfg.TRAIN.CLASSES[i])
+            pose = np.zeros((len(index), 6), dtype=np.float32)
+            pose[:, :3] = meta.eulers[index]
+            pose[:, 3:] = meta.poses[index, :, 3]
+            poses.append(pose)
+            if len(index) > 0:
+                print('%s, min distance %f, max distance %f' % (self._classes[i], np.min(pose[:,5]), np.max(pose[:,5])))
         return poses
 
 
     def evaluation(self, output_dir):
-
-        filename = os.path.join(output_dir, 'results_posecnn.mat')
-        if os.path.exists(filename):
-            results_all = scipy.io.loadmat(filename)
-            print('load results from file')
-            print(filename)
-            distances_sys = results_all['distances_sys']
-            distances_non = results_all['distances_non']
-            errors_rotation = results_all['errors_rotation']
-            errors_translation = results_all['errors_translation']
-            results_seq_id = results_all['results_seq_id'].flatten()
-            results_frame_id = results_all['results_frame_id'].flatten()
-            results_object_id = results_all['results_object_id'].flatten()
-            results_cls_id = results_all['results_cls_id'].flatten()
-        else:
-            # save results
-            num_max = 100000
-            num_results = 2
-            distances_sys = np.zeros((num_max, num_results), dtype=np.float32)
-            distances_non = np.zeros((num_max, num_results), dtype=np.float32)
-            errors_rotation = np.zeros((num_max, num_results), dtype=np.float32)
-            errors_translation = np.zeros((num_max, num_results), dtype=np.float32)
-            results_seq_id = np.zeros((num_max, ), dtype=np.float32)
-            results_frame_id = np.zeros((num_max, ), dtype=np.float32)
-            results_object_id = np.zeros((num_max, ), dtype=np.float32)
-            results_cls_id = np.zeros((num_max, ), dtype=np.float32)
-
-            # for each image
-            count = -1
-            for i in range(len(self._roidb)):
-    
-                # parse keyframe name
-                seq_id = int(self._roidb[i]['video_id'])
-                frame_id = int(self._roidb[i]['image_id'])
-
-                # load result
-                filename = os.path.join(output_dir, '%04d_%06d.mat' % (seq_id, frame_id))
-                print(filename)
-                result_posecnn = scipy.io.loadmat(filename)
-
-                # load gt poses
-                filename = osp.join(self._data_path, '%04d/%06d-meta.mat' % (seq_id, frame_id))
-                print(filename)
-                gt = scipy.io.loadmat(filename)
-
-                # for each gt poses
-                cls_indexes = gt['cls_indexes'].flatten()
-                for j in range(len(cls_indexes)):
-                    count += 1
-                    cls_index = cls_indexes[j]
-                    RT_gt = gt['poses'][:, :, j]
-
-                    results_seq_id[count] = seq_id
-                    results_frame_id[count] = frame_id
-                    results_object_id[count] = j
-                    results_cls_id[count] = cls_index
-
-                    # network result
-                    result = result_posecnn
-                    if len(result['rois']) > 0:
-                        roi_index = np.where(result['rois'][:, 1] == cls_index)[0]
-                    else:
-                        roi_index = []
-
-                    if len(roi_index) > 0:
-                        RT = np.zeros((3, 4), dtype=np.float32)
-
-                        # pose from network
-                        RT[:3, :3] = quat2mat(result['poses'][roi_index, :4].flatten())
-                        RT[:, 3] = result['poses'][roi_index, 4:]
-                        distances_sys[count, 0] = adi(RT[:3, :3], RT[:, 3],  RT_gt[:3, :3], RT_gt[:, 3], self._points[cls_index])
-                        distances_non[count, 0] = add(RT[:3, :3], RT[:, 3],  RT_gt[:3, :3], RT_gt[:, 3], self._points[cls_index])
-                        errors_rotation[count, 0] = re(RT[:3, :3], RT_gt[:3, :3])
-                        errors_translation[count, 0] = te(RT[:, 3], RT_gt[:, 3])
-
-                        # pose after depth refinement
-                        if self.cfg.TEST.POSE_REFINE:
-                            RT[:3, :3] = quat2mat(result['poses_refined'][roi_index, :4].flatten())
-                            RT[:, 3] = result['poses_refined'][roi_index, 4:]
-                            distances_sys[count, 1] = adi(RT[:3, :3], RT[:, 3],  RT_gt[:3, :3], RT_gt[:, 3], self._points[cls_index])
-                            distances_non[count, 1] = add(RT[:3, :3], RT[:, 3],  RT_gt[:3, :3], RT_gt[:, 3], self._points[cls_index])
-                            errors_rotation[count, 1] = re(RT[:3, :3], RT_gt[:3, :3])
-                            errors_translation[count, 1] = te(RT[:, 3], RT_gt[:, 3])
-                        else:
-                            distances_sys[count, 1] = np.inf
-                            distances_non[count, 1] = np.inf
-                            errors_rotation[count, 1] = np.inf
-                            errors_translation[count, 1] = np.inf
-                    else:
-                        distances_sys[count, :] = np.inf
-                        distances_non[count, :] = np.inf
-                        errors_rotation[count, :] = np.inf
-                        errors_translation[count, :] = np.inf
-
-            distances_sys = distances_sys[:count+1, :]
-            distances_non = distances_non[:count+1, :]
-            errors_rotation = errors_rotation[:count+1, :]
-            errors_translation = errors_translation[:count+1, :]
-            results_seq_id = results_seq_id[:count+1]
-            results_frame_id = results_frame_id[:count+1]
-            results_object_id = results_object_id[:count+1]
-            results_cls_id = results_cls_id[:count+1]
-
-            results_all = {'distances_sys': distances_sys,
-                       'distances_non': distances_non,
-                       'errors_rotation': errors_rotation,
-                       'errors_translation': errors_translation,
-                       'results_seq_id': results_seq_id,
-                       'results_frame_id': results_frame_id,
-                       'results_object_id': results_object_id,
-                       'results_cls_id': results_cls_id }
-
-            filename = os.path.join(output_dir, 'results_posecnn.mat')
-            scipy.io.savemat(filename, results_all)
-
-        # print the results
-        # for each class
-        import matplotlib.pyplot as plt
-        max_distance = 0.1
-        index_plot = [0, 1]
-        color = ['r', 'b']
-        leng = ['PoseCNN', 'PoseCNN refined']
-        num = len(leng)
-        ADD = np.zeros((self.num_classes, num), dtype=np.float32)
-        ADDS = np.zeros((self.num_classes, num), dtype=np.float32)
-        TS = np.zeros((self.num_classes, num), dtype=np.float32)
-        classes = copy.copy(self._classes)
-        classes[0] = 'all'
-        for k in self.cfg.TRAIN.CLASSES:
-            fig = plt.figure()
-            if k == 0:
-                index = range(len(results_cls_id))
-            else:
-                index = np.where(results_cls_id == k)[0]
-
-            if len(index) == 0:
-                continue
-            print('%s: %d objects' % (classes[k], len(index)))
-
-            # distance symmetry
-            ax = fig.add_subplot(2, 3, 1)
-            lengs = []
-            for i in index_plot:
-                D = distances_sys[index, i]
-                ind = np.where(D > max_distance)[0]
-                D[ind] = np.inf
-                d = np.sort(D)
-                n = len(d)
-                accuracy = np.cumsum(np.ones((n, ), np.float32)) / n
-                plt.plot(d, accuracy, color[i], linewidth=2)
-                ADDS[k, i] = VOCap(d, accuracy)
-                lengs.append('%s (%.2f)' % (leng[i], ADDS[k, i] * 100))
-                print('%s, %s: %d objects missed' % (classes[k], leng[i], np.sum(np.isinf(D))))
-
-            ax.legend(lengs)
-            plt.xlabel('Average distance threshold in meter (symmetry)')
-            plt.ylabel('accuracy')
-            ax.set_title(classes[k])
-
-            # distance non-symmetry
-            ax = fig.add_subplot(2, 3, 2)
-            lengs = []
-            for i in index_plot:
-                D = distances_non[index, i]
-                ind = np.where(D > max_distance)[0]
-                D[ind] = np.inf
-                d = np.sort(D)
-                n = len(d)
-                accuracy = np.cumsum(np.ones((n, ), np.float32)) / n
-                plt.plot(d, accuracy, color[i], linewidth=2)
-                ADD[k, i] = VOCap(d, accuracy)
-                lengs.append('%s (%.2f)' % (leng[i], ADD[k, i] * 100))
-                print('%s, %s: %d objects missed' % (classes[k], leng[i], np.sum(np.isinf(D))))
-
-            ax.legend(lengs)
-            plt.xlabel('Average distance threshold in meter (non-symmetry)')
-            plt.ylabel('accuracy')
-            ax.set_title(classes[k])
-
-            # translation
-            ax = fig.add_subplot(2, 3, 3)
-            lengs = []
-            for i in index_plot:
-                D = errors_translation[index, i]
-                ind = np.where(D > max_distance)[0]
-                D[ind] = np.inf
-                d = np.sort(D)
-                n = len(d)
-                accuracy = np.cumsum(np.ones((n, ), np.float32)) / n
-                plt.plot(d, accuracy, color[i], linewidth=2)
-                TS[k, i] = VOCap(d, accuracy)
-                lengs.append('%s (%.2f)' % (leng[i], TS[k, i] * 100))
-                print('%s, %s: %d objects missed' % (classes[k], leng[i], np.sum(np.isinf(D))))
-
-            ax.legend(lengs)
-            plt.xlabel('Translation threshold in meter')
-            plt.ylabel('accuracy')
-            ax.set_title(classes[k])
-
-            # rotation histogram
-            count = 4
-            for i in index_plot:
-                ax = fig.add_subplot(2, 3, count)
-                D = errors_rotation[index, i]
-                ind = np.where(np.isfinite(D))[0]
-                D = D[ind]
-                ax.hist(D, bins=range(0, 190, 10), range=(0, 180))
-                plt.xlabel('Rotation angle error')
-                plt.ylabel('count')
-                ax.set_title(leng[i])
-                count += 1
-
-            # mng = plt.get_current_fig_manager()
-            # mng.full_screen_toggle()
-            filename = output_dir + '/' + classes[k] + '.png'
-            plt.savefig(filename)
-            # plt.show()
-
-        # print ADD
-        print('==================ADD======================')
-        for k in self.cfg.TRAIN.CLASSES:
-            print('%s: %f' % (classes[k], ADD[k, 0]))
-        for k in self.cfg.TRAIN.CLASSES[1:]:
-            print('%f' % (ADD[k, 0]))
-        print('%f' % (ADD[0, 0]))
-        print(self.cfg.TRAIN.SNAPSHOT_INFIX)
-        print('===========================================')
-
-        # print ADD-S
-        print('==================ADD-S====================')
-        for k in self.cfg.TRAIN.CLASSES:
-            print('%s: %f' % (classes[k], ADDS[k, 0]))
-        for k in self.cfg.TRAIN.CLASSES[1:]:
-            print('%f' % (ADDS[k, 0]))
-        print('%f' % (ADDS[0, 0]))
-        print(self.cfg.TRAIN.SNAPSHOT_INFIX)
-        print('===========================================')
+        from maskrcnn_benchmark.data.datasets.evaluation.ycb_video import ycb_video_evaluation
+        return ycb_video_evaluation(self, output_dir)
@@ -0,0 +1,146 @@
+# --------------------------------------------------------
+# Columnar meta data cache for YCB-Video
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+The -meta.mat files of a YCB-Video image set are parsed once and stored as a
+handful of numpy arrays, one row per frame or per object, which are memory
+mapped at startup. A cache directory looks like
+
+    root/
+    |_ keys.txt               image index of every frame, e.g. '0048/000001'
+    |_ source.json            stamp of the image set file the frames were selected from
+    |_ frame_offsets.npy      (F+1,) int64, objects of frame i are rows offsets[i]:offsets[i+1]
+    |_ intrinsic_matrix.npy   (F, 3, 3) float32
+    |_ object_frame.npy       (M,) int32, frame of each object
+    |_ cls_indexes.npy        (M,) int32, class index in the full class list
+    |_ poses.npy              (M, 3, 4) float32
+    |_ eulers.npy             (M, 3) float32, 'sxyz' euler angles of the rotations
+"""
+
+import os
+import json
+import shutil
+import numpy as np
+import scipy.io
+from transforms3d.euler import mat2euler
+
+_KEYS_FILE = 'keys.txt'
+_SOURCE_FILE = 'source.json'
+_COLUMNS = ('frame_offsets', 'intrinsic_matrix', 'object_frame', 'cls_indexes', 'poses', 'eulers')
+
+
+class YCBVideoMeta(object):
+    """
+    Memory-mapped per-frame and per-object annotations of an image set.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        with open(os.path.join(root, _KEYS_FILE)) as f:
+            self.keys = [x.rstrip('\n') for x in f.readlines()]
+        for name in _COLUMNS:
+            setattr(self, name, np.load(os.path.join(root, name + '.npy'), mmap_mode='r'))
+
+    def __len__(self):
+        return len(self.keys)
+
+    @staticmethod
+    def exists(root, source=None):
+        """
+        Whether a complete cache exists in root, built from the given source stamp if one is given
+        """
+        if not (all(os.path.exists(os.path.join(root, name + '.npy')) for name in _COLUMNS)
+                and os.path.exists(os.path.join(root, _KEYS_FILE))):
+            return False
+        if source is None:
+            return True
+        source_file = os.path.join(root, _SOURCE_FILE)
+        if not os.path.exists(source_file):
+            return False
+        with open(source_file) as f:
+            return json.load(f) == json.loads(json.dumps(source))
+
+    def frame(self, i):
+        """
+        Meta data of frame i in the layout of the -meta.mat files
+        """
+        start = self.frame_offsets[i]
+        end = self.frame_offsets[i + 1]
+        return {'poses': np.transpose(self.poses[start:end], (1, 2, 0)),
+                'cls_indexes': self.cls_indexes[start:end],
+                'intrinsic_matrix': self.intrinsic_matrix[i]}
+
+    def objects_of_class(self, cls):
+        """
+        Row indexes of all objects of class cls
+        """
+        return np.where(self.cls_indexes == cls)[0]
+
+    @staticmethod
+    def build(root, data_path, image_index, source=None):
+        """
+        Parse the -meta.mat file of every frame in image_index and write the cache to root,
+        source is a json serializable stamp of the image set checked by exists
+        """
+        num = len(image_index)
+        frame_offsets = np.zeros((num + 1, ), dtype=np.int64)
+        intrinsic_matrix = np.zeros((num, 3, 3), dtype=np.float32)
+        object_frame = []
+        cls_indexes = []
+        poses = []
+
+        print('building meta data cache for {} frames...'.format(num))
+        for i in range(num):
+            filename = os.path.join(data_path, image_index[i] + '-meta.mat')
+            meta_data = scipy.io.loadmat(filename)
+            cls = meta_data['cls_indexes'].flatten().astype(np.int32)
+            gt = meta_data['poses']
+            if len(gt.shape) == 2:
+                gt = np.reshape(gt, (3, 4, 1))
+
+            frame_offsets[i + 1] = frame_offsets[i] + len(cls)
+            intrinsic_matrix[i] = meta_data['intrinsic_matrix']
+            object_frame.append(np.full((len(cls), ), i, dtype=np.int32))
+            cls_indexes.append(cls)
+            poses.append(np.transpose(gt, (2, 0, 1)).astype(np.float32))
+
+        if num > 0:
+            object_frame = np.concatenate(object_frame)
+            cls_indexes = np.concatenate(cls_indexes)
+            poses = np.concatenate(poses, axis=0)
+        else:
+            object_frame = np.zeros((0, ), dtype=np.int32)
+            cls_indexes = np.zeros((0, ), dtype=np.int32)
+            poses = np.zeros((0, 3, 4), dtype=np.float32)
+
+        eulers = np.zeros((poses.shape[0], 3), dtype=np.float32)
+        for i in range(poses.shape[0]):
+            eulers[i] = mat2euler(poses[i, :, :3])
+
+        # write to a temporary directory first so that a killed build never leaves a partial cache
+        tmp_root = root + '.tmp%d' % os.getpid()
+        if os.path.exists(tmp_root):
+            shutil.rmtree(tmp_root)
+        os.makedirs(tmp_root)
+        with open(os.path.join(tmp_root, _KEYS_FILE), 'w') as f:
+            for index in image_index:
+                f.write(index + '\n')
+        if source is not None:
+            with open(os.path.join(tmp_root, _SOURCE_FILE), 'w') as f:
+                json.dump(source, f)
+        columns = {'frame_offsets': frame_offsets,
+                   'intrinsic_matrix': intrinsic_matrix,
+                   'object_frame': object_frame,
+                   'cls_indexes': cls_indexes,
+                   'poses': poses,
+                   'eulers': eulers}
+        for name in _COLUMNS:
+            np.save(os.path.join(tmp_root, name + '.npy'), columns[name])
+        if os.path.exists(root):
+            shutil.rmtree(root)
+        os.rename(tmp_root, root)
+        print('wrote meta data cache to {}'.format(root))
+
+        return YCBVideoMeta(root)
@@ -0,0 +1,87 @@
+# --------------------------------------------------------
+# Lazily loaded 3D model points for YCB-Video
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+The points.xyz file of a model is parsed once and converted to a .npy file in
+the cache directory, which is memory mapped afterwards. Models are loaded on
+first use only. Two sets of points are kept per model: the full resolution
+points for pose evaluation, and the convex hull vertices for box projection,
+which give the same 2D box as the full model with a fraction of the points.
+
+    cache_path/
+    |_ <model>_points.npy    (N, 3) float32
+    |_ <model>_hull.npy      (K, 3) float32
+    |_ <model>_nn*.pkl       nearest neighbor index for ADD-S, see utils/nn_index.py
+"""
+
+import os
+import numpy as np
+
+from maskrcnn_benchmark.utils.se3 import hull_points
+from maskrcnn_benchmark.utils.nn_index import NNIndex
+
+
+def _save_atomic(filename, array):
+    tmp_file = filename + '.tmp%d' % os.getpid()
+    with open(tmp_file, 'wb') as f:
+        np.save(f, array)
+    os.rename(tmp_file, filename)
+
+
+class YCBVideoModels(object):
+    """
+    Arguments:
+        models_path (str): directory with a <model>/points.xyz file per model
+        cache_path (str): directory for the converted points
+    """
+
+    def __init__(self, models_path, cache_path):
+        self.models_path = models_path
+        self.cache_path = cache_path
+        if not os.path.exists(cache_path):
+            os.makedirs(cache_path)
+        self._points = {}
+        self._hulls = {}
+        self._nn_indexes = {}
+
+    def points(self, name):
+        """
+        Full resolution points of model `name`, memory mapped
+        """
+        if name not in self._points:
+            filename = os.path.join(self.cache_path, name + '_points.npy')
+            if not os.path.exists(filename):
+                point_file = os.path.join(self.models_path, name, 'points.xyz')
+                assert os.path.exists(point_file), 'Path does not exist: {}'.format(point_file)
+                print('converting {}'.format(point_file))
+                _save_atomic(filename, np.loadtxt(point_file, dtype=np.float32))
+            self._points[name] = np.load(filename, mmap_mode='r')
+        return self._points[name]
+
+    def box_points(self, name):
+        """
+        Convex hull vertices of model `name`, for box projection
+        """
+        if name not in self._hulls:
+            filename = os.path.join(self.cache_path, name + '_hull.npy')
+            if not os.path.exists(filename):
+                _save_atomic(filename, hull_points(np.asarray(self.points(name))).astype(np.float32))
+            self._hulls[name] = np.load(filename)
+        return self._hulls[name]
+
+    def nn_index(self, name, voxel_size=0.0):
+        """
+        Nearest neighbor index of model `name` for ADD-S, with a query set downsampled to voxel_size
+        """
+        key = (name, voxel_size)
+        if key not in self._nn_indexes:
+            suffix = '_nn.pkl' if voxel_size <= 0 else '_nn_{:g}mm.pkl'.format(voxel_size * 1000)
+            filename = os.path.join(self.cache_path, name + suffix)
+            if os.path.exists(filename):
+                self._nn_indexes[key] = NNIndex.load(filename)
+            else:
+                self._nn_indexes[key] = NNIndex(np.asarray(self.points(name)), voxel_size)
+                self._nn_indexes[key].save(filename)
+        return self._nn_indexes[key]
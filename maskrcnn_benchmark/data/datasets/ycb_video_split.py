@@ -0,0 +1,90 @@
+# --------------------------------------------------------
+# Image set indexing for YCB-Video
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+An image set is read from <image_set>.json if it exists, otherwise from
+<image_set>.txt with one frame per line. The json manifest lists the frames
+directly and may give the classes of each video:
+
+    {"frames": ["0048/000001", "0048/000002", ...],
+     "video_classes": {"0048": [1, 4, 7], ...}}
+
+The classes of the videos that the manifest does not cover are read from the
+first -meta.mat file of the video once and kept in a persistent index, which
+stores the mtime of that file and rereads it when the file changes:
+
+    {"0048": {"mtime": 1546300800.0, "classes": [1, 4, 7]}, ...}
+"""
+
+import os
+import json
+import scipy.io
+
+
+def image_set_file(ycb_video_path, image_set):
+    """
+    :return: the manifest of the image set if it exists, otherwise its text file
+    """
+    manifest_file = os.path.join(ycb_video_path, image_set + '.json')
+    if os.path.exists(manifest_file):
+        return manifest_file
+    return os.path.join(ycb_video_path, image_set + '.txt')
+
+
+def load_image_set(ycb_video_path, image_set):
+    """
+    :return: frames of the image set, and the classes of each video given by its manifest, if any
+    """
+    filename = image_set_file(ycb_video_path, image_set)
+    if filename.endswith('.json'):
+        with open(filename) as f:
+            manifest = json.load(f)
+        video_classes = {k: [int(c) for c in v] for k, v in manifest.get('video_classes', {}).items()}
+        return list(manifest['frames']), video_classes
+
+    assert os.path.exists(filename), \
+            'Path does not exist: {}'.format(filename)
+    with open(filename) as f:
+        return [x.rstrip('\n') for x in f.readlines() if x.strip()], {}
+
+
+class VideoClassIndex(object):
+    """
+    Arguments:
+        index_file (str): json file of the persistent index
+        data_path (str): directory with a sub directory per video
+    """
+
+    def __init__(self, index_file, data_path):
+        self.index_file = index_file
+        self.data_path = data_path
+        self._videos = {}
+        if os.path.exists(index_file):
+            with open(index_file) as f:
+                self._videos = json.load(f)
+        self._dirty = False
+
+    def classes(self, video_id):
+        """
+        Class indexes of the objects in video `video_id`
+        """
+        filename = os.path.join(self.data_path, video_id, '000001-meta.mat')
+        entry = self._videos.get(video_id)
+        mtime = os.path.getmtime(filename)
+        if entry is None or entry['mtime'] != mtime:
+            meta_data = scipy.io.loadmat(filename)
+            entry = {'mtime': mtime, 'classes': [int(c) for c in meta_data['cls_indexes'].flatten()]}
+            self._videos[video_id] = entry
+            self._dirty = True
+        return entry['classes']
+
+    def save(self):
+        if not self._dirty:
+            return
+        tmp_file = self.index_file + '.tmp%d' % os.getpid()
+        with open(tmp_file, 'w') as f:
+            json.dump(self._videos, f)
+        os.rename(tmp_file, self.index_file)
+        self._dirty = False
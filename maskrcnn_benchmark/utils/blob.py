@@ -137,39 +137,35 @@ def add_noise_depth_cuda(image, level = 0.1):
     noisy = image + gauss
     return noisy
 
-def add_noise_cuda(image, level = 0.1):
+def add_noise_tensor(image, level = 0.1, rng=np.random):
+    """
+    Gaussian noise or motion blur on an HxWxC float tensor in [0, 1].
+    Works on any device, the gaussian noise is added in place.
+    """
     # random number
-    r = np.random.rand(1)
+    r = rng.rand(1)
 
     # gaussian noise
     if r < 0.8:
-        noise_level = random.uniform(0, level)
-        gauss = torch.randn_like(image) * noise_level
-        noisy = image + gauss
-        noisy = torch.clamp(noisy, 0, 1.0)
+        noise_level = rng.uniform(0, level)
+        gauss = torch.randn_like(image).mul_(noise_level)
+        noisy = image.add_(gauss).clamp_(0, 1.0)
     else:
         # motion blur
         sizes = [3, 5, 7, 9, 11, 15]
-        size = sizes[int(np.random.randint(len(sizes), size=1))]
-        kernel_motion_blur = torch.zeros((size, size))
-        if np.random.rand(1) < 0.5:
-            kernel_motion_blur[int((size-1)/2), :] = torch.ones(size)
+        size = sizes[int(rng.randint(len(sizes), size=1))]
+        kernel_motion_blur = torch.zeros((size, size), dtype=image.dtype, device=image.device)
+        if rng.rand(1) < 0.5:
+            kernel_motion_blur[int((size-1)/2), :] = 1.0 / size
         else:
-            kernel_motion_blur[:, int((size-1)/2)] = torch.ones(size)
-        kernel_motion_blur = kernel_motion_blur.cuda() / size
-        kernel_motion_blur = kernel_motion_blur.view(1, 1, size, size)
-        kernel_motion_blur = kernel_motion_blur.repeat(image.size(2), 1,  1, 1)
-
-        motion_blur_filter = nn.Conv2d(in_channels=image.size(2),
-                                       out_channels=image.size(2),
-                                       kernel_size=size,
-                                       groups=image.size(2),
-                                       bias=False,
-                                       padding=int(size/2))
-
-        motion_blur_filter.weight.data = kernel_motion_blur
-        motion_blur_filter.weight.requires_grad = False
-        noisy = motion_blur_filter(image.permute(2, 0, 1).unsqueeze(0))
+            kernel_motion_blur[:, int((size-1)/2)] = 1.0 / size
+        channels = image.size(2)
+        kernel_motion_blur = kernel_motion_blur.view(1, 1, size, size).repeat(channels, 1, 1, 1)
+        noisy = nn.functional.conv2d(image.permute(2, 0, 1).unsqueeze(0), kernel_motion_blur,
+                                     padding=int(size/2), groups=channels)
         noisy = noisy.squeeze(0).permute(1, 2, 0)
 
     return noisy
+
+def add_noise_cuda(image, level = 0.1):
+    return add_noise_tensor(image, level)
@@ -0,0 +1,79 @@
+# --------------------------------------------------------
+# Nearest neighbor index of a 3D model for ADD-S
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+ADD-S averages, over the model points p, the distance from the gt position of
+p to the nearest point of the estimated model. The KD-tree over the model
+points is built once and pickled; an optional voxel-downsampled query set
+replaces the model points by the centroids of their voxels, weighted by the
+number of points in each voxel.
+
+Error bound: for a fixed pair of poses the nearest neighbor distance of a
+query point is 1-Lipschitz in the point, because both poses are rigid. The
+weighted average over the centroids therefore differs from the exact ADD-S
+by at most the mean distance from the model points to their voxel centroid,
+which is stored as `error_bound`. Since a centroid lies in its voxel, this
+never exceeds the voxel diagonal sqrt(3) * voxel_size.
+"""
+
+import os
+import pickle
+import numpy as np
+from scipy import spatial
+
+from maskrcnn_benchmark.utils.pose_error import adi_batch
+
+
+def voxel_downsample(points, voxel_size):
+    """
+    :param points: nx3 points
+    :param voxel_size: edge length of the voxels
+    :return: mx3 centroids of the occupied voxels, m point counts, and the mean
+             distance of the points to the centroid of their voxel
+    """
+    points = np.asarray(points, dtype=np.float64)
+    voxels = np.floor(points / voxel_size).astype(np.int64)
+    _, inverse, counts = np.unique(voxels, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    centroids = np.zeros((len(counts), 3), dtype=np.float64)
+    np.add.at(centroids, inverse, points)
+    centroids /= counts[:, np.newaxis]
+    error_bound = np.linalg.norm(points - centroids[inverse], axis=1).mean()
+    return centroids, counts.astype(np.float64), error_bound
+
+
+class NNIndex(object):
+    """
+    Arguments:
+        points (array): nx3 model points
+        voxel_size (float): voxel size of the query set, 0 to query all model points
+    """
+
+    def __init__(self, points, voxel_size=0.0):
+        self.points = np.asarray(points, dtype=np.float64)
+        self.voxel_size = voxel_size
+        self.tree = spatial.cKDTree(self.points)
+        if voxel_size > 0:
+            self.query_points, self.weights, self.error_bound = voxel_downsample(self.points, voxel_size)
+        else:
+            self.query_points, self.weights, self.error_bound = self.points, None, 0.0
+
+    @staticmethod
+    def load(filename):
+        with open(filename, 'rb') as f:
+            return pickle.load(f)
+
+    def save(self, filename):
+        tmp_file = filename + '.tmp%d' % os.getpid()
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_file, filename)
+
+    def adi(self, R_est, t_est, R_gt, t_gt, chunk_size=64):
+        """
+        ADD-S of N poses (Nx3x3 rotations and Nx3 translations), within error_bound of adi_batch
+        """
+        return adi_batch(R_est, t_est, R_gt, t_gt, self.points, self.tree, chunk_size,
+                         query_pts=self.query_points, weights=self.weights)
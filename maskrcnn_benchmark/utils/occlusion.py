@@ -0,0 +1,71 @@
+# --------------------------------------------------------
+# Occlusion ratios of rendered objects
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+Occlusion ratio of an object = 1 - visible area / full (unoccluded) area.
+All functions handle every object of a scene in one vectorized pass.
+"""
+
+import numpy as np
+import torch
+
+
+def occlusion_ratios_from_depth(depths):
+    """
+    Reference implementation from per-object depth maps.
+
+    :param depths: NxHxW depth of each object rendered alone, 0 where the object does not cover a pixel
+    :return: ratios (N,), visible masks (N,H,W) and full masks (N,H,W)
+    """
+    depths = np.asarray(depths)
+    num = depths.shape[0]
+    full = depths > 0
+    if num == 0:
+        return np.zeros((0, ), dtype=np.float32), full, full
+
+    # the front-most object of each pixel is visible there
+    front = np.argmin(np.where(full, depths, np.inf), axis=0)
+    visible = full & (front[np.newaxis, :, :] == np.arange(num)[:, np.newaxis, np.newaxis])
+    ratios = _ratios(visible.reshape((num, -1)).sum(axis=1), full.reshape((num, -1)).sum(axis=1))
+    return ratios, visible, full
+
+
+def occlusion_ratios_from_labels(seg_scene, seg_targets):
+    """
+    From the segmentation of the full scene and of each object rendered alone.
+
+    :param seg_scene: HxW segmentation of the scene
+    :param seg_targets: NxHxW segmentation of each object rendered alone, 0 is background
+    :return: ratios (N,) and full masks (N,H,W)
+    """
+    seg_targets = np.asarray(seg_targets)
+    num = seg_targets.shape[0]
+    full = seg_targets > 0
+    visible = full & (seg_targets == seg_scene[np.newaxis, :, :])
+    ratios = _ratios(visible.reshape((num, -1)).sum(axis=1), full.reshape((num, -1)).sum(axis=1))
+    return ratios, full
+
+
+def occlusion_ratios_torch(seg_scene, seg_targets):
+    """
+    Same as occlusion_ratios_from_labels for tensors on any device,
+    e.g. renderer buffers that stay on the GPU until the final reduction.
+    """
+    num = seg_targets.size(0)
+    full = seg_targets > 0
+    visible = full & (seg_targets == seg_scene.unsqueeze(0))
+    area = full.view(num, -1).sum(dim=1).float()
+    non_occluded = visible.view(num, -1).sum(dim=1).float()
+    ratios = torch.where(area > 0, 1.0 - non_occluded / area.clamp(min=1), torch.ones_like(area))
+    return ratios, full
+
+
+def _ratios(non_occluded, area):
+    non_occluded = non_occluded.astype(np.float32)
+    area = area.astype(np.float32)
+    ratios = np.ones(area.shape, dtype=np.float32)
+    index = area > 0
+    ratios[index] = 1.0 - non_occluded[index] / area[index]
+    return ratios
@@ -0,0 +1,90 @@
+# --------------------------------------------------------
+# Area under the accuracy-threshold curve of pose errors
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+AUC of the accuracy of pose errors (ADD, ADD-S, translation) for thresholds
+from 0 to max_distance, as reported for YCB-Video. Accuracy is a step curve:
+between the k-th and the (k+1)-th smallest error it is k/n, except for the
+first segment [0, d_1], which counts with 1/n like the VOC-style AP.
+"""
+
+import numpy as np
+
+
+def VOCap(rec, prec):
+    """
+    VOC-style area under prec(rec) for rec in [0, 0.1], scaled to [0, 1]
+    """
+    index = np.where(np.isfinite(rec))[0]
+    rec = rec[index]
+    prec = prec[index]
+    if len(rec) == 0 or len(prec) == 0:
+        return 0
+    mrec = np.concatenate(([0], rec, [0.1]))
+    mpre = np.concatenate(([0], prec, [prec[-1]]))
+    mpre = np.maximum.accumulate(mpre)
+    return np.sum(np.diff(mrec) * mpre[1:]) * 10
+
+
+def accuracy_curve(errors, max_distance=0.1):
+    """
+    Sorted errors with misses (errors above max_distance) set to inf, and the accuracy at each of them
+    """
+    d = np.sort(np.where(errors <= max_distance, errors, np.inf))
+    n = len(d)
+    return d, np.cumsum(np.ones((n, ), np.float32)) / n
+
+
+def accuracy_auc(errors, max_distance=0.1):
+    """
+    Closed-form VOCap of the accuracy curves of several error columns at once.
+
+    :param errors: NxR errors of N objects for R methods, inf or nan for misses
+    :param max_distance: largest threshold
+    :return: R AUCs in [0, 1]
+    """
+    errors = np.asarray(errors, dtype=np.float64)
+    if errors.ndim == 1:
+        return accuracy_auc(errors[:, np.newaxis], max_distance)[0]
+    n, num = errors.shape
+    if n == 0:
+        return np.zeros((num, ), dtype=np.float64)
+
+    d = np.sort(np.where(errors <= max_distance, errors, np.inf), axis=0)
+    finite = np.isfinite(d)
+    m = finite.sum(axis=0)
+
+    # sum over the hits of (d_k - d_{k-1}) * k / n, with d_0 = 0
+    d = np.where(finite, d, 0)
+    prev = np.concatenate((np.zeros((1, num)), d[:-1]), axis=0)
+    k = np.arange(1, n + 1, dtype=np.float64)[:, np.newaxis] / n
+    area = np.where(finite, (d - prev) * k, 0).sum(axis=0)
+
+    # last segment up to max_distance at the final accuracy m / n
+    last = d[np.maximum(m - 1, 0), np.arange(num)]
+    area += np.where(m > 0, (max_distance - last) * m / n, 0)
+    return area / max_distance
+
+
+def pose_aucs(results, class_ids, max_distance=0.1):
+    """
+    AUC of ADD, ADD-S and translation of every class and every result column.
+
+    :param results: dict with 'results_cls_id' (N,) and NxR 'distances_non',
+        'distances_sys' and 'errors_translation'
+    :param class_ids: classes to evaluate, 0 stands for all objects
+    :return: dict of (len(class_ids), R) arrays for 'ADD', 'ADD-S' and 'T'
+    """
+    metrics = {'ADD': 'distances_non', 'ADD-S': 'distances_sys', 'T': 'errors_translation'}
+    cls_ids = results['results_cls_id']
+    aucs = {}
+    for name, column in metrics.items():
+        errors = results[column]
+        aucs[name] = np.zeros((len(class_ids), errors.shape[1]), dtype=np.float32)
+        for j, k in enumerate(class_ids):
+            index = cls_ids == k if k > 0 else np.ones(len(cls_ids), dtype=np.bool_)
+            if np.any(index):
+                aucs[name][j] = accuracy_auc(errors[index], max_distance)
+    return aucs
@@ -89,6 +89,63 @@ def adi(R_est, t_est, R_gt, t_gt, pts):
     e = nn_dists.mean()
     return e
 
+def add_batch(R_est, t_est, R_gt, t_gt, pts, chunk_size=256):
+    """
+    add() for N poses of the same object.
+
+    :param R_est, t_est: Estimated poses (Nx3x3 rot. matrices and Nx3 trans. vectors).
+    :param R_gt, t_gt: GT poses (Nx3x3 rot. matrices and Nx3 trans. vectors).
+    :param pts: nx3 ndarray with 3D model points.
+    :param chunk_size: number of poses processed at once, bounds the memory to chunk_size x n x 3.
+    :return: N errors of pose_est w.r.t. pose_gt.
+    """
+    pts = np.asarray(pts, dtype=np.float64)
+    num = R_est.shape[0]
+    e = np.zeros((num, ), dtype=np.float64)
+    for start in range(0, num, chunk_size):
+        end = min(start + chunk_size, num)
+        # (R_est p + t_est) - (R_gt p + t_gt) = (R_est - R_gt) p + (t_est - t_gt)
+        dR = R_est[start:end] - R_gt[start:end]
+        dt = t_est[start:end] - t_gt[start:end]
+        diff = np.einsum('nij,pj->npi', dR, pts) + dt[:, np.newaxis, :]
+        e[start:end] = np.linalg.norm(diff, axis=2).mean(axis=1)
+    return e
+
+def adi_batch(R_est, t_est, R_gt, t_gt, pts, nn_index=None, chunk_size=64, query_pts=None, weights=None):
+    """
+    adi() for N poses of the same object.
+
+    The nearest neighbors are searched in the model frame: the distance from
+    R_gt p + t_gt to the estimated model equals the distance from
+    R_est^T (R_gt p + t_gt - t_est) to the model points, so a single KD-tree
+    over pts serves every pose.
+
+    :param R_est, t_est: Estimated poses (Nx3x3 rot. matrices and Nx3 trans. vectors).
+    :param R_gt, t_gt: GT poses (Nx3x3 rot. matrices and Nx3 trans. vectors).
+    :param pts: nx3 ndarray with 3D model points.
+    :param nn_index: cKDTree over pts, built here if not given.
+    :param chunk_size: number of poses queried at once.
+    :param query_pts: mx3 points whose gt positions are queried instead of pts, e.g. a downsampled model.
+    :param weights: m weights of query_pts in the average.
+    :return: N errors of pose_est w.r.t. pose_gt.
+    """
+    pts = np.asarray(pts, dtype=np.float64)
+    if nn_index is None:
+        nn_index = spatial.cKDTree(pts)
+    if query_pts is not None:
+        pts = np.asarray(query_pts, dtype=np.float64)
+    num = R_est.shape[0]
+    e = np.zeros((num, ), dtype=np.float64)
+    for start in range(0, num, chunk_size):
+        end = min(start + chunk_size, num)
+        # R_est^T R_gt and R_est^T (t_gt - t_est)
+        R = np.einsum('nji,njk->nik', R_est[start:end], R_gt[start:end])
+        t = np.einsum('nji,nj->ni', R_est[start:end], t_gt[start:end] - t_est[start:end])
+        query = np.einsum('nij,pj->npi', R, pts) + t[:, np.newaxis, :]
+        nn_dists, _ = nn_index.query(query.reshape((-1, 3)), k=1)
+        e[start:end] = np.average(nn_dists.reshape((end - start, -1)), axis=1, weights=weights)
+    return e
+
 def re(R_est, R_gt):
     """
     Rotational Error.
@@ -115,3 +172,67 @@ def te(t_est, t_gt):
     assert(t_est.size == t_gt.size == 3)
     error = np.linalg.norm(t_gt - t_est)
     return error
+
+def re_batch(R_est, R_gt, chunk_size=1 << 20):
+    """
+    re() for N pairs of rotations.
+
+    trace(R_est R_gt^-1) = trace(R_est R_gt^T) = sum of R_est * R_gt, so neither
+    an inverse nor a matrix product is needed.
+
+    :param R_est: Nx3x3 estimated rotation matrices.
+    :param R_gt: Nx3x3 GT rotation matrices.
+    :param chunk_size: number of pairs processed at once.
+    :return: N rotational errors in degrees.
+    """
+    assert(R_est.shape == R_gt.shape and R_est.shape[1:] == (3, 3))
+    num = R_est.shape[0]
+    error = np.zeros((num, ), dtype=np.float64)
+    for start in range(0, num, chunk_size):
+        end = min(start + chunk_size, num)
+        trace = np.einsum('nij,nij->n', R_est[start:end], R_gt[start:end])
+        error_cos = np.clip(0.5 * (trace - 1.0), -1.0, 1.0) # Avoid invalid values due to numerical errors
+        error[start:end] = np.degrees(np.arccos(error_cos)) # [rad] -> [deg]
+    return error
+
+def te_batch(t_est, t_gt, chunk_size=1 << 20):
+    """
+    te() for N pairs of translations.
+
+    :param t_est: Nx3 estimated translations.
+    :param t_gt: Nx3 GT translations.
+    :param chunk_size: number of pairs processed at once.
+    :return: N translational errors.
+    """
+    assert(t_est.shape == t_gt.shape and t_est.shape[1:] == (3, ))
+    num = t_est.shape[0]
+    error = np.zeros((num, ), dtype=np.float64)
+    for start in range(0, num, chunk_size):
+        end = min(start + chunk_size, num)
+        error[start:end] = np.linalg.norm(t_gt[start:end] - t_est[start:end], axis=1)
+    return error
+
+def reproj_batch(K, R_est, t_est, R_gt, t_gt, pts, chunk_size=256):
+    """
+    reproj() for N poses of the same object.
+
+    :param K: 3x3 intrinsic matrix.
+    :param R_est, t_est: Estimated poses (Nx3x3 rot. matrices and Nx3 trans. vectors).
+    :param R_gt, t_gt: GT poses (Nx3x3 rot. matrices and Nx3 trans. vectors).
+    :param pts: nx3 ndarray with 3D model points.
+    :param chunk_size: number of poses processed at once, bounds the memory to chunk_size x n x 3.
+    :return: N mean reprojection errors in pixels.
+    """
+    pts = np.asarray(pts, dtype=np.float64)
+    num = R_est.shape[0]
+    e = np.zeros((num, ), dtype=np.float64)
+    for start in range(0, num, chunk_size):
+        end = min(start + chunk_size, num)
+        # project with K R and K t
+        x_est = np.einsum('nij,pj->npi', np.matmul(K, R_est[start:end]), pts) \
+            + np.matmul(t_est[start:end], K.T)[:, np.newaxis, :]
+        x_gt = np.einsum('nij,pj->npi', np.matmul(K, R_gt[start:end]), pts) \
+            + np.matmul(t_gt[start:end], K.T)[:, np.newaxis, :]
+        diff = x_est[:, :, :2] / x_est[:, :, 2:] - x_gt[:, :, :2] / x_gt[:, :, 2:]
+        e[start:end] = np.linalg.norm(diff, axis=2).mean(axis=1)
+    return e
@@ -0,0 +1,81 @@
+# --------------------------------------------------------
+# Backprojection of depth images with cached ray grids
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+The ray of pixel (x, y) is Kinv @ (x, y, 1), so the point cloud of a depth
+image is depth * rays. The rays only depend on the intrinsics, the image size
+and the depth factor, which is folded into the rays, so they are computed once
+per camera and backprojecting a frame is a single float32 multiply. The
+torch variant keeps a copy of the rays on each device for batched depth.
+"""
+
+import numpy as np
+import torch
+
+_MAX_GRIDS = 16
+_grids = {}
+_grids_torch = {}
+
+
+def ray_grid(intrinsic_matrix, height, width, factor=1.0):
+    """
+    :param intrinsic_matrix: 3x3 camera intrinsics
+    :param height, width: image size
+    :param factor: depth values are divided by factor, e.g. 1000 for depth in millimeter
+    :return: read-only HxWx3 float32 rays Kinv @ (x, y, 1) / factor
+    """
+    K = np.asarray(intrinsic_matrix, dtype=np.float64)
+    key = (int(height), int(width), float(factor)) + tuple(K.ravel())
+    rays = _grids.get(key)
+    if rays is None:
+        Kinv = np.linalg.inv(K) / factor
+        x, y = np.meshgrid(np.arange(width, dtype=np.float64), np.arange(height, dtype=np.float64))
+        rays = (x[:, :, None] * Kinv[:, 0] + y[:, :, None] * Kinv[:, 1] + Kinv[:, 2]).astype(np.float32)
+        rays.flags.writeable = False
+        if len(_grids) >= _MAX_GRIDS:
+            _grids.clear()
+        _grids[key] = rays
+    return rays
+
+
+def backproject(depth, intrinsic_matrix, factor=1.0):
+    """
+    :param depth: HxW depth image, invalid pixels are 0 or not finite
+    :param intrinsic_matrix: 3x3 camera intrinsics
+    :param factor: depth values are divided by factor
+    :return: HxWx3 float32 points in the camera frame, 0 at invalid pixels
+    """
+    if np.issubdtype(depth.dtype, np.floating):
+        depth = np.where(np.isfinite(depth), depth, 0).astype(np.float32, copy=False)
+    rays = ray_grid(intrinsic_matrix, depth.shape[0], depth.shape[1], factor)
+    return np.multiply(depth[:, :, None], rays, dtype=np.float32)
+
+
+def ray_grid_torch(intrinsic_matrix, height, width, factor=1.0, device='cpu'):
+    """
+    :return: 3xHxW float32 tensor of the rays of ray_grid on device
+    """
+    K = np.asarray(intrinsic_matrix, dtype=np.float64)
+    key = (int(height), int(width), float(factor), str(device)) + tuple(K.ravel())
+    rays = _grids_torch.get(key)
+    if rays is None:
+        rays = torch.from_numpy(ray_grid(K, height, width, factor).transpose(2, 0, 1).copy()).to(device)
+        if len(_grids_torch) >= _MAX_GRIDS:
+            _grids_torch.clear()
+        _grids_torch[key] = rays
+    return rays
+
+
+def backproject_batch(depth, intrinsic_matrix, factor=1.0):
+    """
+    :param depth: NxHxW depth tensor of images taken with the same camera, invalid pixels are 0 or not finite
+    :param intrinsic_matrix: 3x3 camera intrinsics
+    :param factor: depth values are divided by factor
+    :return: Nx3xHxW float32 points in the camera frame, 0 at invalid pixels
+    """
+    rays = ray_grid_torch(intrinsic_matrix, depth.shape[1], depth.shape[2], factor, depth.device)
+    depth = depth.float()
+    depth = torch.where(torch.isfinite(depth), depth, torch.zeros_like(depth))
+    return depth[:, None] * rays[None]
@@ -92,3 +92,61 @@ def rotation_z(theta):
     R[1, 1] = np.cos(t)
     R[2, 2] = 1
     return R
+
+
+def hull_points(points):
+    '''
+    :param points: Px3 model points
+    :return: vertices of the convex hull of the points. The 2D box of a perspective
+             projection of the hull vertices equals the box of all points
+    '''
+    from scipy.spatial import ConvexHull
+    if points.shape[0] < 4:
+        return points
+    try:
+        hull = ConvexHull(points)
+    except Exception:
+        # QhullError for degenerate (e.g. planar) point sets
+        return points
+    return points[hull.vertices]
+
+
+def pad_points(point_sets):
+    '''
+    :param point_sets: list of N (Pi x 3) point arrays
+    :return: NxPx3 array, shorter sets are padded by repeating their first point,
+             which does not change the projected boxes
+    '''
+    num = max([p.shape[0] for p in point_sets] + [0])
+    points = np.zeros((len(point_sets), num, 3), dtype=np.float32)
+    for i, p in enumerate(point_sets):
+        if p.shape[0] == 0:
+            continue
+        points[i, :p.shape[0]] = p
+        points[i, p.shape[0]:] = p[0]
+    return points
+
+
+def project_boxes(K, RT, points):
+    '''
+    Project the model points of N objects and compute their 2D bounding boxes
+    :param K: 3x3 intrinsic matrix
+    :param RT: Nx3x4 object poses
+    :param points: NxPx3 model points of each object, or a list of N (Pi x 3) arrays
+    :return: Nx4 boxes (x1, y1, x2, y2)
+    '''
+    RT = np.asarray(RT, dtype=np.float32).reshape((-1, 3, 4))
+    if isinstance(points, (list, tuple)):
+        points = pad_points(points)
+    if RT.shape[0] == 0:
+        return np.zeros((0, 4), dtype=np.float32)
+
+    K = np.asarray(K, dtype=np.float32)
+    KR = np.matmul(K, RT[:, :, :3])
+    KT = np.matmul(RT[:, :, 3], K.T)
+    x2d = np.einsum('nij,npj->npi', KR, points) + KT[:, np.newaxis, :]
+    x = x2d[:, :, 0] / x2d[:, :, 2]
+    y = x2d[:, :, 1] / x2d[:, :, 2]
+
+    boxes = np.stack((np.min(x, axis=1), np.min(y, axis=1), np.max(x, axis=1), np.max(y, axis=1)), axis=1)
+    return boxes
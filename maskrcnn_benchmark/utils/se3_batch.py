@@ -0,0 +1,206 @@
+# --------------------------------------------------------
+# Batched SE(3) and quaternion operations
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+Batched versions of the helpers in se3.py and of the transforms3d functions
+used with them. Every function takes numpy arrays or torch tensors with a
+leading batch dimension and returns the same type. Quaternions are (w, x, y, z)
+as in transforms3d, poses RT are Nx3x4 and translations Nx3.
+"""
+
+import numpy as np
+import torch
+
+_AXES = {'x': 0, 'y': 1, 'z': 2}
+
+
+def _is_torch(x):
+    return isinstance(x, torch.Tensor)
+
+
+def _stack(xs, axis):
+    if _is_torch(xs[0]):
+        return torch.stack(xs, dim=axis)
+    return np.stack(xs, axis=axis)
+
+
+def _cat(xs, axis):
+    if _is_torch(xs[0]):
+        return torch.cat(xs, dim=axis)
+    return np.concatenate(xs, axis=axis)
+
+
+def _transpose(R):
+    if _is_torch(R):
+        return R.transpose(-1, -2)
+    return np.swapaxes(R, -1, -2)
+
+
+def _atan2(y, x):
+    if _is_torch(y):
+        return torch.atan2(y, x)
+    return np.arctan2(y, x)
+
+
+def _lib(x):
+    return torch if _is_torch(x) else np
+
+
+def _clamp_min(x, value):
+    if _is_torch(x):
+        return x.clamp(min=value)
+    return np.maximum(x, value)
+
+
+def qmult_batch(q1, q2):
+    '''
+    :param q1, q2: Nx4 quaternions
+    :return: Nx4 products q1 * q2
+    '''
+    w1, x1, y1, z1 = q1[:, 0], q1[:, 1], q1[:, 2], q1[:, 3]
+    w2, x2, y2, z2 = q2[:, 0], q2[:, 1], q2[:, 2], q2[:, 3]
+    return _stack([w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+                   w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+                   w1 * y2 + y1 * w2 + z1 * x2 - x1 * z2,
+                   w1 * z2 + z1 * w2 + x1 * y2 - y1 * x2], axis=1)
+
+
+def qinverse_batch(q):
+    '''
+    :param q: Nx4 quaternions
+    :return: Nx4 inverses
+    '''
+    conj = _cat([q[:, :1], -q[:, 1:]], axis=1)
+    return conj / (q * q).sum(1)[:, None]
+
+
+def quat2mat_batch(q):
+    '''
+    :param q: Nx4 quaternions, need not be normalized
+    :return: Nx3x3 rotation matrices
+    '''
+    lib = _lib(q)
+    q = q / lib.sqrt((q * q).sum(1))[:, None]
+    w, x, y, z = q[:, 0], q[:, 1], q[:, 2], q[:, 3]
+    R = _stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w),
+                2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w),
+                2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], axis=1)
+    return R.reshape((-1, 3, 3))
+
+
+def mat2quat_batch(R):
+    '''
+    :param R: Nx3x3 rotation matrices
+    :return: Nx4 quaternions with w >= 0
+    '''
+    lib = _lib(R)
+    r00, r01, r02 = R[:, 0, 0], R[:, 0, 1], R[:, 0, 2]
+    r10, r11, r12 = R[:, 1, 0], R[:, 1, 1], R[:, 1, 2]
+    r20, r21, r22 = R[:, 2, 0], R[:, 2, 1], R[:, 2, 2]
+
+    # four solutions, each stable when its leading component is the largest
+    diag = _stack([r00 + r11 + r22, r00, r11, r22], axis=1)
+    s = _stack([1 + r00 + r11 + r22, 1 + r00 - r11 - r22, 1 - r00 + r11 - r22, 1 - r00 - r11 + r22], axis=1)
+    s = 2 * lib.sqrt(_clamp_min(s, 1e-12))
+    candidates = _stack([
+        _stack([s[:, 0] / 4, (r21 - r12) / s[:, 0], (r02 - r20) / s[:, 0], (r10 - r01) / s[:, 0]], axis=1),
+        _stack([(r21 - r12) / s[:, 1], s[:, 1] / 4, (r01 + r10) / s[:, 1], (r02 + r20) / s[:, 1]], axis=1),
+        _stack([(r02 - r20) / s[:, 2], (r01 + r10) / s[:, 2], s[:, 2] / 4, (r12 + r21) / s[:, 2]], axis=1),
+        _stack([(r10 - r01) / s[:, 3], (r02 + r20) / s[:, 3], (r12 + r21) / s[:, 3], s[:, 3] / 4], axis=1)], axis=1)
+
+    if _is_torch(R):
+        best = diag.argmax(dim=1)
+        q = candidates[torch.arange(R.shape[0], device=R.device), best]
+        return q * torch.where(q[:, :1] < 0, -torch.ones_like(q[:, :1]), torch.ones_like(q[:, :1]))
+    best = np.argmax(diag, axis=1)
+    q = candidates[np.arange(R.shape[0]), best]
+    return q * np.where(q[:, :1] < 0, -1, 1)
+
+
+def axis_angle2quat_batch(axis, angle):
+    '''
+    :param axis: 'x', 'y' or 'z'
+    :param angle: N angles in radians
+    :return: Nx4 quaternions of the rotations about axis
+    '''
+    lib = _lib(angle)
+    half = angle / 2
+    zero = half * 0
+    v = [zero, zero, zero]
+    v[_AXES[axis]] = lib.sin(half)
+    return _stack([lib.cos(half)] + v, axis=1)
+
+
+def euler2quat_batch(ai, aj, ak, axes='sxyz'):
+    '''
+    Same as transforms3d.euler.euler2quat for N angle triples
+    :param ai, aj, ak: N angles in radians
+    :param axes: 's' (static) or 'r' (rotating) followed by the three axes, e.g. 'sxyz' or 'syxz'
+    :return: Nx4 quaternions
+    '''
+    assert len(axes) == 4 and axes[0] in 'sr', 'unsupported axes {}'.format(axes)
+    qi = axis_angle2quat_batch(axes[1], ai)
+    qj = axis_angle2quat_batch(axes[2], aj)
+    qk = axis_angle2quat_batch(axes[3], ak)
+    if axes[0] == 's':
+        # static axes, the first rotation is applied first
+        return qmult_batch(qk, qmult_batch(qj, qi))
+    return qmult_batch(qi, qmult_batch(qj, qk))
+
+
+def se3_inverse_batch(RT):
+    '''
+    :param RT: Nx3x4 poses
+    :return: Nx3x4 inverse poses
+    '''
+    R_inv = _transpose(RT[:, :, :3])
+    T_inv = -(R_inv @ RT[:, :, 3:])
+    return _cat([R_inv, T_inv], axis=2)
+
+
+def se3_mul_batch(RT1, RT2):
+    '''
+    :param RT1, RT2: Nx3x4 poses
+    :return: Nx3x4 poses RT1 * RT2
+    '''
+    R = RT1[:, :, :3] @ RT2[:, :, :3]
+    T = RT1[:, :, :3] @ RT2[:, :, 3:] + RT1[:, :, 3:]
+    return _cat([R, T], axis=2)
+
+
+def _allocentric_quat(T):
+    dx = _atan2(T[:, 0], -T[:, 2])
+    dy = _atan2(T[:, 1], -T[:, 2])
+    return euler2quat_batch(-dy, -dx, dx * 0, axes='sxyz')
+
+
+def egocentric2allocentric_batch(qt, T):
+    '''
+    :param qt: Nx4 egocentric rotations
+    :param T: Nx3 translations
+    :return: Nx4 allocentric rotations
+    '''
+    return qmult_batch(qinverse_batch(_allocentric_quat(T)), qt)
+
+
+def allocentric2egocentric_batch(qt, T):
+    '''
+    :param qt: Nx4 allocentric rotations
+    :param T: Nx3 translations
+    :return: Nx4 egocentric rotations
+    '''
+    return qmult_batch(_allocentric_quat(T), qt)
+
+
+def T_inv_transform_batch(T_src, T_tgt):
+    '''
+    :param T_src: Nx3 source translations
+    :param T_tgt: Nx3 target translations
+    :return: Nx3 T_delta: delta in pixel and log depth ratio
+    '''
+    lib = _lib(T_src)
+    return _stack([T_tgt[:, 0] / T_tgt[:, 2] - T_src[:, 0] / T_src[:, 2],
+                   T_tgt[:, 1] / T_tgt[:, 2] - T_src[:, 1] / T_src[:, 2],
+                   lib.log(T_src[:, 2] / T_tgt[:, 2])], axis=1)
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import cv2
+import numpy as np
+import torch
+
+from maskrcnn_benchmark.data.datasets.background_pool import BackgroundPool
+
+
+class TestBackgroundPool(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.filenames = []
+        for i in range(3):
+            filename = os.path.join(self.root, '%d.png' % i)
+            cv2.imwrite(filename, np.full((20, 30, 3), 10 * (i + 1), dtype=np.uint8))
+            self.filenames.append(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_lru(self):
+        pool = BackgroundPool(self.filenames, 8, 12, capacity=2)
+        self.assertEqual(pool.get(0).shape, (8, 12, 3))
+        self.assertEqual(int(pool.get(1)[0, 0, 0]), 20)
+        pool.get(0)
+        # image 1 is the least recently used
+        pool.get(2)
+        self.assertEqual(sorted(pool._keys.tolist()), [0, 2])
+        self.assertEqual(int(pool.get(2)[0, 0, 0]), 30)
+
+    def test_concurrent_decode(self):
+        pool = BackgroundPool(self.filenames, 8, 12, capacity=3)
+        decode = pool._decode
+
+        def decode_after_other_worker(index):
+            # another worker caches the same image while this one decodes it
+            im = decode(index)
+            with pool._lock:
+                pool._images[2].copy_(torch.from_numpy(im))
+                pool._keys[2] = index
+            return im
+
+        pool._decode = decode_after_other_worker
+        pool.get(1)
+        self.assertEqual(pool._keys.tolist().count(1), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+
+from maskrcnn_benchmark.utils.occlusion import occlusion_ratios_from_depth
+from maskrcnn_benchmark.utils.occlusion import occlusion_ratios_from_labels
+
+
+class TestOcclusion(unittest.TestCase):
+    def test_depth_and_labels_agree(self):
+        # object 2 is not rendered at all, its depth stays 0 and its ratio is 1
+        depths = np.zeros((3, 8, 8), dtype=np.float32)
+        depths[0, 0:4, 0:4] = 1.0   # in front, fully visible
+        depths[1, 2:6, 2:6] = 2.0   # behind object 0 on a 2x2 corner
+
+        ratios, visible, full = occlusion_ratios_from_depth(depths)
+        np.testing.assert_allclose(ratios, [0.0, 4.0 / 16.0, 1.0])
+        self.assertEqual(visible[1].sum(), 12)
+        self.assertEqual(full[2].sum(), 0)
+        self.assertTrue(np.all(full == (depths > 0)))
+
+        # scene segmentation of the same configuration
+        seg_targets = (depths > 0) * np.arange(1, 4)[:, None, None]
+        seg_scene = np.zeros((8, 8), dtype=np.int64)
+        for i in [1, 0]:
+            seg_scene[depths[i] > 0] = i + 1
+        ratios_labels, full_labels = occlusion_ratios_from_labels(seg_scene, seg_targets)
+        np.testing.assert_allclose(ratios_labels, ratios)
+        self.assertTrue(np.all(full_labels == full))
+
+    def test_empty(self):
+        ratios, visible, full = occlusion_ratios_from_depth(np.zeros((0, 4, 4)))
+        self.assertEqual(ratios.shape, (0, ))
+
+
+if __name__ == "__main__":
+    unittest.main()
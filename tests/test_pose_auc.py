@@ -0,0 +1,72 @@
+import unittest
+import numpy as np
+
+from maskrcnn_benchmark.utils.pose_auc import VOCap, accuracy_auc, accuracy_curve, pose_aucs
+
+
+def VOCap_loop(rec, prec):
+    # reference implementation previously used by YCB-Video evaluation
+    index = np.where(np.isfinite(rec))[0]
+    rec = rec[index]
+    prec = prec[index]
+    if len(rec) == 0 or len(prec) == 0:
+        ap = 0
+    else:
+        mrec = np.insert(rec, 0, 0)
+        mrec = np.append(mrec, 0.1)
+        mpre = np.insert(prec, 0, 0)
+        mpre = np.append(mpre, prec[-1])
+        for i in range(1, len(mpre)):
+            mpre[i] = max(mpre[i], mpre[i-1])
+        i = np.where(mrec[1:] != mrec[:-1])[0] + 1
+        ap = np.sum(np.multiply(mrec[i] - mrec[i-1], mpre[i])) * 10
+    return ap
+
+
+def reference_auc(errors, max_distance=0.1):
+    D = errors.copy()
+    D[D > max_distance] = np.inf
+    d = np.sort(D)
+    n = len(d)
+    accuracy = np.cumsum(np.ones((n, ), np.float32)) / n
+    return VOCap_loop(d, accuracy)
+
+
+class TestPoseAUC(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        errors = rng.uniform(0, 0.15, (200, 2)).astype(np.float32)
+        errors[rng.rand(200) < 0.1, 0] = np.inf
+        errors[:20, 1] = 0.05  # ties
+        self.errors = errors
+
+    def test_simple(self):
+        self.assertAlmostEqual(accuracy_auc(np.array([0.02, 0.05, np.inf])), 0.6)
+
+    def test_matches_loop(self):
+        expected = [reference_auc(self.errors[:, i]) for i in range(2)]
+        np.testing.assert_allclose(accuracy_auc(self.errors), expected, rtol=1e-5)
+        for i in range(2):
+            d, accuracy = accuracy_curve(self.errors[:, i])
+            self.assertAlmostEqual(VOCap(d, accuracy), VOCap_loop(d, accuracy), places=6)
+
+    def test_misses(self):
+        self.assertEqual(accuracy_auc(np.array([np.inf, 0.2])), 0)
+        self.assertEqual(accuracy_auc(np.zeros((0, 2))).shape, (2, ))
+
+    def test_pose_aucs(self):
+        cls_ids = np.repeat([1, 2], 100).astype(np.float32)
+        results = {'results_cls_id': cls_ids,
+                   'distances_non': self.errors,
+                   'distances_sys': self.errors,
+                   'errors_translation': self.errors}
+        aucs = pose_aucs(results, [0, 1, 2, 3])
+        self.assertEqual(aucs['ADD'].shape, (4, 2))
+        for j, index in enumerate([cls_ids > 0, cls_ids == 1, cls_ids == 2]):
+            for i in range(2):
+                self.assertAlmostEqual(aucs['ADD-S'][j, i], reference_auc(self.errors[index, i]), places=5)
+        np.testing.assert_array_equal(aucs['T'][3], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
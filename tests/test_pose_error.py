@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+from transforms3d.euler import euler2mat
+
+from maskrcnn_benchmark.utils.pose_error import add, adi, add_batch, adi_batch
+from maskrcnn_benchmark.utils.pose_error import re, te, reproj, re_batch, te_batch, reproj_batch
+from maskrcnn_benchmark.utils.nn_index import NNIndex
+
+
+def random_poses(rng, num):
+    R = np.stack([euler2mat(*rng.uniform(-np.pi, np.pi, 3)) for _ in range(num)])
+    t = rng.uniform(-0.1, 0.1, (num, 3)) + np.array([0, 0, 1.0])
+    return R, t
+
+
+class TestPoseError(unittest.TestCase):
+    def test_batch_matches_single(self):
+        rng = np.random.RandomState(0)
+        pts = rng.uniform(-0.05, 0.05, (500, 3))
+        R_est, t_est = random_poses(rng, 10)
+        R_gt, t_gt = random_poses(rng, 10)
+
+        e_add = add_batch(R_est, t_est, R_gt, t_gt, pts, chunk_size=3)
+        e_adi = adi_batch(R_est, t_est, R_gt, t_gt, pts, chunk_size=3)
+        for i in range(10):
+            self.assertAlmostEqual(e_add[i], add(R_est[i], t_est[i], R_gt[i], t_gt[i], pts))
+            self.assertAlmostEqual(e_adi[i], adi(R_est[i], t_est[i], R_gt[i], t_gt[i], pts))
+
+    def test_re_te_reproj_batch(self):
+        rng = np.random.RandomState(2)
+        pts = rng.uniform(-0.05, 0.05, (50, 3))
+        K = np.array([[1066.778, 0, 312.9869], [0, 1067.487, 241.3109], [0, 0, 1]])
+        R_est, t_est = random_poses(rng, 7)
+        R_gt, t_gt = random_poses(rng, 7)
+
+        e_re = re_batch(R_est, R_gt, chunk_size=2)
+        e_te = te_batch(t_est, t_gt, chunk_size=2)
+        e_reproj = reproj_batch(K, R_est, t_est, R_gt, t_gt, pts, chunk_size=2)
+        for i in range(7):
+            self.assertAlmostEqual(e_re[i], re(R_est[i], R_gt[i]), places=5)
+            self.assertAlmostEqual(e_te[i], te(t_est[i], t_gt[i]))
+            self.assertAlmostEqual(e_reproj[i], reproj(K, R_est[i], t_est[i], R_gt[i], t_gt[i], pts), places=2)
+        np.testing.assert_allclose(re_batch(R_gt, R_gt), 0, atol=1e-3)
+
+    def test_nn_index(self):
+        rng = np.random.RandomState(3)
+        pts = rng.uniform(-0.05, 0.05, (2000, 3))
+        R_est, t_est = random_poses(rng, 5)
+        R_gt, t_gt = random_poses(rng, 5)
+        exact = adi_batch(R_est, t_est, R_gt, t_gt, pts)
+
+        np.testing.assert_allclose(NNIndex(pts).adi(R_est, t_est, R_gt, t_gt), exact)
+        index = NNIndex(pts, voxel_size=0.01)
+        self.assertLess(len(index.query_points), len(pts))
+        self.assertLessEqual(index.error_bound, np.sqrt(3) * 0.01)
+        approx = index.adi(R_est, t_est, R_gt, t_gt)
+        self.assertTrue(np.all(np.abs(approx - exact) <= index.error_bound + 1e-12))
+
+    def test_identical_poses(self):
+        rng = np.random.RandomState(1)
+        pts = rng.uniform(-0.05, 0.05, (100, 3))
+        R, t = random_poses(rng, 4)
+        np.testing.assert_allclose(add_batch(R, t, R, t, pts), 0, atol=1e-12)
+        np.testing.assert_allclose(adi_batch(R, t, R, t, pts), 0, atol=1e-12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+import torch
+
+from maskrcnn_benchmark.utils.ray_grid import ray_grid, backproject, backproject_batch
+
+
+class TestRayGrid(unittest.TestCase):
+    def test_backproject(self):
+        K = np.array([[1066.778, 0, 312.9869], [0, 1067.487, 241.3109], [0, 0, 1]])
+        depth = np.random.RandomState(0).randint(0, 20000, (48, 64)).astype(np.uint16)
+        xyz = backproject(depth, K, 10000.0)
+        self.assertEqual(xyz.dtype, np.float32)
+
+        # reference: Kinv @ (x, y, 1) per pixel
+        x, y = np.meshgrid(np.arange(64), np.arange(48))
+        x2d = np.stack((x, y, np.ones_like(x)), axis=2).reshape(-1, 3)
+        X = (np.linalg.inv(K) @ x2d.T) * depth.reshape(1, -1) / 10000.0
+        np.testing.assert_allclose(xyz.reshape(-1, 3), X.T, rtol=1e-5, atol=1e-6)
+
+        # float depth, invalid values become 0
+        depth = depth / 10000.0
+        depth[0, 0] = np.nan
+        xyz_float = backproject(depth, K)
+        np.testing.assert_array_equal(xyz_float[0, 0], 0)
+        np.testing.assert_allclose(xyz_float[1:], xyz[1:], rtol=1e-5, atol=1e-6)
+
+    def test_backproject_batch(self):
+        K = np.array([[500.0, 0, 32], [0, 500.0, 24], [0, 0, 1]])
+        depth = np.random.RandomState(0).randint(0, 2000, (2, 48, 64)).astype(np.float32)
+        depth[1, 3, 4] = np.inf
+        xyz = backproject_batch(torch.from_numpy(depth), K, 1000.0)
+        self.assertEqual(xyz.shape, (2, 3, 48, 64))
+        for i in range(2):
+            np.testing.assert_allclose(xyz[i].permute(1, 2, 0).numpy(), backproject(depth[i], K, 1000.0), rtol=1e-6)
+
+    def test_cache(self):
+        K = np.array([[500.0, 0, 32], [0, 500.0, 24], [0, 0, 1]])
+        self.assertIs(ray_grid(K, 48, 64), ray_grid(K.copy(), 48, 64))
+        self.assertIsNot(ray_grid(K, 48, 64), ray_grid(K, 48, 64, 1000.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+from transforms3d.euler import euler2mat
+
+from maskrcnn_benchmark.utils.se3 import hull_points, pad_points, project_boxes
+
+
+def point_box(K, RT, points):
+    x2d = K.dot(RT[:, :3].dot(points.T) + RT[:, 3:])
+    x = x2d[0] / x2d[2]
+    y = x2d[1] / x2d[2]
+    return np.array([x.min(), y.min(), x.max(), y.max()])
+
+
+class TestProjectBoxes(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.K = np.array([[1066.778, 0, 312.9869], [0, 1067.487, 241.3109], [0, 0, 1]], dtype=np.float32)
+        self.points = [rng.uniform(-0.05, 0.05, (n, 3)).astype(np.float32) for n in [200, 50, 3]]
+        # a planar model, qhull fails and all points are kept
+        planar = rng.uniform(-0.05, 0.05, (30, 3)).astype(np.float32)
+        planar[:, 2] = 0
+        self.points.append(planar)
+        self.RT = np.zeros((len(self.points), 3, 4), dtype=np.float32)
+        for i in range(len(self.points)):
+            self.RT[i, :, :3] = euler2mat(*rng.uniform(-np.pi, np.pi, 3))
+            self.RT[i, :, 3] = rng.uniform(-0.2, 0.2, 3) + [0, 0, 1]
+
+    def test_hull_points(self):
+        for p in self.points:
+            hull = hull_points(p)
+            self.assertLessEqual(hull.shape[0], p.shape[0])
+            self.assertTrue(all(any(np.array_equal(v, q) for q in p) for v in hull))
+        self.assertLess(hull_points(self.points[0]).shape[0], self.points[0].shape[0])
+        self.assertEqual(hull_points(self.points[3]).shape[0], self.points[3].shape[0])
+
+    def test_pad_points(self):
+        padded = pad_points(self.points)
+        self.assertEqual(padded.shape, (len(self.points), 200, 3))
+        for i, p in enumerate(self.points):
+            np.testing.assert_array_equal(padded[i, :len(p)], p)
+            np.testing.assert_array_equal(padded[i, len(p):], np.repeat(p[:1], 200 - len(p), axis=0))
+
+    def test_boxes(self):
+        expected = np.array([point_box(self.K, self.RT[i], p) for i, p in enumerate(self.points)])
+        # boxes of all points, padded or not, and of the hull vertices only
+        np.testing.assert_allclose(project_boxes(self.K, self.RT, self.points), expected, rtol=1e-4, atol=1e-3)
+        np.testing.assert_allclose(project_boxes(self.K, self.RT, pad_points(self.points)), expected,
+                                   rtol=1e-4, atol=1e-3)
+        hulls = [hull_points(p) for p in self.points]
+        np.testing.assert_allclose(project_boxes(self.K, self.RT, hulls), expected, rtol=1e-4, atol=1e-3)
+        self.assertEqual(project_boxes(self.K, np.zeros((0, 3, 4)), []).shape, (0, 4))
+
+
+if __name__ == "__main__":
+    unittest.main()
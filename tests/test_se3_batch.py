@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+import torch
+from transforms3d.euler import euler2quat
+from transforms3d.quaternions import quat2mat, mat2quat
+
+from maskrcnn_benchmark.utils import se3
+from maskrcnn_benchmark.utils import se3_batch
+
+
+def same_rotation(q1, q2):
+    # q and -q are the same rotation
+    return min(np.abs(q1 - q2).max(), np.abs(q1 + q2).max())
+
+
+class TestSE3Batch(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.eulers = rng.uniform(-np.pi, np.pi, (20, 3))
+        self.quats = np.array([euler2quat(*e) for e in self.eulers])
+        self.T = rng.uniform(-0.2, 0.2, (20, 3)) - np.array([0, 0, 1.0])
+
+    def test_euler2quat(self):
+        for axes in ['sxyz', 'syxz', 'rzyx']:
+            q = se3_batch.euler2quat_batch(self.eulers[:, 0], self.eulers[:, 1], self.eulers[:, 2], axes)
+            for i in range(len(q)):
+                self.assertLess(same_rotation(q[i], euler2quat(*self.eulers[i], axes=axes)), 1e-10)
+
+    def test_quat_mat(self):
+        R = se3_batch.quat2mat_batch(self.quats)
+        q = se3_batch.mat2quat_batch(R)
+        for i in range(len(R)):
+            np.testing.assert_allclose(R[i], quat2mat(self.quats[i]), atol=1e-10)
+            self.assertLess(same_rotation(q[i], mat2quat(R[i])), 1e-10)
+        self.assertTrue(np.all(q[:, 0] >= 0))
+
+        # torch gives the same results
+        R_torch = se3_batch.quat2mat_batch(torch.from_numpy(self.quats))
+        np.testing.assert_allclose(R_torch.numpy(), R, atol=1e-10)
+        np.testing.assert_allclose(se3_batch.mat2quat_batch(R_torch).numpy(), q, atol=1e-10)
+
+    def test_se3(self):
+        RT = np.concatenate((se3_batch.quat2mat_batch(self.quats), self.T[:, :, None]), axis=2)
+        RT_inv = se3_batch.se3_inverse_batch(RT)
+        RT_mul = se3_batch.se3_mul_batch(RT, RT_inv[::-1])
+        for i in range(len(RT)):
+            np.testing.assert_allclose(RT_inv[i], se3.se3_inverse(RT[i]), atol=1e-6)
+            np.testing.assert_allclose(RT_mul[i], se3.se3_mul(RT[i], RT_inv[::-1][i]), atol=1e-6)
+
+    def test_allocentric(self):
+        q_allo = se3_batch.egocentric2allocentric_batch(self.quats, self.T)
+        q_ego = se3_batch.allocentric2egocentric_batch(q_allo, self.T)
+        T_delta = se3_batch.T_inv_transform_batch(self.T, self.T[::-1])
+        for i in range(len(self.quats)):
+            self.assertLess(same_rotation(q_allo[i], se3.egocentric2allocentric(self.quats[i], self.T[i])), 1e-10)
+            self.assertLess(same_rotation(q_ego[i], self.quats[i]), 1e-10)
+            np.testing.assert_allclose(T_delta[i], se3.T_inv_transform(self.T[i], self.T[::-1][i]), atol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from maskrcnn_benchmark.data.datasets.synthetic_cache import SyntheticCache, SyntheticCacheWriter, cache_settings
+
+
+def sample(value):
+    return {'image': np.full((4, 6, 3), value, dtype=np.uint8),
+            'label': np.zeros((4, 6), dtype=np.uint8),
+            'label_all': np.zeros((4, 6), dtype=np.uint8),
+            'poses': np.zeros((1, 7), dtype=np.float32),
+            'boxes': np.zeros((1, 4), dtype=np.float32),
+            'class_ids': np.ones((1, ), dtype=np.int32),
+            'ratios': np.zeros((1, ), dtype=np.float32)}
+
+
+class TestSyntheticCache(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.settings = cache_settings([0, 1, 2], 4, 6)
+        with SyntheticCacheWriter(self.root, self.settings, shard_size=2) as writer:
+            for i in range(3):
+                writer.add(sample(i))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_read(self):
+        cache = SyntheticCache(self.root, settings=self.settings)
+        self.assertEqual(len(cache), 3)
+        for i in range(3):
+            self.assertEqual(int(cache[i]['image'][0, 0, 0]), i)
+
+    def test_settings(self):
+        with self.assertRaises(AssertionError):
+            SyntheticCache(self.root, settings=cache_settings([0, 1], 4, 6))
+        with self.assertRaises(AssertionError):
+            SyntheticCache(self.root, settings=cache_settings([0, 1, 2], 8, 6))
+
+
+if __name__ == "__main__":
+    unittest.main()
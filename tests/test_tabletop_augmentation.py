@@ -0,0 +1,70 @@
+import unittest
+
+import torch
+
+from maskrcnn_benchmark.data.datasets.tabletop_augmentation import DepthAugmentation
+from maskrcnn_benchmark.data.datasets.tabletop_object_dataset import TabletopBatchCollator
+
+params = {
+    'gamma_shape': 1000., 'gamma_scale': 0.001,
+    'gaussian_scale': 0.01, 'gp_rescale_factor': 4,
+    'ellipse_dropout_mean': 10, 'ellipse_gamma_shape': 5.0, 'ellipse_gamma_scale': 1.0,
+    'pixel_dropout_alpha': 1., 'pixel_dropout_beta': 10.,
+}
+
+
+class TestDepthAugmentation(unittest.TestCase):
+    def setUp(self):
+        depth = torch.full((4, 48, 64), 1.5)
+        depth[0, :10] = 0
+        depth[3] = 0
+        self.depth = depth
+
+    def test_seeded(self):
+        a = DepthAugmentation(params, seed=1).augment_depth(self.depth)
+        b = DepthAugmentation(params, seed=1).augment_depth(self.depth)
+        c = DepthAugmentation(params, seed=2).augment_depth(self.depth)
+        self.assertTrue(torch.equal(a, b))
+        self.assertFalse(torch.equal(a, c))
+
+    def test_dropout(self):
+        augmentation = DepthAugmentation(params)
+        depth = augmentation.dropout_random_ellipses(self.depth)
+        # pixels are either kept or dropped, invalid pixels stay invalid
+        kept = depth > 0
+        self.assertTrue(torch.equal(depth[kept], self.depth[kept]))
+        self.assertTrue(torch.equal(kept & (self.depth == 0), torch.zeros_like(kept)))
+        self.assertLess(int(kept[:3].sum()), int((self.depth[:3] > 0).sum()))
+
+        depth = augmentation.dropout_random_pixels(self.depth)
+        kept = depth > 0
+        self.assertTrue(torch.equal(depth[kept], self.depth[kept]))
+
+    def test_xyz_noise(self):
+        augmentation = DepthAugmentation(params)
+        xyz = torch.zeros((4, 3, 48, 64))
+        noisy = augmentation.add_noise_to_xyz(xyz, self.depth)
+        invalid = (self.depth == 0)[:, None].expand_as(xyz)
+        self.assertEqual(float(noisy[invalid].abs().max()), 0)
+        self.assertGreater(float(noisy[~invalid].abs().max()), 0)
+
+
+class TestTabletopBatchCollator(unittest.TestCase):
+    def test_collate(self):
+        camera = {'img_width': 64, 'img_height': 48, 'near': 0.01, 'fov': 60}
+        collator = TabletopBatchCollator(dict(params, **camera), size_divisible=32)
+        depth = torch.full((1, 48, 64), 1.5)
+        depth[:, :10] = 0
+        images, targets, img_ids = collator([(depth, 'a', 0), (depth.clone(), 'b', 1)])
+
+        self.assertEqual(images.tensors.shape, (2, 3, 64, 64))
+        self.assertEqual(images.image_sizes, [(48, 64), (48, 64)])
+        self.assertEqual(targets, ('a', 'b'))
+        self.assertEqual(img_ids, (0, 1))
+        # invalid depth stays 0 through the augmentation and the point cloud noise
+        self.assertEqual(float(images.tensors[:, :, :10].abs().max()), 0)
+        self.assertGreater(float(images.tensors[:, 2, 10:48].max()), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
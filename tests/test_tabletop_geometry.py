@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import torch
+from PIL import Image
+
+from maskrcnn_benchmark.data.datasets.tabletop_geometry import read_segmentation, decompose_labels, \
+    mask_to_tight_box, compute_xyz, compute_xyz_batch
+
+
+class TestTabletopLabels(unittest.TestCase):
+    def _check(self, labels):
+        boxes, masks, classes = decompose_labels(labels)
+        values = [v for v in np.unique(labels) if v != 0]
+        self.assertEqual(masks.dtype, np.uint8)
+        self.assertEqual(masks.shape, (len(values), ) + labels.shape)
+        for i, v in enumerate(values):
+            np.testing.assert_array_equal(masks[i], labels == v)
+            np.testing.assert_array_equal(boxes[i], mask_to_tight_box(labels == v))
+        np.testing.assert_array_equal(classes, np.clip(values, 1, 2))
+
+    def test_decompose(self):
+        labels = np.zeros((30, 40), dtype=np.uint8)
+        labels[:, :] = 1
+        labels[5:10, 3:8] = 2
+        labels[20:25, 30:39] = 7
+        labels[0, 0] = 0
+        self._check(labels)
+
+        # no background pixel, and background only
+        self._check(labels.clip(1, None))
+        boxes, masks, classes = decompose_labels(np.zeros((30, 40), dtype=np.uint8))
+        self.assertEqual(boxes.shape, (0, 4))
+        self.assertEqual(masks.shape, (0, 30, 40))
+        self.assertEqual(len(classes), 0)
+
+    def test_read_segmentation(self):
+        root = tempfile.mkdtemp()
+        try:
+            labels = np.zeros((30, 40), dtype=np.uint8)
+            labels[5:10, 3:8] = 2
+            labels[20:25, 30:39] = 7
+            # palette colors differ from the indices, the indices are the labels
+            im = Image.fromarray(labels, mode='P')
+            im.putpalette(list(np.random.RandomState(0).randint(0, 256, 768)))
+            filename = os.path.join(root, 'segmentation_00001.png')
+            im.save(filename)
+            np.testing.assert_array_equal(read_segmentation(filename), labels)
+        finally:
+            shutil.rmtree(root)
+
+
+class TestTabletopXYZ(unittest.TestCase):
+    def test_compute_xyz(self):
+        params = {'img_width': 64, 'img_height': 48, 'near': 0.01, 'fov': 60}
+        H, W = params['img_height'], params['img_width']
+        depth = np.random.RandomState(0).uniform(0.5, 2.0, (H, W)).astype(np.float32)
+        xyz = compute_xyz(depth, params)
+
+        # reference: OpenGL pixel indices, the row index starts at the bottom
+        e = 1 / np.tan(np.radians(params['fov'] / 2.))
+        focal_length = W / (2 * params['near'] / e * W / H) * params['near']
+        rows, cols = np.meshgrid(np.arange(H)[::-1], np.arange(W), indexing='ij')
+        x = (cols - W / 2) * depth / focal_length
+        y = (rows - H / 2) * depth / focal_length
+        np.testing.assert_allclose(xyz, np.stack([x, y, depth], axis=-1), rtol=1e-5, atol=1e-6)
+
+        xyz_batch = compute_xyz_batch(torch.from_numpy(np.stack([depth, depth])), params)
+        self.assertEqual(xyz_batch.shape, (2, 3, H, W))
+        np.testing.assert_allclose(xyz_batch[1].permute(1, 2, 0).numpy(), xyz, rtol=1e-6, atol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from maskrcnn_benchmark.data.datasets.frame_store import FrameStoreWriter
+from maskrcnn_benchmark.data.datasets.tabletop_shards import TabletopShards, SceneShardSampler, view_key, write_index
+
+
+class TestTabletopShards(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        fields = {'depth': np.uint16, 'segmentation': np.uint8}
+        shard_scenes = [['scene_00000', 'scene_00001', 'scene_00002'], ['scene_00003', 'scene_00004']]
+        for i, scenes in enumerate(shard_scenes):
+            with FrameStoreWriter(os.path.join(self.root, 'shard_{:05d}'.format(i)), fields) as writer:
+                for scene in scenes:
+                    for view_num in range(1, 3):
+                        value = int(scene[-1]) * 10 + view_num
+                        writer.add(view_key(scene, view_num),
+                                   depth=np.full((4, 5), value, dtype=np.uint16),
+                                   segmentation=np.full((4, 5), value % 256, dtype=np.uint8))
+        write_index(self.root, 2, shard_scenes)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_read(self):
+        shards = TabletopShards(self.root)
+        self.assertEqual(len(shards), 5)
+        self.assertTrue(shards.has_field('depth'))
+        self.assertFalse(shards.has_field('rgb'))
+        for scene_idx in range(5):
+            for view_num in range(1, 3):
+                depth = shards.get(scene_idx, view_num, 'depth')
+                self.assertEqual(depth.dtype, np.uint16)
+                self.assertTrue(np.all(depth == scene_idx * 10 + view_num))
+
+    def test_scene(self):
+        shards = TabletopShards(self.root)
+        for scene_idx in range(5):
+            views = shards.get_scene(scene_idx)
+            self.assertEqual(len(views), 2)
+            for view_num, view in enumerate(views, 1):
+                np.testing.assert_array_equal(view['depth'], shards.get(scene_idx, view_num, 'depth'))
+                np.testing.assert_array_equal(view['segmentation'], shards.get(scene_idx, view_num, 'segmentation'))
+
+    def test_sampler(self):
+        shards = TabletopShards(self.root)
+        sampler = SceneShardSampler(shards.shard_scenes, 2, seed=3)
+        order = list(sampler)
+        self.assertEqual(sorted(order), list(range(10)))
+
+        # views of a scene are consecutive, scenes of a shard are contiguous
+        scenes = [i // 2 for i in order]
+        self.assertEqual(scenes[::2], scenes[1::2])
+        shard_of_scene = [0 if s < 3 else 1 for s in scenes[::2]]
+        self.assertEqual(shard_of_scene, sorted(shard_of_scene, key=lambda s: s != shard_of_scene[0]))
+
+        self.assertEqual(list(SceneShardSampler(shards.shard_scenes, 2, seed=3)), order)
+
+        # every pass is a new epoch, set_epoch replays one
+        orders = [list(sampler) for _ in range(4)]
+        self.assertTrue(any(o != order for o in orders))
+        for o in orders:
+            self.assertEqual(sorted(o), list(range(10)))
+        sampler.set_epoch(0)
+        self.assertEqual(list(sampler), order)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import scipy.io
+from transforms3d.euler import euler2quat
+from transforms3d.quaternions import quat2mat
+
+from maskrcnn_benchmark.data.datasets.evaluation.ycb_video.ycb_video_eval import compute_pose_errors, \
+    load_results, save_results
+from maskrcnn_benchmark.data.datasets.ycb_video_models import YCBVideoModels
+from maskrcnn_benchmark.utils.pose_error import add, adi, re, te
+
+CLASSES_ALL = ['__background__', 'box', 'can']
+
+
+def random_pose(rng):
+    q = euler2quat(*rng.uniform(-np.pi, np.pi, 3))
+    t = rng.uniform(-0.1, 0.1, 3) + [0, 0, 1]
+    return np.concatenate([q, t])
+
+
+class TestYCBVideoEval(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        for name in CLASSES_ALL[1:]:
+            os.makedirs(os.path.join(self.root, 'models', name))
+            np.savetxt(os.path.join(self.root, 'models', name, 'points.xyz'), rng.uniform(-0.05, 0.05, (50, 3)))
+        self.models = YCBVideoModels(os.path.join(self.root, 'models'), os.path.join(self.root, 'cache'))
+
+        # frame 1: both classes detected, frame 2: class 2 missed
+        self.tasks = []
+        self.frames = []
+        for frame_id, detected in [(1, [1, 2]), (2, [1])]:
+            cls_indexes = [1, 2]
+            poses_gt = np.stack([np.concatenate([quat2mat(p[:4]), p[4:, None]], axis=1)
+                                 for p in [random_pose(rng) for _ in cls_indexes]], axis=2)
+            poses = np.array([random_pose(rng) for _ in detected])
+            poses_refined = np.array([random_pose(rng) for _ in detected])
+            rois = np.zeros((len(detected), 6), dtype=np.float32)
+            rois[:, 1] = detected
+
+            result_file = os.path.join(self.root, '0048_%06d.mat' % frame_id)
+            meta_file = os.path.join(self.root, '%06d-meta.mat' % frame_id)
+            scipy.io.savemat(result_file, {'rois': rois, 'poses': poses, 'poses_refined': poses_refined})
+            scipy.io.savemat(meta_file, {'cls_indexes': np.array(cls_indexes).reshape((-1, 1)), 'poses': poses_gt})
+            self.tasks.append((48, frame_id, result_file, meta_file, True))
+            self.frames.append((cls_indexes, poses_gt, detected, [poses, poses_refined]))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_errors(self):
+        results = compute_pose_errors(self.tasks, self.models, CLASSES_ALL, num_workers=0)
+
+        row = 0
+        for frame_id, (cls_indexes, poses_gt, detected, poses_est) in zip([1, 2], self.frames):
+            for j, cls in enumerate(cls_indexes):
+                self.assertEqual(results['results_frame_id'][row], frame_id)
+                self.assertEqual(results['results_cls_id'][row], cls)
+                R_gt = poses_gt[:, :3, j]
+                t_gt = poses_gt[:, 3, j]
+                pts = np.asarray(self.models.points(CLASSES_ALL[cls]), dtype=np.float64)
+                for k in range(2):
+                    if cls not in detected:
+                        self.assertTrue(np.isinf(results['distances_sys'][row, k]))
+                        self.assertTrue(np.isinf(results['errors_rotation'][row, k]))
+                        continue
+                    pose = poses_est[k][detected.index(cls)]
+                    R_est = quat2mat(pose[:4])
+                    t_est = pose[4:]
+                    expected = [adi(R_est, t_est, R_gt, t_gt, pts), add(R_est, t_est, R_gt, t_gt, pts),
+                                re(R_est, R_gt), te(t_est, t_gt)]
+                    actual = [results[name][row, k] for name in
+                              ['distances_sys', 'distances_non', 'errors_rotation', 'errors_translation']]
+                    np.testing.assert_allclose(actual, expected, rtol=1e-4, atol=1e-4)
+                row += 1
+        self.assertEqual(row, len(results['results_cls_id']))
+
+    def test_saved_results(self):
+        results = compute_pose_errors(self.tasks, self.models, CLASSES_ALL, num_workers=0)
+        filename = os.path.join(self.root, 'results_posecnn.mat')
+
+        # results of an evaluation without a store are imported, results written from a store are not
+        scipy.io.savemat(filename, results)
+        np.testing.assert_array_equal(load_results(filename)['distances_non'], results['distances_non'])
+        save_results(filename, results)
+        self.assertIsNone(load_results(filename))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from maskrcnn_benchmark.data.datasets.evaluation.ycb_video.result_store import ResultStore, frame_keys
+
+
+COLUMNS = {'results_seq_id': (np.float32, ()),
+           'results_frame_id': (np.float32, ()),
+           'distances_sys': (np.float32, (2, ))}
+
+
+def rows(seq_id, frame_ids):
+    num = len(frame_ids)
+    return {'results_seq_id': np.full((num, ), seq_id, dtype=np.float32),
+            'results_frame_id': np.array(frame_ids, dtype=np.float32),
+            'distances_sys': np.random.rand(num, 2).astype(np.float32)}
+
+
+class TestResultStore(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_empty(self):
+        store = ResultStore(self.root, COLUMNS)
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.load()['distances_sys'].shape, (0, 2))
+        self.assertEqual(len(store.frame_keys()), 0)
+
+    def test_append_and_select(self):
+        store = ResultStore(self.root, COLUMNS)
+        first = rows(48, [1, 1, 2])
+        store.append(first)
+        store.append(rows(49, [1]))
+
+        # a new instance sees the row groups of the previous one
+        store = ResultStore(self.root, COLUMNS)
+        self.assertEqual(len(store), 2)
+        np.testing.assert_array_equal(store.frame_keys(), frame_keys([48, 48, 49], [1, 2, 1]))
+
+        selected = store.load(frame_keys([48, 48], [1, 2]))
+        np.testing.assert_array_equal(selected['distances_sys'], first['distances_sys'])
+
+    def test_settings(self):
+        store = ResultStore(self.root, COLUMNS, settings={'voxel_size': 0.0})
+        store.append(rows(48, [1]))
+
+        # same settings keep the rows, other settings drop them
+        store = ResultStore(self.root, COLUMNS, settings={'voxel_size': 0.0})
+        self.assertEqual(len(store), 1)
+        store = ResultStore(self.root, COLUMNS, settings={'voxel_size': 0.002})
+        self.assertEqual(store.num_dropped, 1)
+        self.assertEqual(len(store), 0)
+        self.assertEqual(len(ResultStore(self.root, COLUMNS, settings={'voxel_size': 0.002})), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
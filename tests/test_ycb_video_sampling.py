@@ -0,0 +1,87 @@
+import unittest
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+from torch.utils.data.sampler import RandomSampler
+
+from maskrcnn_benchmark.config import cfg
+from maskrcnn_benchmark.data.datasets.ycb_video import YCBVideoDataset
+from maskrcnn_benchmark.structures.bounding_box import BoxList
+
+
+class FrameDataset(YCBVideoDataset):
+    """
+    YCBVideoDataset over fake frames, the image of a sample is its frame id and a draw of the sampling rng
+    """
+
+    def __init__(self, num_frames, synthesize=False, max_samples=None):
+        self.cfg = cfg.clone()
+        self.cfg.TRAIN.SYN_RATIO = 3
+        if max_samples is not None:
+            # the epoch cap of older configs, which used to truncate the index space
+            self.cfg.SOLVER.IMS_PER_BATCH = 2
+            self.cfg.TRAIN.MAX_ITERS_PER_EPOCH = max_samples // 2
+        self._synthesize = synthesize
+        self._syn_cache = object()
+        self._num_classes = 1
+        self._roidb = [{'frame': i} for i in range(num_frames)]
+        self._perm = np.random.RandomState(self.cfg.TRAIN.RNG_SEED).permutation(num_frames)
+        self._size = self._num_samples(num_frames)
+        self._rng = None
+        self._rng_key = None
+
+    def _render_item(self):
+        # synthetic samples are marked with frame -1
+        return (-1, int(self._get_rng().randint(1 << 30))), None
+
+    def _get_image_blob(self, roidb, scale_ind):
+        return (roidb['frame'], int(self._get_rng().randint(1 << 30))), 1.0, 1, 1
+
+    def _get_label_blob(self, roidb, num_classes, im_scale, height, width):
+        return BoxList(torch.zeros((0, 4)), (width, height))
+
+
+def collate(batch):
+    return [b[0] for b in batch]
+
+
+class TestYCBVideoSampling(unittest.TestCase):
+    def _samples(self, num_workers, dataset=None):
+        if dataset is None:
+            dataset = FrameDataset(64)
+        loader = DataLoader(dataset, batch_size=4, sampler=RandomSampler(dataset),
+                            num_workers=num_workers, collate_fn=collate)
+        return [s for batch in loader for s in batch]
+
+    def test_no_duplicates_across_workers(self):
+        for num_workers in [0, 2]:
+            samples = self._samples(num_workers)
+            frames = [s[0] for s in samples]
+            self.assertEqual(sorted(frames), list(range(64)))
+
+            # every worker draws from its own random state
+            draws = [s[1] for s in samples]
+            self.assertEqual(len(set(draws)), len(draws))
+
+    def test_every_frame_reachable(self):
+        # a cap below the number of frames does not shrink the index space,
+        # each epoch visits every real frame once
+        for synthesize in [False, True]:
+            dataset = FrameDataset(64, synthesize, max_samples=16)
+            self.assertEqual(len(dataset), 64 * 4 if synthesize else 64)
+            for num_workers in [0, 2]:
+                frames = [s[0] for s in self._samples(num_workers, dataset)]
+                self.assertEqual(sorted(f for f in frames if f >= 0), list(range(64)))
+                self.assertEqual(frames.count(-1), 64 * 3 if synthesize else 0)
+
+    def test_index_picks_frame(self):
+        dataset = FrameDataset(16)
+        for index in [0, 5, 15]:
+            img, target, i = dataset[index]
+            self.assertEqual(img[0], dataset._perm[index])
+            self.assertEqual(i, index)
+
+
+if __name__ == "__main__":
+    unittest.main()
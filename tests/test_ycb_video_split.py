@@ -0,0 +1,69 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import scipy.io
+
+from maskrcnn_benchmark.data.datasets.ycb_video_meta import YCBVideoMeta
+from maskrcnn_benchmark.data.datasets.ycb_video_split import image_set_file, load_image_set, VideoClassIndex
+
+
+class TestYCBVideoSplit(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for video_id, classes in [('0000', [1, 2]), ('0001', [5])]:
+            os.makedirs(os.path.join(self.root, video_id))
+            self._write_meta(video_id, classes)
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _write_meta(self, video_id, classes):
+        filename = os.path.join(self.root, video_id, '000001-meta.mat')
+        scipy.io.savemat(filename, {'cls_indexes': np.array(classes).reshape((-1, 1)),
+                                    'poses': np.tile(np.eye(4)[:3, :, None], (1, 1, len(classes))),
+                                    'intrinsic_matrix': np.eye(3)})
+
+    def test_image_set(self):
+        with open(os.path.join(self.root, 'train.txt'), 'w') as f:
+            f.write('0000/000001\n0000/000002\n')
+        self.assertEqual(load_image_set(self.root, 'train'), (['0000/000001', '0000/000002'], {}))
+
+        # a manifest takes precedence over the text file
+        with open(os.path.join(self.root, 'train.json'), 'w') as f:
+            json.dump({'frames': ['0001/000001'], 'video_classes': {'0001': [5]}}, f)
+        self.assertEqual(load_image_set(self.root, 'train'), (['0001/000001'], {'0001': [5]}))
+        self.assertEqual(image_set_file(self.root, 'train'), os.path.join(self.root, 'train.json'))
+
+    def test_meta_source(self):
+        root = os.path.join(self.root, 'meta')
+        YCBVideoMeta.build(root, self.root, ['0000/000001'], {'file': 'train.txt', 'mtime': 1.0})
+        self.assertTrue(YCBVideoMeta.exists(root))
+        self.assertTrue(YCBVideoMeta.exists(root, {'file': 'train.txt', 'mtime': 1.0}))
+        # a changed image set file invalidates the cache
+        self.assertFalse(YCBVideoMeta.exists(root, {'file': 'train.txt', 'mtime': 2.0}))
+        self.assertFalse(YCBVideoMeta.exists(root, {'file': 'train.json', 'mtime': 1.0}))
+        self.assertEqual(YCBVideoMeta(root).frame(0)['cls_indexes'].tolist(), [1, 2])
+
+    def test_class_index(self):
+        index_file = os.path.join(self.root, 'classes.json')
+        index = VideoClassIndex(index_file, self.root)
+        self.assertEqual(index.classes('0000'), [1, 2])
+        index.save()
+
+        # entries are reused while the meta file is unchanged, and reread after it changes
+        index = VideoClassIndex(index_file, self.root)
+        self.assertEqual(index.classes('0000'), [1, 2])
+        self.assertFalse(index._dirty)
+
+        self._write_meta('0000', [3])
+        filename = os.path.join(self.root, '0000', '000001-meta.mat')
+        os.utime(filename, (0, 0))
+        self.assertEqual(index.classes('0000'), [3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+from maskrcnn_benchmark.data.datasets.ycb_video import YCBVideoDataset
+
+
+class DepthDataset(YCBVideoDataset):
+    """
+    YCBVideoDataset with one random depth image
+    """
+
+    def __init__(self, depth, K):
+        self._depth = depth
+        self._K = K
+        self._depth_factor = 1000.0
+
+    def _read_depth(self, roidb):
+        return self._depth
+
+    def _read_meta_data(self, roidb):
+        return {'intrinsic_matrix': self._K}
+
+
+class TestYCBVideoXYZ(unittest.TestCase):
+    def test_flipped(self):
+        rng = np.random.RandomState(0)
+        depth = rng.randint(500, 2000, (48, 64)).astype(np.uint16)
+        depth[:, :5] = 0
+        K = np.array([[500.0, 0, 20.0], [0, 500.0, 30.0], [0, 0, 1]])
+        dataset = DepthDataset(depth, K)
+        xyz = dataset._get_xyz_blob({'flipped': False}, 1.0).numpy()
+        flipped = dataset._get_xyz_blob({'flipped': True}, 1.0).numpy()
+
+        # the flipped image seen by a camera with the principal point mirrored
+        H, W = depth.shape
+        v, u = np.meshgrid(np.arange(H), np.arange(W), indexing='ij')
+        z = depth[:, ::-1] / 1000.0
+        expected = np.stack([(u - (W - 1 - K[0, 2])) * z / K[0, 0], (v - K[1, 2]) * z / K[1, 1], z])
+        np.testing.assert_allclose(flipped, expected, rtol=1e-5, atol=1e-6)
+        np.testing.assert_allclose(flipped, xyz[:, :, ::-1] * np.array([-1, 1, 1])[:, None, None], atol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+# --------------------------------------------------------
+# Pack the tabletop scenes into shards
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+Pack the depth and segmentation images of the tabletop scenes, and the rgb
+images with --rgb, into shards of --scenes-per-shard scenes. Pass the output
+root as shard_dir to Tabletop_Object_Dataset to read from it, e.g.
+
+    python tools/pack_tabletop.py --data-dir /data/tabletop_dataset_v2/training_set \
+        --output /data/tabletop_dataset_v2/training_shards
+"""
+
+import argparse
+import glob
+import os
+import cv2
+import numpy as np
+
+from maskrcnn_benchmark.data.datasets.frame_store import FrameStoreWriter
+from maskrcnn_benchmark.data.datasets.tabletop_geometry import read_segmentation
+from maskrcnn_benchmark.data.datasets.tabletop_shards import view_key, write_index
+
+
+def read_view(scene_dir, view_num, rgb=False):
+    seg = read_segmentation(os.path.join(scene_dir, 'segmentation_{:05d}.png'.format(view_num)))
+    # segmentation is stored as uint8
+    assert seg.max() <= 255, \
+        'labels of view {} of {} exceed 255: {}'.format(view_num, scene_dir, seg.max())
+    view = {'depth': cv2.imread(os.path.join(scene_dir, 'depth_{:05d}.png'.format(view_num)), cv2.IMREAD_ANYDEPTH),
+            'segmentation': seg}
+    if rgb:
+        im = cv2.imread(os.path.join(scene_dir, 'rgb_{:05d}.jpeg'.format(view_num)))
+        view['rgb'] = cv2.cvtColor(im, cv2.COLOR_BGR2RGB)
+    return view
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack the tabletop scenes into shards')
+    parser.add_argument('--data-dir', required=True, help='directory with a sub directory per scene')
+    parser.add_argument('--output', required=True, help='shard root')
+    parser.add_argument('--scenes-per-shard', type=int, default=1000)
+    parser.add_argument('--num-views', type=int, default=6, help='views 1..num-views of each scene are packed')
+    parser.add_argument('--rgb', action='store_true', help='also pack the rgb images')
+    args = parser.parse_args()
+
+    scene_dirs = sorted(glob.glob(os.path.join(args.data_dir, '*/')))
+    fields = {'depth': np.uint16, 'segmentation': np.uint8}
+    if args.rgb:
+        fields['rgb'] = np.uint8
+
+    shard_scenes = []
+    for start in range(0, len(scene_dirs), args.scenes_per_shard):
+        root = os.path.join(args.output, 'shard_{:05d}'.format(len(shard_scenes)))
+        scenes = []
+        with FrameStoreWriter(root, fields) as writer:
+            for scene_dir in scene_dirs[start:start + args.scenes_per_shard]:
+                scene = os.path.basename(os.path.normpath(scene_dir))
+                for view_num in range(1, args.num_views + 1):
+                    writer.add(view_key(scene, view_num), **read_view(scene_dir, view_num, args.rgb))
+                scenes.append(scene)
+        shard_scenes.append(scenes)
+        print('packed %d/%d scenes' % (start + len(scenes), len(scene_dirs)))
+
+    write_index(args.output, args.num_views, shard_scenes)
+    print('wrote {} scenes in {} shards to {}'.format(len(scene_dirs), len(shard_scenes), args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# --------------------------------------------------------
+# Pack a YCB-Video image set into a frame store
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+Pack the color images, label images and meta data of a YCB-Video image set
+into a chunked, memory-mapped frame store, and the depth images with --depth.
+Point FRAME_STORE in the config to the output root to let YCBVideoDataset read
+from it, e.g.
+
+    python tools/pack_ycb_video.py --data-dir datasets/ycb_video --image-set train \
+        --output datasets/ycb_video/frame_store
+"""
+
+import argparse
+import os
+import cv2
+import numpy as np
+import scipy.io
+
+from maskrcnn_benchmark.data.datasets.frame_store import FrameStoreWriter
+
+
+YCB_VIDEO_FIELDS = {
+    'color': np.uint8,
+    'label': np.uint8,
+    'poses': np.float32,
+    'cls_indexes': np.int32,
+    'intrinsic_matrix': np.float64,
+}
+
+
+def read_frame(data_path, index, depth=False):
+    # color, pixels with zero alpha are set to black
+    rgba = cv2.imread(os.path.join(data_path, index + '-color.png'), cv2.IMREAD_UNCHANGED)
+    if rgba.shape[2] == 4:
+        im = np.copy(rgba[:, :, :3])
+        im[rgba[:, :, 3] == 0] = 0
+    else:
+        im = rgba
+
+    im_label = cv2.imread(os.path.join(data_path, index + '-label.png'), cv2.IMREAD_UNCHANGED)
+
+    meta_data = scipy.io.loadmat(os.path.join(data_path, index + '-meta.mat'))
+    poses = meta_data['poses']
+    if len(poses.shape) == 2:
+        poses = np.reshape(poses, (3, 4, 1))
+
+    frame = {'color': im,
+             'label': im_label,
+             'poses': poses,
+             'cls_indexes': meta_data['cls_indexes'].flatten(),
+             'intrinsic_matrix': meta_data['intrinsic_matrix']}
+    if depth:
+        frame['depth'] = cv2.imread(os.path.join(data_path, index + '-depth.png'), cv2.IMREAD_UNCHANGED)
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack a YCB-Video image set into a frame store')
+    parser.add_argument('--data-dir', required=True, help='YCB-Video root containing <image-set>.txt')
+    parser.add_argument('--data-path', default='', help='frame directory, defaults to <data-dir>/data')
+    parser.add_argument('--image-set', default='train')
+    parser.add_argument('--output', required=True, help='frame store root, the image set is written to <output>/<image-set>')
+    parser.add_argument('--depth', action='store_true', help='also pack the uint16 depth images')
+    parser.add_argument('--chunk-size', type=int, default=1 << 30, help='approximate chunk file size in bytes')
+    args = parser.parse_args()
+
+    data_path = args.data_path if args.data_path else os.path.join(args.data_dir, 'data')
+    image_set_file = os.path.join(args.data_dir, args.image_set + '.txt')
+    assert os.path.exists(image_set_file), 'Path does not exist: {}'.format(image_set_file)
+    with open(image_set_file) as f:
+        image_index = [x.rstrip('\n') for x in f.readlines() if x.strip()]
+
+    fields = dict(YCB_VIDEO_FIELDS)
+    if args.depth:
+        fields['depth'] = np.uint16
+
+    root = os.path.join(args.output, args.image_set)
+    with FrameStoreWriter(root, fields, chunk_size=args.chunk_size) as writer:
+        for i, index in enumerate(image_index):
+            writer.add(index, **read_frame(data_path, index, args.depth))
+            if i % 1000 == 0:
+                print('%s: packed %d/%d frames' % (args.image_set, i, len(image_index)))
+    print('wrote {} frames to {}'.format(len(image_index), root))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# --------------------------------------------------------
+# Pre-render synthetic YCB-Video samples
+# Licensed under The MIT License [see LICENSE for details]
+# --------------------------------------------------------
+
+"""
+Render synthetic YCB-Video samples offline into a sharded cache. Set
+TRAIN.SYN_CACHE to the output directory to train from the cache without the
+renderer, e.g.
+
+    python tools/prerender_ycb_video.py --config-file configs/e2e_mask_rcnn_R_50_FPN_1x_ycb_video.yaml \
+        --num 80000 --output datasets/ycb_video/synthetic_cache
+
+Running the script again appends new shards; a training run with
+TRAIN.SYN_CACHE_REFRESH > 0 picks them up while it is running.
+"""
+
+import argparse
+
+from maskrcnn_benchmark.config import cfg
+from maskrcnn_benchmark.config.paths_catalog import DatasetCatalog
+from maskrcnn_benchmark.data.datasets.ycb_video import YCBVideoDataset
+from maskrcnn_benchmark.data.datasets.synthetic_cache import SyntheticCacheWriter
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-render synthetic YCB-Video samples')
+    parser.add_argument('--config-file', required=True, metavar='FILE')
+    parser.add_argument('--dataset', default='', help='dataset name in the paths catalog, defaults to the first training set')
+    parser.add_argument('--num', type=int, default=10000, help='number of samples to render')
+    parser.add_argument('--shard-size', type=int, default=1000, help='number of samples per shard')
+    parser.add_argument('--output', required=True, help='cache directory')
+    parser.add_argument('opts', help='Modify config options using the command-line', default=None, nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    cfg.merge_from_file(args.config_file)
+    cfg.merge_from_list(args.opts)
+    cfg.MODE = 'TRAIN'
+    cfg.TRAIN.SYNTHESIZE = True
+    cfg.TRAIN.SYN_CACHE = ''
+    cfg.freeze()
+
+    name = args.dataset if args.dataset else cfg.DATASETS.TRAIN[0]
+    data = DatasetCatalog.get(name)
+    assert data['factory'] == 'YCBVideoDataset', 'not a YCB-Video dataset: {}'.format(name)
+    dataset = YCBVideoDataset(cfg=cfg, **data['args'])
+
+    with SyntheticCacheWriter(args.output, dataset.synthetic_cache_settings(), shard_size=args.shard_size) as writer:
+        for i in range(args.num):
+            writer.add(dataset._render_sample())
+            if i % 100 == 0:
+                print('rendered %d/%d samples' % (i, args.num))
+    print('wrote {} samples to {}'.format(args.num, args.output))
+
+
+if __name__ == '__main__':
+    main()